@@ -1,10 +1,16 @@
+import logging
 import os
 from flask import Flask
 from flask_socketio import SocketIO
 
+logger = logging.getLogger(__name__)
+
 socketio = SocketIO()
 
 def create_app():
+    from app.utils.logger import setup_logging
+    setup_logging()
+
     flask_app = Flask(__name__, template_folder='../templates', static_folder='../static')
     flask_app.secret_key = os.getenv("SECRET_KEY", "basta_secret_2025")
     
@@ -12,11 +18,22 @@ def create_app():
     # En producción con Gunicorn, usar eventlet es más eficiente
     # En desarrollo, threading funciona bien
     async_mode = os.getenv("SOCKETIO_ASYNC_MODE", "eventlet")
+    
+    # Varios workers/nodos: los emit a una sala pasan por la cola de mensajes
+    # (Redis) para llegar a los clientes conectados a cualquier worker.
+    # Requiere sesiones pegajosas en el balanceador y, con eventlet, monkey patching.
+    # SOCKETIO_MESSAGE_QUEUE="" la desactiva (ej: un solo worker o test client).
+    message_queue = os.getenv("SOCKETIO_MESSAGE_QUEUE", os.getenv("REDIS_URL")) or None
+    if message_queue:
+        logger.info("📡 Socket.IO usando cola de mensajes compartida")
+    
     socketio.init_app(
         flask_app, 
         cors_allowed_origins="*", 
         async_mode=async_mode,
-        logger=True,
+        message_queue=message_queue,
+        # "emitting event ..." va a app.socketio (WARNING salvo LOG_SOCKETIO=1)
+        logger=logging.getLogger("app.socketio"),
         engineio_logger=False,
         ping_timeout=60,
         ping_interval=25,
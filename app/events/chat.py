@@ -1,27 +1,28 @@
 from app import socketio
 from flask import request
-from app.services.state_store import state_store
-from app.services.db_store import db_store
+from app.services.metrics import medir_evento
+from app.services.moderation import contiene_palabras_prohibidas
+from app.services.room_actor import room_actor
+from app.services.room_cache import room_cache
+from app.services.room_emitter import room_emitter
+from app.services.room_reaper import room_reaper
 from app.utils.helpers import get_client_ip
-import re
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
 # Simple rate limiting para chat
 last_chat_times = {}
 
-# Palabras ofensivas básicas (se puede ampliar o mover a config)
-PALABRAS_PROHIBIDAS = {
-    "puta", "mierda", "pendejo", "idiota", "estupido", "imbecil",
-    "cabrón", "cabron", "culero", "chingada", "fuck", "bitch"
-}
+
+def _purgar_chat_rate_limit(ahora, antiguedad=600):
+    """Quita los sids que no escriben hace tiempo (el mapa no crece sin límite)."""
+    for sid in [sid for sid, t in list(last_chat_times.items()) if t < ahora - antiguedad]:
+        last_chat_times.pop(sid, None)
 
 
-def _contiene_palabras_prohibidas(texto: str) -> bool:
-    normalizado = re.sub(r"[^a-zA-ZáéíóúÁÉÍÓÚñÑ ]", "", texto).lower()
-    for palabra in PALABRAS_PROHIBIDAS:
-        if palabra in normalizado:
-            return True
-    return False
+room_reaper.registrar_limpieza(_purgar_chat_rate_limit)
 
 def check_chat_rate_limit(sid):
     current_time = time.time()
@@ -32,6 +33,8 @@ def check_chat_rate_limit(sid):
     return True
 
 @socketio.on("enviar_mensaje_chat")
+@medir_evento("enviar_mensaje_chat")
+@room_actor.serializado
 def handle_chat_message(data):
     if not check_chat_rate_limit(request.sid):
         return
@@ -43,20 +46,19 @@ def handle_chat_message(data):
     if not jugador or not mensaje:
         return
     
-    # Usar db_store como fuente principal para soportar despliegues con base de datos
-    sala = db_store.get_sala(codigo) or state_store.get_sala(codigo)
+    sala = room_cache.get_sala(codigo)
     if not sala or not sala.get("chat_habilitado", True):
         return
 
     # Filtrar palabras prohibidas
-    if _contiene_palabras_prohibidas(mensaje):
+    if contiene_palabras_prohibidas(mensaje):
         socketio.emit(
             "mensaje_rechazado",
             {"razon": "Mensaje bloqueado por lenguaje inapropiado"},
             room=request.sid,
         )
         # Notificar en el chat como mensaje del sistema para dar contexto al resto
-        socketio.emit(
+        room_emitter.emit(
             "nuevo_mensaje_chat",
             {
                 "jugador": "Moderador",
@@ -64,7 +66,7 @@ def handle_chat_message(data):
                 "timestamp": time.time() * 1000,
                 "tipo": "sistema_moderacion",
             },
-            room=codigo,
+            codigo,
         )
         return
 
@@ -96,18 +98,11 @@ def handle_chat_message(data):
     if len(sala["mensajes_chat"]) > 50:
         sala["mensajes_chat"] = sala["mensajes_chat"][-50:]
         
-    # Persistir tanto en la DB (si está habilitada) como en el fallback JSON
-    try:
-        db_store.set_sala(codigo, sala)
-        # Mantener sincronizado el cache local para otros eventos en tiempo real
-        state_store.set_sala(codigo, sala)
-    except Exception:
-        # Si falla el guardado en DB, al menos persistimos en disco
-        state_store.set_sala(codigo, sala)
-        state_store.save()
+    # Escritura diferida: los mensajes se agrupan en el próximo flush del cache
+    room_cache.set_sala(codigo, sala, evento="chat", campos=["mensajes_chat"])
     
-    socketio.emit("nuevo_mensaje_chat", msg_obj, room=codigo)
+    room_emitter.emit("nuevo_mensaje_chat", msg_obj, codigo)
     
     # Log para admin
-    print(f"💬 [CHAT] {jugador} en {codigo}: {mensaje}")
+    logger.info("💬 [CHAT] %s en %s: %s", jugador, codigo, mensaje, extra={"muestreo": "chat"})
 
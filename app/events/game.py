@@ -1,303 +1,212 @@
 from app import socketio
 from flask import request
-from app.services.state_store import state_store
 from app.services.db_store import db_store
+from app.services.ia_gateway import ia_gateway
+from app.services.metrics import SOCKETS_CONECTADOS, medir_evento
+from app.services.room_actor import room_actor
+from app.services.room_cache import room_cache
+from app.services.room_emitter import room_emitter
+from app.services.room_reaper import room_reaper
+from app.services.state_store import state_store
+from app.services.timer_scheduler import timer_scheduler
 from app.utils.helpers import get_client_ip
-from openai import OpenAI
-import inspect
-import json
+from app.utils.round_clock import (
+    calcular_tiempo_restante, deadline_efectivo, detener_reloj, estado_reloj,
+    iniciar_reloj, pausar_reloj, reanudar_reloj,
+)
+from app.utils.round_results import codificar_resultados, descartar
+from app.utils.room_state import (
+    CAMPO_VERSION, DESCONECTADO, LISTO, UNIDO, nueva_version, registrar_delta,
+    snapshot_sala, version,
+)
+from app.services.validation import VEREDICTO_RESPALDO, normalizar_respuesta, validar_respuestas
+import logging
 import os
 import random
 import string
-import threading
 import time
 
-# Mapeos en memoria (esto debería moverse a Redis también eventualmente)
-sid_to_room = {}
-sid_to_name = {}
-sid_to_player_id = {}
-player_id_to_sid = {}
+logger = logging.getLogger(__name__)
+
+# Las sesiones sid -> (sala, jugador) viven en state_store (Redis si hay varios workers)
 iniciando_partida = set()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-openai_client = None
-OPENAI_AVAILABLE = False
+# Rate limiting (en memoria local por ahora)
+last_request_times = {}
 
+# Tras el BASTA los clientes mandan sus respuestas: se espera a los conectados hasta este plazo
+PLAZO_RESPUESTAS = float(os.getenv("RONDA_PLAZO_RESPUESTAS", "3"))
 
-def _init_openai_client():
-    """Inicializa el cliente de OpenAI tolerando versiones sin soporte de proxy."""
-    global openai_client, OPENAI_AVAILABLE
 
-    if not OPENAI_API_KEY:
-        print("⚠️ OPENAI_API_KEY no configurada, se usará validación básica")
-        return
+def generar_letra():
+    """Genera una letra aleatoria (excluye caracteres especiales)."""
+    return random.choice(string.ascii_uppercase)
 
-    kwargs = {"api_key": OPENAI_API_KEY}
-    proxy_url = os.getenv("OPENAI_PROXY") or os.getenv("HTTPS_PROXY") or os.getenv("HTTP_PROXY")
-    if proxy_url:
-        # Solo agregar proxies si la versión del cliente lo soporta
-        if "proxies" in inspect.signature(OpenAI).parameters:
-            kwargs["proxies"] = proxy_url
-        else:
-            print("⚠️ Cliente OpenAI no soporta proxies; se inicializará sin proxy")
 
-    try:
-        openai_client = OpenAI(**kwargs)
-        OPENAI_AVAILABLE = True
-        print(f"✅ OpenAI habilitado para validación (modelo: {OPENAI_MODEL})")
-    except TypeError as e:
-        # Algunos entornos inyectan proxies automáticamente; reintentar sin ellos
-        if "proxies" in kwargs:
-            print(f"⚠️ OpenAI rechazó proxies ({e}); reintentando sin proxy")
-            kwargs.pop("proxies", None)
-            try:
-                openai_client = OpenAI(**kwargs)
-                OPENAI_AVAILABLE = True
-                print(f"✅ OpenAI habilitado para validación sin proxy (modelo: {OPENAI_MODEL})")
-                return
-            except Exception as inner:
-                print(f"⚠️ No se pudo inicializar OpenAI tras reintentar sin proxy: {inner}")
-                return
-        print(f"⚠️ No se pudo inicializar OpenAI: {e}")
-    except Exception as e:
-        print(f"⚠️ No se pudo inicializar OpenAI: {e}")
+def _emitir_ticks(ticks):
+    """Emite en una sola pasada el update_timer de todas las salas vencidas."""
+    for codigo, tiempo_restante in ticks:
+        room_emitter.emit("update_timer", {"tiempo": tiempo_restante, "pausada": False}, codigo)
 
 
-_init_openai_client()
+def _expirar_ronda(codigo):
+    """El deadline de la sala se cumplió: BASTA automático y validación."""
+    with room_actor.turno(codigo):
+        finalizar_ronda(codigo)
 
-# Rate limiting (en memoria local por ahora)
-last_request_times = {}
-round_timers = {}
-timer_lock = threading.Lock()
 
-# Palabras prohibidas básicas para la validación de respuestas/chat
-PALABRAS_PROHIBIDAS = {
-    "puta", "mierda", "pendejo", "idiota", "estupido", "imbecil",
-    "cabrón", "cabron", "culero", "chingada", "fuck", "bitch"
-}
+timer_scheduler.configure(socketio, on_tick=_emitir_ticks, on_expire=_expirar_ronda)
+ia_gateway.configure(socketio)
+room_emitter.configure(socketio)
 
 
-def generar_letra():
-    """Genera una letra aleatoria (excluye caracteres especiales)."""
-    return random.choice(string.ascii_uppercase)
+def _cerrar_sala_expirada(codigo):
+    """La sala expiró: sacar de la sala de Socket.IO a los clientes que queden."""
+    room_emitter.descartar(codigo)
+    socketio.close_room(codigo)
+    descartar(codigo)
 
 
-def iniciar_temporizador(codigo):
-    """Inicia un temporizador en segundo plano que emite updates al cliente."""
+def _purgar_rate_limits(ahora, antiguedad=600):
+    """Quita los rate limits de sids sin solicitudes recientes (desconexiones perdidas)."""
+    viejos = [
+        sid for sid, acciones in list(last_request_times.items())
+        if max(acciones.values(), default=0) < ahora - antiguedad
+    ]
+    for sid in viejos:
+        last_request_times.pop(sid, None)
 
-    def _tick():
-        while True:
-            time.sleep(1)
 
-            sala = db_store.get_sala(codigo)
-            if not sala:
-                break
+room_reaper.al_expirar(_cerrar_sala_expirada)
+room_reaper.registrar_limpieza(_purgar_rate_limits)
+room_reaper.configure(socketio)
 
-            # Si ya se activó BASTA, detenemos el temporizador
-            if sala.get("basta_activado"):
-                break
 
-            if sala.get("pausada"):
-                continue
+def iniciar_temporizador(codigo, sala=None):
+    """Registra la sala en el planificador central usando su deadline persistido."""
+    if timer_scheduler.is_active(codigo):
+        return
 
-            tiempo_restante = max(0, int(sala.get("tiempo_restante", 0)) - 1)
-            sala["tiempo_restante"] = tiempo_restante
-            try:
-                db_store.set_sala(codigo, sala)
-                state_store.set_sala(codigo, sala)
-            except Exception:
-                pass
-
-            socketio.emit(
-                "update_timer",
-                {"tiempo": tiempo_restante, "pausada": sala.get("pausada", False)},
-                room=codigo,
-            )
-
-            if tiempo_restante <= 0:
-                socketio.emit("basta_triggered", {"codigo": codigo}, room=codigo)
-                finalizar_ronda(codigo)
-                break
+    sala = sala or room_cache.get_sala(codigo)
+    if not sala or sala.get("pausada") or sala.get("basta_activado"):
+        return
 
-        with timer_lock:
-            round_timers.pop(codigo, None)
+    deadline = deadline_efectivo(sala)
+    if deadline is None:
+        # Salas antiguas sin deadline: partir del último valor guardado
+        deadline = time.time() + int(sala.get("tiempo_restante", 0))
 
-    with timer_lock:
-        if codigo in round_timers:
-            return
-        t = threading.Thread(target=_tick, daemon=True)
-        round_timers[codigo] = t
-        t.start()
-
-
-def _contiene_palabras_prohibidas(texto: str) -> bool:
-    texto_normalizado = ''.join(ch for ch in texto.lower() if ch.isalpha() or ch == ' ')
-    for palabra in PALABRAS_PROHIBIDAS:
-        if palabra in texto_normalizado:
-            return True
-    return False
-
-
-def generar_prompt_validacion(respuesta, categoria, letra):
-    return (
-        "Estás validando respuestas del juego Basta / Stop. "
-        "Reglas: la palabra debe empezar con la letra indicada, debe pertenecer a la categoría, "
-        "no debe ser ofensiva ni inventada. Devuelve solo JSON.\n"
-        f"Letra de la ronda: {letra}.\n"
-        f"Categoría: {categoria}.\n"
-        f"Respuesta: {respuesta}.\n"
-        "Responde SOLO \"SI\" o \"NO\" seguido de una razón breve.\n"
-        'Formato: "SI - razón" o "NO - razón"'
-    )
+    timer_scheduler.schedule(codigo, deadline)
 
 
-def validar_respuesta_con_ia(respuesta, categoria, letra):
-    """
-    Valida una respuesta usando IA de OpenAI
-    Retorna: (es_valida: bool, razon: str, confianza: float)
-    """
+def pausar_ronda(codigo, pausada=True):
+    """Pausa o reanuda el reloj de la sala y persiste la transición."""
+    with room_actor.turno(codigo):
+        sala = room_cache.get_sala(codigo)
+        if not sala or not sala.get("en_curso") or sala.get("basta_activado"):
+            return None
 
-    # No validar respuestas vacías (ya se filtran antes)
-    if not respuesta or len(respuesta.strip()) < 2:
-        return False, "Respuesta demasiado corta", 1.0
-
-    respuesta_limpia = respuesta.strip()
-    respuesta_lower = respuesta_limpia.lower()
-
-    # Filtro de palabras prohibidas y letra inicial
-    if _contiene_palabras_prohibidas(respuesta_limpia):
-        return False, "Lenguaje inapropiado", 1.0
-    if letra and respuesta_limpia[0].upper() != letra.upper():
-        return False, f"Debe iniciar con la letra {letra.upper()}", 1.0
-
-    # Detectar respuestas obviamente inválidas
-    if len(set(respuesta_lower)) <= 2:  # Ej: "ññññññ", "aaaaa", "sis"
-        return False, "Respuesta sin sentido (caracteres repetidos)", 1.0
-
-    # Detectar palabras que parecen inventadas o sin sentido (patrones comunes)
-    # Palabras muy cortas sin sentido (menos de 3 caracteres, excepto si son nombres comunes)
-    if len(respuesta_limpia) < 3:
-        if categoria.lower() not in ["nombre"]:  # Permitir nombres cortos como "Ana", "Luis"
-            return False, "Respuesta demasiado corta o sin sentido", 1.0
-
-    # Detectar combinaciones de letras que no forman palabras reconocibles
-    # Patrones como "asdas", "sasd", "sonso", etc.
-    if len(respuesta_limpia) >= 4:
-        # Verificar si parece una palabra inventada (muchas consonantes seguidas o patrones extraños)
-        vocales = set('aeiouáéíóúü')
-        consonantes_seguidas = 0
-        max_consonantes = 0
-        for char in respuesta_lower:
-            if char not in vocales and char.isalpha():
-                consonantes_seguidas += 1
-                max_consonantes = max(max_consonantes, consonantes_seguidas)
-            else:
-                consonantes_seguidas = 0
-
-        # Si tiene 3 o más consonantes seguidas, probablemente es inventada
-        if max_consonantes >= 3:
-            return False, "Palabra no reconocible o inventada", 1.0
-
-        # Detectar patrones comunes de palabras inventadas
-        # Palabras que terminan en consonantes poco comunes o tienen patrones extraños
-        patrones_inventados = ["asd", "sasd", "asdas", "qwerty", "zxcv", "hjkl", "fghj"]
-        if any(patron in respuesta_lower for patron in patrones_inventados):
-            return False, "Palabra no reconocible o inventada", 1.0
-
-        # Detectar palabras que parecen combinaciones aleatorias (muchas consonantes alternadas)
-        # Ej: "sasd", "asdas" tienen patrones CVCV o VCVCV que no son comunes en español
-        if len(respuesta_limpia) == 4 or len(respuesta_limpia) == 5:
-            # Contar vocales y consonantes
-            num_vocales = sum(1 for c in respuesta_lower if c in vocales)
-            num_consonantes = sum(1 for c in respuesta_lower if c.isalpha() and c not in vocales)
-
-            # Si tiene muy pocas vocales para su longitud, probablemente es inventada
-            if num_vocales == 0 and num_consonantes >= 3:
-                return False, "Palabra no reconocible o inventada", 1.0
-
-            # Si tiene un patrón muy regular CVCV o VCVCV y no es una palabra común, rechazar
-            # (esto es una heurística, pero ayuda a detectar "sasd", "asdas")
-            if num_vocales == num_consonantes and num_vocales <= 2:
-                # Verificar si es una palabra común en español (lista básica)
-                palabras_comunes_4_5 = {"casa", "mesa", "gato", "perro", "agua", "libro", "carta", "plato", "vaso", "silla", "mesa", "cama", "pelo", "mano", "pie", "ojo", "cara", "boca", "nariz", "diente", "brazo", "pierna", "hueso", "piel", "sangre", "hueso", "carne", "pan", "leche", "huevo", "queso", "azul", "rojo", "verde", "negro", "blanco", "gris", "amarillo", "rosa", "marrón", "naranja", "morado", "celeste", "verde", "azul"}
-                if respuesta_lower not in palabras_comunes_4_5:
-                    # Si no está en la lista y tiene un patrón sospechoso, rechazar
-                    # (esto es conservador pero ayuda a detectar palabras inventadas)
-                    pass  # No rechazar automáticamente, dejar que la IA decida
-
-    # Detectar palabras que son verbos comunes cuando no corresponde
-    verbos_comunes = {"salir", "entrar", "comer", "beber", "dormir", "hablar", "hacer", "decir", "ir", "venir", "ver", "saber", "poder", "querer", "tener", "estar", "ser"}
-    if respuesta_lower in verbos_comunes:
-        if categoria.lower() not in ["verbo", "acción"]:
-            return False, f"'{respuesta_limpia}' es un verbo, no corresponde a la categoría", 1.0
-
-    # USAR OPENAI (si está disponible)
-    if OPENAI_AVAILABLE and openai_client:
+        if pausada:
+            timer_scheduler.cancel(codigo)
+            pausar_reloj(sala)
+        else:
+            reanudar_reloj(sala)
+            sala["tiempo_restante"] = calcular_tiempo_restante(sala)
+
+        room_cache.set_sala(codigo, sala, evento="pausa")
+
+        if not pausada:
+            iniciar_temporizador(codigo, sala)
+
+        room_emitter.emit(
+            "ronda_pausada",
+            {
+                "pausada": pausada,
+                "mensaje": "Ronda pausada por administrador" if pausada else "Ronda reanudada",
+                **estado_reloj(sala),
+            },
+            codigo,
+        )
+        return sala
+
+
+
+def _esperar_respuestas(codigo, ronda):
+    """Tras el BASTA, espera las respuestas de los conectados (hasta PLAZO_RESPUESTAS) y evalúa."""
+    limite = time.time() + PLAZO_RESPUESTAS
+    try:
+        while time.time() < limite:
+            sala = room_cache.get_sala(codigo)
+            if not sala or sala.get("ronda_actual", 1) != ronda:
+                return
+            desconectados = sala.get("jugadores_desconectados", [])
+            recibidas = sala.get("respuestas_ronda") or {}
+            if all(j in recibidas for j in sala.get("jugadores", []) if j not in desconectados):
+                break
+            socketio.sleep(0.1)
+
+        _evaluar_respuestas(codigo, ronda)
+    except Exception as e:
+        # La sala ya quedó con basta_activado: sin resultados no avanza nunca
+        logger.error("❌ Error evaluando la ronda %s de la sala %s: %s", ronda, codigo, e)
         try:
-            # Usar prompt mejorado (adaptado para JSON)
-            prompt_base = generar_prompt_validacion(respuesta, categoria, letra)
-            # Cambiar el formato de respuesta para JSON
-            prompt = prompt_base.replace(
-                'Responde SOLO "SI" o "NO" seguido de una razón breve.\nFormato: "SI - razón" o "NO - razón"',
-                'Responde SOLO con formato JSON:\n{"valida": true/false, "razon": "explicación breve", "confianza": 0.0-1.0}'
-            )
-
-            response = openai_client.chat.completions.create(
-                model=OPENAI_MODEL or "gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Eres un validador experto de juegos de palabras. Responde solo con JSON."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.3,
-                max_tokens=150,
-                timeout=5,
-            )
-
-            print(
-                f"📨 Enviando a OpenAI (modelo {OPENAI_MODEL}) la respuesta '{respuesta_limpia}' para categoria '{categoria}' con letra '{letra}'"
-            )
-
-            # Parsear respuesta
-            resultado_texto = response.choices[0].message.content.strip()
-
-            print(f"📨 Respuesta bruta de OpenAI: {resultado_texto}")
-
-            # Extraer JSON (puede venir con ```json o sin formato)
-            if "```json" in resultado_texto:
-                resultado_texto = resultado_texto.split("```json")[1].split("```")[0]
-            elif "```" in resultado_texto:
-                resultado_texto = resultado_texto.split("```")[1].split("```")[0]
-
-            resultado = json.loads(resultado_texto.strip())
-
-            es_valida = resultado.get("valida", False)
-            razon = resultado.get("razon", "Sin razón especificada")
-            confianza = resultado.get("confianza", 0.5)
-
-            print(f"🤖 OpenAI validó '{respuesta}' ({categoria}): {'✓' if es_valida else '✗'} - {razon}")
-
-            return es_valida, razon, confianza
-
-        except json.JSONDecodeError as e:
-            print(f"❌ Error parseando JSON de OpenAI: {e}")
-            return True, "Error al procesar validación IA", 0.3
+            _evaluar_respuestas(codigo, ronda, con_ia=False)
         except Exception as e:
-            print(f"❌ Error en OpenAI: {e}")
-            return True, "Error de validación IA", 0.3
+            logger.error("❌ No se pudo puntuar la ronda %s de la sala %s: %s", ronda, codigo, e)
 
-    # Si OpenAI no está disponible, usar validación básica
-    print(f"⚠️ OpenAI no disponible. Validación básica: '{respuesta}' ({'✓' if respuesta_limpia else '✗'})")
-    # Validación básica: solo verificar que no esté vacía y empiece con la letra correcta
-    return True, "Validación básica (IA no disponible)", 0.5
 
+def _evaluar_respuestas(codigo, ronda, con_ia=True):
+    """Evalúa las respuestas con IA (y reglas básicas como respaldo).
+
+    con_ia=False puntúa todas con el veredicto de respaldo (reintento tras un error)."""
+    # Las respuestas se toman en el turno de la sala; la IA corre fuera de él
+    # para no frenar el resto de los eventos de la sala
+    with room_actor.turno(codigo):
+        sala = room_cache.get_sala(codigo)
+        if not sala or sala.get("ronda_actual", 1) != ronda or sala.get("last_results"):
+            return
+        letra_ronda = (sala.get("letra") or "").upper()
+        categorias = list(sala.get("categorias", []))
+        jugadores = list(sala.get("jugadores", []))
+        validacion_activa = sala.get("validacion_activa", True)
+        respuestas = {
+            jugador: dict(por_categoria)
+            for jugador, por_categoria in (sala.get("respuestas_ronda") or {}).items()
+            if isinstance(por_categoria, dict)
+        }
+
+    # Validar todas las respuestas de la ronda de una vez (deduplicadas, en lotes y en paralelo)
+    veredictos = {}
+    if validacion_activa:
+        pares = [
+            (categoria, (respuestas.get(jugador, {}).get(categoria) or "").strip())
+            for jugador in jugadores
+            for categoria in categorias
+        ]
+        pares = [p for p in pares if p[1]]
+        if con_ia:
+            try:
+                veredictos = validar_respuestas(pares, letra_ronda)
+            except Exception as e:
+                logger.error("❌ Error validando respuestas de la sala %s: %s", codigo, e)
+                con_ia = False
+        if not con_ia:
+            veredictos = {(c, normalizar_respuesta(r)): VEREDICTO_RESPALDO for c, r in pares}
+
+    with room_actor.turno(codigo):
+        sala = room_cache.get_sala(codigo)
+        if not sala or sala.get("ronda_actual", 1) != ronda or sala.get("last_results"):
+            return
+        payload, validaciones_ia, puntos_por_respuesta = _puntuar_ronda(
+            codigo, sala, categorias, respuestas, veredictos
+        )
+
+    # Veredictos por respuesta en round_answers (consultas entre salas)
+    db_store.registrar_veredictos(codigo, payload["ronda"], validaciones_ia, puntos_por_respuesta)
 
-def _evaluar_respuestas(sala, codigo):
-    """Evalúa las respuestas con IA (y reglas básicas como respaldo)."""
-    letra_ronda = (sala.get("letra") or "").upper()
-    categorias = sala.get("categorias", [])
-    respuestas = sala.get("respuestas_ronda", {})
 
+def _puntuar_ronda(codigo, sala, categorias, respuestas, veredictos):
+    """Suma los puntos, publica round_results y avanza la ronda (en el turno de la sala)."""
     validaciones_ia = {}
     puntos_por_respuesta = {}
     scores_ronda = {}
@@ -308,7 +217,7 @@ def _evaluar_respuestas(sala, codigo):
         total_jugador = 0
 
         for categoria in categorias:
-            respuesta = respuestas.get(jugador, {}).get(categoria, "").strip()
+            respuesta = (respuestas.get(jugador, {}).get(categoria) or "").strip()
             razon = None
             es_valida = False
 
@@ -316,7 +225,9 @@ def _evaluar_respuestas(sala, codigo):
                 razon = "Respuesta vacía"
             else:
                 if sala.get("validacion_activa", True):
-                    es_valida, razon, _ = validar_respuesta_con_ia(respuesta, categoria, letra_ronda)
+                    es_valida, razon, _ = veredictos.get(
+                        (categoria, normalizar_respuesta(respuesta)), (False, "Sin validar", None)
+                    )
                 else:
                     es_valida = True
                     razon = "Validación desactivada"
@@ -333,20 +244,9 @@ def _evaluar_respuestas(sala, codigo):
         scores_ronda[jugador] = total_jugador
         sala.setdefault("puntuaciones", {})[jugador] = sala.get("puntuaciones", {}).get(jugador, 0) + total_jugador
 
-    scores_total = sala.get("puntuaciones", {})
-
-    payload = {
-        "codigo": codigo,
-        "ronda": sala.get("ronda_actual", 1),
-        "respuestas": respuestas,
-        "validaciones_ia": validaciones_ia,
-        "puntos_por_respuesta": puntos_por_respuesta,
-        "scores_ronda": scores_ronda,
-        "scores_total": scores_total,
-        "puntuaciones_totales": scores_total,
-        "anfitrion": sala.get("anfitrion"),
-        "modo_juego": sala.get("modo_juego", "clasico"),
-    }
+    payload = codificar_resultados(
+        codigo, sala, categorias, respuestas, validaciones_ia, puntos_por_respuesta, scores_ronda
+    )
 
     # Detectar fin del juego
     if sala.get("ronda_actual", 1) >= sala.get("rondas", 1):
@@ -357,38 +257,50 @@ def _evaluar_respuestas(sala, codigo):
         sala["ronda_actual"] = sala.get("ronda_actual", 1) + 1
 
     sala["last_results"] = payload
+    # Los puntajes llegan en round_results; la sala de espera se resincroniza por versión
+    nueva_version(sala)
 
-    db_store.set_sala(codigo, sala)
-    state_store.set_sala(codigo, sala)
+    room_cache.set_sala(codigo, sala, evento="resultados")
 
-    socketio.emit("round_results", payload, room=codigo)
+    # El dict compacto va tal cual: Socket.IO lo serializa una vez por emisión
+    room_emitter.emit("round_results", payload, codigo)
+    return payload, validaciones_ia, puntos_por_respuesta
 
 
 def finalizar_ronda(codigo):
-    """Marca la ronda como finalizada y dispara la validación básica."""
-    sala = db_store.get_sala(codigo) or state_store.get_sala(codigo)
+    """BASTA (manual o por tiempo): detiene el reloj y programa la validación.
+
+    Llamar en el turno de la sala (room_actor)."""
+    sala = room_cache.get_sala(codigo)
     if not sala:
         return
 
     if sala.get("basta_activado"):
         # Si ya se procesó, re-emitir resultados si existen para clientes rezagados
         if sala.get("last_results"):
-            socketio.emit("round_results", sala["last_results"], room=codigo)
+            room_emitter.emit("round_results", sala["last_results"], codigo)
+        return
+
+    timer_scheduler.cancel(codigo)
+
+    # Con varios workers cada uno puede tener armado el reloj de la sala:
+    # solo el primero que reclama la ronda la finaliza
+    if not state_store.reclamar(f"fin_ronda:{codigo}:{sala.get('ronda_actual', 1)}:{sala.get('inicio_ronda')}", 300):
         return
 
     sala["basta_activado"] = True
     sala["en_curso"] = False
-    sala["pausada"] = False
-    sala["tiempo_restante"] = 0
+    detener_reloj(sala)
 
-    db_store.set_sala(codigo, sala)
-    state_store.set_sala(codigo, sala)
+    room_cache.set_sala(codigo, sala, evento="fin_ronda")
 
-    threading.Thread(target=_evaluar_respuestas, args=(sala, codigo), daemon=True).start()
+    # Los clientes responden al basta_triggered enviando sus respuestas
+    room_emitter.emit("basta_triggered", {"codigo": codigo}, codigo)
+    socketio.start_background_task(_esperar_respuestas, codigo, sala.get("ronda_actual", 1))
 
 def preparar_ronda(codigo, sala=None):
     """Inicializa los datos de la ronda y arranca el temporizador."""
-    sala = sala or db_store.get_sala(codigo)
+    sala = sala or room_cache.get_sala(codigo)
     if not sala:
         return
 
@@ -396,37 +308,37 @@ def preparar_ronda(codigo, sala=None):
     sala["finalizada"] = False
     sala["pausada"] = False
     sala["basta_activado"] = False
-    sala["tiempo_restante"] = sala.get("tiempo_por_ronda", 180)
+    iniciar_reloj(sala, sala.get("tiempo_por_ronda", 180))
     sala["letra"] = generar_letra()
     sala["respuestas_ronda"] = {}
     sala.pop("last_results", None)
 
-    db_store.set_sala(codigo, sala)
-    state_store.set_sala(codigo, sala)
+    room_cache.set_sala(codigo, sala, evento="inicio_ronda")
 
-    socketio.emit(
+    room_emitter.emit(
         "start_game",
         {
             "codigo": codigo,
             "letra": sala["letra"],
-            "tiempo_restante": sala["tiempo_restante"],
+            **estado_reloj(sala),
         },
-        room=codigo,
+        codigo,
     )
 
-    socketio.emit(
+    room_emitter.emit(
         "restore_state",
         {
             "letra": sala["letra"],
             "ronda": sala.get("ronda_actual", 1),
-            "tiempo_restante": sala["tiempo_restante"],
             "basta_activado": False,
             "pausada": False,
+            **estado_reloj(sala),
         },
-        room=codigo,
+        codigo,
     )
 
-    iniciar_temporizador(codigo)
+    timer_scheduler.cancel(codigo)
+    iniciar_temporizador(codigo, sala)
 
 def check_rate_limit(sid, action, cooldown=1.0):
     """Verifica si el cliente está enviando solicitudes demasiado rápido"""
@@ -443,111 +355,122 @@ def check_rate_limit(sid, action, cooldown=1.0):
     return True
 
 @socketio.on("connect")
-def on_connect():
+@medir_evento("connect")
+def on_connect(auth=None):
+    SOCKETS_CONECTADOS.inc()
     ip = get_client_ip()
-    print(f"✅ Nuevo cliente conectado desde IP: {ip}")
+    logger.info("✅ Nuevo cliente conectado desde IP: %s", ip, extra={"muestreo": "conexiones"})
 
 @socketio.on("disconnect")
+@medir_evento("disconnect")
 def on_disconnect():
+    SOCKETS_CONECTADOS.dec()
     sid = request.sid
-    codigo = sid_to_room.pop(sid, None)
-    jugador = sid_to_name.pop(sid, None)
+    codigo, jugador = state_store.cerrar_sesion(sid)
+    last_request_times.pop(sid, None)
     
     ip = get_client_ip()
     if not codigo:
-        print(f"❌ Cliente desconectado (IP: {ip})")
+        logger.info("❌ Cliente desconectado (IP: %s)", ip, extra={"muestreo": "conexiones"})
         return
 
-    sala = state_store.get_sala(codigo)
-    if not sala:
-        print(f"❌ Cliente desconectado de sala inexistente {codigo} (IP: {ip})")
-        return
-        
-    print(f"❌ {jugador} desconectado de sala {codigo} (IP: {ip})")
-    
-    # Marcar como desconectado si estaba jugando
-    if jugador in sala.get("jugadores", []):
-        if "jugadores_desconectados" not in sala:
-            sala["jugadores_desconectados"] = []
-        if jugador not in sala["jugadores_desconectados"]:
-            sala["jugadores_desconectados"].append(jugador)
-            state_store.save()
-            
-        # Notificar desconexión
-        socketio.emit("player_disconnected", {"jugador": jugador}, room=codigo)
+    with room_actor.turno(codigo):
+        sala = room_cache.get_sala(codigo)
+        if not sala:
+            logger.info("❌ Cliente desconectado de sala inexistente %s (IP: %s)", codigo, ip, extra={"muestreo": "conexiones"})
+            return
+
+        logger.info("❌ %s desconectado de sala %s (IP: %s)", jugador, codigo, ip)
+
+        # Marcar como desconectado si estaba jugando
+        if jugador in sala.get("jugadores", []):
+            if "jugadores_desconectados" not in sala:
+                sala["jugadores_desconectados"] = []
+            if jugador not in sala["jugadores_desconectados"]:
+                sala["jugadores_desconectados"].append(jugador)
+                delta = registrar_delta(sala, DESCONECTADO, jugador=jugador)
+                room_cache.set_sala(codigo, sala, evento="join",
+                                    campos=[("jugadores_desconectados", jugador), CAMPO_VERSION])
+
+                # Notificar desconexión
+                room_emitter.emit("room_delta", delta, codigo)
 
 @socketio.on("join_room_event")
+@medir_evento("join_room_event")
+@room_actor.serializado
 def handle_join(data):
     ip = get_client_ip()
     if not check_rate_limit(request.sid, "join_room", 2.0):
-        print(f"⚠️ Rate limit exceeded for join_room from {ip} ({request.sid})")
+        logger.warning("⚠️ Rate limit exceeded for join_room from %s (%s)", ip, request.sid, extra={"muestreo": "rate_limit"})
         return
 
     codigo = data.get("codigo")
     jugador = data.get("jugador", "Invitado")
+    version_cliente = data.get("version")  # None: primera conexión de la página
     
     # Validar nombre
     if not jugador or jugador in ["null", "undefined", "none"] or not str(jugador).strip():
-        print(f"⚠️ Intento de unirse con nombre inválido: {jugador} desde IP: {ip}")
+        logger.warning("⚠️ Intento de unirse con nombre inválido: %s desde IP: %s", jugador, ip)
         return
 
-    sid_to_room[request.sid] = codigo
-    sid_to_name[request.sid] = jugador
+    state_store.registrar_sesion(request.sid, codigo, jugador)
     socketio.server.enter_room(request.sid, codigo)
 
-    # Usar db_store como fuente principal para obtener datos actualizados
-    sala = db_store.get_sala(codigo)
+    sala = room_cache.get_sala(codigo)
     if not sala:
-        # Fallback a state_store si no está en db_store
-        sala = state_store.get_sala(codigo)
-        if not sala:
-            print(f"⚠️ Sala {codigo} no encontrada para join_room_event desde IP: {ip}")
-            return
+        logger.warning("⚠️ Sala %s no encontrada para join_room_event desde IP: %s", codigo, ip)
+        return
+
+    campos = _marcar_presente(sala, jugador)
+    # Primera conexión de la página: el alta por HTTP todavía no se anunció
+    if campos or version_cliente is None:
+        delta = registrar_delta(sala, UNIDO, jugador=jugador, puntos=sala["puntuaciones"].get(jugador, 0))
+        room_cache.set_sala(codigo, sala, evento="join", campos=campos + [CAMPO_VERSION])
+        socketio.emit("room_delta", delta, room=codigo, skip_sid=request.sid)
+        
+    iniciando_partida.discard(jugador)
+
+    logger.info("🟢 Jugador %s unido a sala %s (IP: %s)", jugador, codigo, ip)
+
+    # Estado completo solo para este cliente, y solo si el suyo está desactualizado
+    if version_cliente != version(sala):
+        socketio.emit("player_joined", snapshot_sala(sala), room=request.sid)
 
+
+def _marcar_presente(sala, jugador):
+    """
+    Agrega al jugador (o lo quita de desconectados); retorna los campos cambiados.
+
+    Las listas cambian por elemento: con varios workers se agrega o quita solo
+    este jugador, sin reescribir la lista que se leyó.
+    """
+    campos = []
     if jugador not in sala.get("jugadores", []):
-        sala["jugadores"].append(jugador)
-        if jugador not in sala.get("puntuaciones", {}):
-            sala["puntuaciones"][jugador] = 0
-        # Actualizar en db_store
-        try:
-            db_store.set_sala(codigo, sala)
-        except Exception as e:
-            print(f"⚠️ Error actualizando db_store en join: {e}")
-        # También actualizar state_store
-        state_store.set_sala(codigo, sala)
-        state_store.save()
+        sala.setdefault("jugadores", []).append(jugador)
+        sala.setdefault("puntuaciones", {}).setdefault(jugador, 0)
+        campos += [("jugadores", jugador), ("puntuaciones", jugador)]
     
-    # Quitar de lista de desconectados si estaba
-    if "jugadores_desconectados" in sala and jugador in sala.get("jugadores_desconectados", []):
+    if jugador in sala.get("jugadores_desconectados", []):
         sala["jugadores_desconectados"].remove(jugador)
-        
-    iniciando_partida.discard(jugador)
+        campos.append(("jugadores_desconectados", jugador))
+    return campos
 
-    print(f"🟢 Jugador {jugador} unido a sala {codigo} (IP: {ip})")
 
-    # Enviar estado actual de la sala con datos actualizados
-    socketio.emit(
-        "player_joined",
-        {
-            "jugadores": sala.get("jugadores", []),
-            "puntuaciones": sala.get("puntuaciones", {}),
-            "jugadores_listos": sala.get("jugadores_listos", []),
-            "jugadores_desconectados": sala.get("jugadores_desconectados", []),
-            "configuracion": {
-                "rondas": sala.get("rondas", 3),
-                "dificultad": sala.get("dificultad", "normal"),
-                "modo_juego": sala.get("modo_juego", "clasico"),
-                "chat_habilitado": sala.get("chat_habilitado", True),
-                "sonidos_habilitados": sala.get("sonidos_habilitados", True),
-                "powerups_habilitados": sala.get("powerups_habilitados", True),
-                "validacion_activa": sala.get("validacion_activa", True)
-            }
-        },
-        room=codigo
-    )
+@socketio.on("sync_room_state")
+@medir_evento("sync_room_state")
+def handle_sync_room_state(data):
+    """El cliente perdió un delta: enviarle el estado completo si su versión no es la actual."""
+    if not check_rate_limit(request.sid, "sync_room", 0.5):
+        return
+
+    sala = room_cache.get_sala(data.get("codigo"))
+    if sala and data.get("version") != version(sala):
+        socketio.emit("player_joined", snapshot_sala(sala), room=request.sid)
 
 
 @socketio.on("rejoin_room_event")
+@medir_evento("rejoin_room_event")
+@room_actor.serializado
 def handle_rejoin(data):
     """Permite a un jugador volver a unirse a la sala y restaura el estado."""
     codigo = data.get("codigo")
@@ -556,56 +479,39 @@ def handle_rejoin(data):
     if not codigo or not jugador:
         return
 
-    sala = db_store.get_sala(codigo)
-    if not sala:
-        sala = state_store.get_sala(codigo)
+    sala = room_cache.get_sala(codigo)
     if not sala:
         return
 
-    sid_to_room[request.sid] = codigo
-    sid_to_name[request.sid] = jugador
+    state_store.registrar_sesion(request.sid, codigo, jugador)
     socketio.server.enter_room(request.sid, codigo)
 
-    if jugador not in sala.get("jugadores", []):
-        sala.setdefault("jugadores", []).append(jugador)
-        sala.setdefault("puntuaciones", {})[jugador] = sala["puntuaciones"].get(jugador, 0)
-        db_store.set_sala(codigo, sala)
-        state_store.set_sala(codigo, sala)
+    campos = _marcar_presente(sala, jugador)
+    if campos:
+        delta = registrar_delta(sala, UNIDO, jugador=jugador, puntos=sala["puntuaciones"].get(jugador, 0))
+        room_cache.set_sala(codigo, sala, evento="rejoin", campos=campos + [CAMPO_VERSION])
+        socketio.emit("room_delta", delta, room=codigo, skip_sid=request.sid)
+
+    # Si el proceso se reinició a mitad de ronda, el deadline persistido rearma el reloj
+    if sala.get("en_curso") and not sala.get("basta_activado"):
+        iniciar_temporizador(codigo, sala)
 
     socketio.emit(
         "restore_state",
         {
             "letra": sala.get("letra", "?"),
             "ronda": sala.get("ronda_actual", 1),
-            "tiempo_restante": sala.get("tiempo_restante", 0),
             "basta_activado": sala.get("basta_activado", False),
             "pausada": sala.get("pausada", False),
+            **estado_reloj(sala),
         },
         room=request.sid,
     )
 
-    socketio.emit(
-        "player_joined",
-        {
-            "jugadores": sala.get("jugadores", []),
-            "puntuaciones": sala.get("puntuaciones", {}),
-            "jugadores_listos": sala.get("jugadores_listos", []),
-            "jugadores_desconectados": sala.get("jugadores_desconectados", []),
-            "configuracion": {
-                "rondas": sala.get("rondas", 3),
-                "dificultad": sala.get("dificultad", "normal"),
-                "modo_juego": sala.get("modo_juego", "clasico"),
-                "chat_habilitado": sala.get("chat_habilitado", True),
-                "sonidos_habilitados": sala.get("sonidos_habilitados", True),
-                "powerups_habilitados": sala.get("powerups_habilitados", True),
-                "validacion_activa": sala.get("validacion_activa", True)
-            }
-        },
-        room=codigo
-    )
-
 
 @socketio.on("host_is_starting")
+@medir_evento("host_is_starting")
+@room_actor.serializado
 def handle_host_starting(data):
     """El anfitrión inicia la partida: genera letra y temporizador."""
     codigo = data.get("codigo")
@@ -614,9 +520,7 @@ def handle_host_starting(data):
     if not codigo or not jugador:
         return
 
-    sala = db_store.get_sala(codigo)
-    if not sala:
-        sala = state_store.get_sala(codigo)
+    sala = room_cache.get_sala(codigo)
     if not sala:
         return
 
@@ -626,28 +530,26 @@ def handle_host_starting(data):
     preparar_ronda(codigo, sala)
 
 @socketio.on("player_ready")
+@medir_evento("player_ready")
+@room_actor.serializado
 def handle_player_ready(data):
     """Maneja cuando un jugador marca que está listo"""
     ip = get_client_ip()
     if not check_rate_limit(request.sid, "player_ready", 1.0):
-        print(f"⚠️ Rate limit exceeded for player_ready from {ip} ({request.sid})")
+        logger.warning("⚠️ Rate limit exceeded for player_ready from %s (%s)", ip, request.sid, extra={"muestreo": "rate_limit"})
         return
     
     codigo = data.get("codigo")
     jugador = data.get("jugador")
     
     if not codigo or not jugador:
-        print(f"⚠️ Datos incompletos en player_ready desde IP: {ip}")
+        logger.warning("⚠️ Datos incompletos en player_ready desde IP: %s", ip)
         return
     
-    # Usar db_store como fuente principal para mantener consistencia
-    sala = db_store.get_sala(codigo)
+    sala = room_cache.get_sala(codigo)
     if not sala:
-        # Si no está en db_store, intentar state_store (fallback)
-        sala = state_store.get_sala(codigo)
-        if not sala:
-            print(f"⚠️ Sala {codigo} no encontrada para player_ready desde IP: {ip}")
-            return
+        logger.warning("⚠️ Sala %s no encontrada para player_ready desde IP: %s", codigo, ip)
+        return
     
     # Inicializar jugadores_listos si no existe
     if "jugadores_listos" not in sala:
@@ -656,32 +558,17 @@ def handle_player_ready(data):
     # Agregar jugador a la lista de listos si no está
     if jugador not in sala["jugadores_listos"]:
         sala["jugadores_listos"].append(jugador)
+        delta = registrar_delta(sala, LISTO, jugador=jugador)
+        room_cache.set_sala(codigo, sala, evento="player_ready", campos=["jugadores_listos", CAMPO_VERSION])
+        logger.info("✅ Jugador %s marcado como listo en sala %s (IP: %s)", jugador, codigo, ip)
         
-        # Actualizar en db_store (fuente principal)
-        try:
-            db_store.set_sala(codigo, sala)
-            print(f"✅ Jugador {jugador} marcado como listo en sala {codigo} (IP: {ip})")
-        except Exception as e:
-            print(f"⚠️ Error actualizando db_store para player_ready: {e}")
-            # Fallback a state_store si db_store falla
-            state_store.set_sala(codigo, sala)
-            state_store.save()
-        
-        # También actualizar state_store para operaciones en tiempo real
-        state_store.set_sala(codigo, sala)
-    
-    # Notificar a todos en la sala
-    socketio.emit(
-        "player_ready_update",
-        {
-            "jugador": jugador,
-            "jugadores_listos": sala["jugadores_listos"]
-        },
-        room=codigo
-    )
+        # Notificar a todos en la sala
+        room_emitter.emit("room_delta", delta, codigo)
 
 
 @socketio.on("enviar_respuestas")
+@medir_evento("enviar_respuestas")
+@room_actor.serializado
 def handle_enviar_respuestas(data):
     """Guarda respuestas del jugador para la ronda actual."""
     codigo = data.get("codigo")
@@ -691,37 +578,44 @@ def handle_enviar_respuestas(data):
     if not codigo or not jugador:
         return
 
-    sala = db_store.get_sala(codigo) or state_store.get_sala(codigo)
+    sala = room_cache.get_sala(codigo)
     if not sala:
         return
 
+    if sala.get("last_results"):
+        # La ronda ya se puntuó (y ronda_actual avanzó): llegaron tarde
+        return
+
     sala.setdefault("respuestas_ronda", {})[jugador] = respuestas
-    db_store.set_sala(codigo, sala)
-    state_store.set_sala(codigo, sala)
+    # La ronda de las respuestas viaja con ellas: el flush diferido puede
+    # coincidir con el de resultados, que ya avanza ronda_actual
+    sala["ronda_respuestas"] = sala.get("ronda_actual", 1)
+    room_cache.set_sala(codigo, sala, evento="respuestas",
+                        campos=[("respuestas_ronda", jugador), "ronda_respuestas"])
 
 
 @socketio.on("basta_pressed")
+@medir_evento("basta_pressed")
+@room_actor.serializado
 def handle_basta_pressed(data):
     """Un jugador presionó BASTA: se detiene el reloj y se validan respuestas."""
     codigo = data.get("codigo")
     if not codigo:
         return
 
-    sala = db_store.get_sala(codigo) or state_store.get_sala(codigo)
+    sala = room_cache.get_sala(codigo)
     if not sala:
         return
 
     # Evitar múltiples activaciones
     if sala.get("basta_activado"):
+        # Rezagado: solo él recibe los resultados (ya se enviaron a la sala)
         if sala.get("last_results"):
-            socketio.emit("round_results", sala["last_results"], room=codigo)
+            socketio.emit("round_results", sala["last_results"], room=request.sid)
         return
 
-    sala["basta_activado"] = True
-    sala["tiempo_restante"] = 0
-    db_store.set_sala(codigo, sala)
-    state_store.set_sala(codigo, sala)
+    if not sala.get("en_curso"):
+        return
 
-    socketio.emit("basta_triggered", {"codigo": codigo}, room=codigo)
     finalizar_ronda(codigo)
 
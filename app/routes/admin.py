@@ -1,17 +1,59 @@
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify, make_response
 from app.utils.helpers import (
-    require_admin_auth, get_client_ip, check_ip_blocked, 
+    require_admin_auth, require_metrics_auth, get_client_ip, check_ip_blocked, 
     record_failed_attempt, reset_attempts, hash_password, 
     ADMIN_PASSWORD_HASH, generate_admin_token, ADMIN_SESSION_DURATION, 
     BLOCK_DURATION_MINUTES, verify_admin_token, VALID_ADMIN_TOKENS
 )
 from app.services.state_store import state_store
-from app.utils.logger import server_logs
+from app.services.db_store import db_store
+from app.services.verdict_cache import verdict_cache
+from app.services.ia_gateway import ia_gateway
+from app.services.metrics import CONTENT_TYPE, metricas
+from app.services.room_actor import room_actor
+from app.services.room_emitter import room_emitter
+from app.services.room_index import ESTADOS
+from app.services.room_reaper import room_reaper
+from app.utils.logger import logs_desde, server_logs, ultimo_seq
 import hmac
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 admin_bp = Blueprint('admin', __name__)
 
+# Paginación de /api/admin/salas
+LIMITE_SALAS = 50
+LIMITE_SALAS_MAX = 200
+# Máximo de líneas de log por respuesta incremental
+LIMITE_LOGS = 500
+
+
+def _salas_por_estado():
+    agregados = state_store.get_agregados()
+    return {
+        **{campo: valor for campo, valor in agregados.items() if campo != "por_estado"},
+        **{f"estado_{estado}": n for estado, n in agregados["por_estado"].items()},
+    }
+
+
+# Lo que ya cuentan los servicios se lee recién al consultar /metrics
+# (sin la configuración fija: tamaños, intervalos y TTL no son series)
+metricas.recolector("salas", _salas_por_estado, excluir=("version",))
+metricas.recolector("db_pool", db_store.get_pool_metrics,
+                    contadores=("checkouts_total", "connects_total", "timeouts_total"),
+                    excluir=("pool_size", "max_overflow"))
+metricas.recolector("validaciones_cache", verdict_cache.stats,
+                    contadores=("hits_memoria", "hits_persistente", "misses"))
+metricas.recolector("ia_gateway", ia_gateway.stats,
+                    contadores=("completadas", "fallidas", "reintentos", "rechazadas"),
+                    excluir=("max_concurrencia",))
+metricas.recolector("reaper", room_reaper.stats, contadores=("expiradas", "archivadas"),
+                    excluir=("intervalo", "ttl_finalizada", "ttl_abandonada", "ttl_inactiva"))
+metricas.recolector("emisor", room_emitter.get_stats, contadores=("eventos", "frames", "reemplazados"))
+metricas.recolector("actor", room_actor.get_stats, contadores=("comandos", "esperas"))
+
 @admin_bp.route("/admin")
 def admin_panel():
     """Panel de administración - requiere autenticación"""
@@ -64,12 +106,12 @@ def admin_login():
             secure=False,  # Cambiar a True en producción con HTTPS
             samesite='Lax'  # Protección CSRF
         )
-        print(f"✅ [ADMIN] Login exitoso desde IP: {client_ip}")
+        logger.info("✅ [ADMIN] Login exitoso desde IP: %s", client_ip)
         return response
     else:
         # Login fallido
         record_failed_attempt(client_ip)
-        print(f"⚠️ [ADMIN] Intento de login fallido desde IP: {client_ip}")
+        logger.warning("⚠️ [ADMIN] Intento de login fallido desde IP: %s", client_ip)
         
         return jsonify({
             "ok": False, 
@@ -83,7 +125,7 @@ def admin_logout():
     token = request.cookies.get("admin_token")
     if token and token in VALID_ADMIN_TOKENS:
         VALID_ADMIN_TOKENS.discard(token)
-        print(f"🔓 [ADMIN] Sesión cerrada, token invalidado")
+        logger.info("🔓 [ADMIN] Sesión cerrada, token invalidado")
     
     response = redirect("/")
     response.set_cookie("admin_token", "", max_age=0, httponly=True)
@@ -93,66 +135,152 @@ def admin_logout():
 @admin_bp.route("/api/admin/salas", methods=["GET"])
 @require_admin_auth
 def get_all_salas():
-    """Obtener todas las salas activas (solo admin)"""
-    salas = state_store.get_all_salas()
-    salas_info = []
-    
-    for codigo, sala in salas.items():
-        # Filtrar jugadores desconectados de la lista
-        jugadores_activos = [
-            j for j in sala.get("jugadores", []) 
-            if j not in sala.get("jugadores_desconectados", [])
-        ]
-        
-        salas_info.append({
-            "codigo": codigo,
-            "anfitrion": sala.get("anfitrion"),
-            "jugadores": jugadores_activos,
-            "estado": sala.get("estado", "espera"),
-            "ronda_actual": sala.get("ronda_actual", 1),
-            "total_rondas": sala.get("rondas", 1),
-            "modo_juego": sala.get("modo_juego", "clasico"),
-            "en_curso": sala.get("en_curso", False),
-            "pausada": sala.get("pausada", False),
-            "num_mensajes": len(sala.get("mensajes_chat", []))
-        })
-    
+    """Salas del sistema paginadas (?estado=espera|en_curso|pausada|finalizada&offset=&limite=)"""
+    estado = request.args.get("estado") or None
+    if estado and estado not in ESTADOS:
+        return jsonify({"ok": False, "error": f"Estado inválido: {estado}"}), 400
+
+    offset = max(0, request.args.get("offset", 0, type=int))
+    limite = min(max(1, request.args.get("limite", LIMITE_SALAS, type=int)), LIMITE_SALAS_MAX)
+
+    # Solo el índice: no se cargan las salas
+    total, salas_info = state_store.listar_salas(estado, offset, limite)
+
     return jsonify({
         "ok": True,
         "salas": salas_info,
-        "total_salas": len(salas_info)
+        "total_salas": total,
+        "offset": offset,
+        "limite": limite,
+        "hay_mas": offset + len(salas_info) < total
+    })
+
+@admin_bp.route("/api/admin/sala/<codigo>/pausar", methods=["POST"])
+@require_admin_auth
+def pausar_sala(codigo):
+    """Pausa o reanuda la ronda en curso (body opcional {"pausada": bool}; sin él alterna)"""
+    # Import local: app.events.game registra handlers de Socket.IO al importarse
+    from app.events.game import pausar_ronda
+    from app.services.room_cache import room_cache
+
+    pausada = (request.get_json(silent=True) or {}).get("pausada")
+    if pausada is None:
+        sala = room_cache.get_sala(codigo)
+        if not sala:
+            return jsonify({"ok": False, "error": "Sala no encontrada"}), 404
+        pausada = not sala.get("pausada", False)
+
+    sala = pausar_ronda(codigo, bool(pausada))
+    if sala is None:
+        return jsonify({"ok": False, "error": "La sala no tiene una ronda en curso"}), 400
+
+    logger.info("⏸️ Admin %s la sala %s", "pausó" if sala.get("pausada") else "reanudó", codigo)
+    return jsonify({
+        "ok": True,
+        "pausada": bool(sala.get("pausada")),
+        "tiempo_restante": sala.get("tiempo_restante"),
+        "message": "Ronda pausada" if sala.get("pausada") else "Ronda reanudada",
     })
 
 @admin_bp.route("/api/admin/logs", methods=["GET"])
 @require_admin_auth
 def admin_get_logs():
-    """Obtener logs del servidor en tiempo real"""
+    """Logs del servidor; con ?desde=<seq> solo las líneas posteriores a ese cursor"""
+    if "desde" not in request.args:
+        return jsonify({
+            "ok": True,
+            "logs": list(server_logs)
+        })
+
+    desde = request.args.get("desde", 0, type=int)
+    logs, reinicio = logs_desde(desde, LIMITE_LOGS)
     return jsonify({
         "ok": True,
-        "logs": list(server_logs)
+        "logs": logs,
+        "reinicio": reinicio,
+        "seq": _cursor_logs(desde, logs, reinicio)
     })
 
+
+@admin_bp.route("/api/admin/telemetria", methods=["GET"])
+@require_admin_auth
+def get_telemetria():
+    """
+    Lo que cambió desde el último poll del panel: líneas de log posteriores
+    al cursor `desde` y las estadísticas solo si su `version` cambió.
+    Sin actividad la respuesta no trae datos.
+    """
+    desde = request.args.get("desde", 0, type=int)
+    logs, reinicio = logs_desde(desde, LIMITE_LOGS)
+    respuesta = {
+        "ok": True,
+        "logs": logs,
+        "reinicio": reinicio,
+        "seq": _cursor_logs(desde, logs, reinicio)
+    }
+
+    estadisticas = state_store.get_agregados()
+    if str(estadisticas["version"]) != request.args.get("version"):
+        respuesta["estadisticas"] = estadisticas
+    return jsonify(respuesta)
+
+
+def _cursor_logs(desde, logs, reinicio):
+    """Próximo `desde` del cliente"""
+    if logs:
+        return logs[-1]["seq"]
+    return ultimo_seq() if reinicio else desde
+
 @admin_bp.route("/api/admin/estadisticas", methods=["GET"])
 @require_admin_auth
 def get_estadisticas():
-    """Obtener estadísticas del sistema"""
-    salas = state_store.get_all_salas()
-    
-    # Calcular estadísticas
-    salas_activas = sum(1 for sala in salas.values() if sala.get("en_curso", False))
-    total_mensajes = sum(len(sala.get("mensajes_chat", [])) for sala in salas.values())
-    
-    # Contar jugadores únicos (aproximado, mejor lógica requerida si usamos Redis)
-    total_jugadores = sum(len(sala.get("jugadores", [])) for sala in salas.values())
-    
+    """Obtener estadísticas del sistema (contadores mantenidos por el índice de salas)"""
+    return jsonify({
+        "ok": True,
+        "estadisticas": state_store.get_agregados()
+    })
+
+@admin_bp.route("/api/admin/db_pool", methods=["GET"])
+@require_admin_auth
+def get_db_pool_metrics():
+    """Métricas del pool de conexiones a la base de datos"""
+    return jsonify({
+        "ok": True,
+        "pool": db_store.get_pool_metrics()
+    })
+
+@admin_bp.route("/api/admin/validaciones_cache", methods=["GET"])
+@require_admin_auth
+def get_validaciones_cache_stats():
+    """Hits/misses del cache de veredictos de validación"""
+    return jsonify({
+        "ok": True,
+        "cache": verdict_cache.stats()
+    })
+
+
+@admin_bp.route("/api/admin/reaper", methods=["GET"])
+@require_admin_auth
+def get_reaper_stats():
+    """Salas expiradas/archivadas por el reaper y TTLs configurados"""
     return jsonify({
         "ok": True,
-        "estadisticas": {
-            "total_salas": len(salas),
-            "salas_activas": salas_activas,
-            "salas_en_espera": len(salas) - salas_activas,
-            "total_jugadores": total_jugadores,
-            "total_mensajes": total_mensajes
-        }
+        "reaper": room_reaper.stats()
     })
 
+
+@admin_bp.route("/api/admin/ia_gateway", methods=["GET"])
+@require_admin_auth
+def get_ia_gateway_stats():
+    """Estado del circuito y de la cola de llamadas al modelo"""
+    return jsonify({
+        "ok": True,
+        "gateway": ia_gateway.stats()
+    })
+
+
+@admin_bp.route("/metrics", methods=["GET"])
+@require_metrics_auth
+def get_metrics():
+    """Métricas de este proceso en formato de texto de Prometheus"""
+    return make_response(metricas.exponer(), 200, {"Content-Type": CONTENT_TYPE})
@@ -1,8 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify
-from app.services.db_store import db_store
+from app.services.room_actor import room_actor
+from app.services.room_cache import room_cache
+from app.utils.round_clock import estado_reloj
+from app.utils.round_results import resultados_serializados
+import logging
 import random
 import string
 
+logger = logging.getLogger(__name__)
+
 game_bp = Blueprint('game', __name__)
 
 # Constantes (mover a config.py despues)
@@ -45,10 +51,10 @@ def create_room():
     # Generar código único
     while True:
         codigo = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-        if not db_store.get_sala(codigo):
+        if not room_cache.get_sala(codigo):
             break
     
-    sala = db_store.create_sala(codigo, nombre_anfitrion)
+    sala = room_cache.create_sala(codigo, nombre_anfitrion)
     
     # Guardar configuración (los datos vienen directamente en data, no en data.config)
     sala["rondas"] = int(data.get("rondas", 5))
@@ -69,9 +75,9 @@ def create_room():
         sala["jugadores_listos"].append(nombre_anfitrion)
     
     # Guardar cambios en la base de datos
-    db_store.set_sala(codigo, sala)
+    room_cache.set_sala(codigo, sala, evento="crear_sala")
     
-    print(f"✅ Sala creada: {codigo} por {nombre_anfitrion} (Modo: {sala['modo_juego']})")
+    logger.info("✅ Sala creada: %s por %s (Modo: %s)", codigo, nombre_anfitrion, sala['modo_juego'])
     return jsonify({"ok": True, "codigo": codigo})
 
 @game_bp.route("/join", methods=["POST"])
@@ -84,30 +90,32 @@ def join_room_http():
     if not codigo or not nombre:
         return jsonify({"ok": False, "error": "Datos incompletos"}), 400
         
-    sala = db_store.get_sala(codigo)
-    if not sala:
-        return jsonify({"ok": False, "error": "Sala no encontrada"}), 404
-        
-    if nombre in sala["jugadores"]:
-        # Permitir reconexión (logica simplificada)
+    with room_actor.turno(codigo):
+        sala = room_cache.get_sala(codigo)
+        if not sala:
+            return jsonify({"ok": False, "error": "Sala no encontrada"}), 404
+
+        if nombre in sala["jugadores"]:
+            # Permitir reconexión (logica simplificada)
+            return jsonify({"ok": True, "codigo": codigo})
+
+        if sala.get("en_curso", False):
+            return jsonify({"ok": False, "error": "Partida en curso"}), 400
+
+        if len(sala["jugadores"]) >= 20:
+             return jsonify({"ok": False, "error": "Sala llena"}), 400
+
+        sala["jugadores"].append(nombre)
+        sala["puntuaciones"][nombre] = 0
+        # Por elemento: otro worker puede estar sumando jugadores a la vez
+        room_cache.set_sala(codigo, sala, evento="join", campos=[("jugadores", nombre), ("puntuaciones", nombre)])
+
+        logger.info("👥 Jugador %s se unió a sala %s", nombre, codigo)
         return jsonify({"ok": True, "codigo": codigo})
-        
-    if sala.get("en_curso", False):
-        return jsonify({"ok": False, "error": "Partida en curso"}), 400
-        
-    if len(sala["jugadores"]) >= 20:
-         return jsonify({"ok": False, "error": "Sala llena"}), 400
-         
-    sala["jugadores"].append(nombre)
-    sala["puntuaciones"][nombre] = 0
-    db_store.set_sala(codigo, sala)
-    
-    print(f"👥 Jugador {nombre} se unió a sala {codigo}")
-    return jsonify({"ok": True, "codigo": codigo})
 
 @game_bp.route("/waiting/<codigo>")
 def waiting_room(codigo):
-    sala = db_store.get_sala(codigo)
+    sala = room_cache.get_sala(codigo)
     if not sala:
         return "❌ Sala no encontrada", 404
         
@@ -136,7 +144,7 @@ def waiting_room(codigo):
 
 @game_bp.route("/game/<codigo>")
 def game(codigo):
-    sala = db_store.get_sala(codigo)
+    sala = room_cache.get_sala(codigo)
     if not sala:
         return "Sala no encontrada", 404
         
@@ -153,6 +161,9 @@ def game(codigo):
         icon = CATEGORIAS_DISPONIBLES.get(cat, {}).get("icon", "📝")
         categorias_con_iconos.append({"nombre": cat, "icon": icon})
 
+    # Tiempo calculado desde el deadline de la ronda (no se persiste cada segundo)
+    reloj = estado_reloj(sala)
+
     return render_template("game.html",
         jugador=sala["anfitrion"], # Esto es incorrecto, deberia ser sesion
         codigo=codigo,
@@ -164,6 +175,9 @@ def game(codigo):
         chat_habilitado=sala.get("chat_habilitado", True),
         validacion_activa=sala.get("validacion_activa", False),
         finalizada=finalizada,
-        last_results=last_results
+        last_results_json=resultados_serializados(codigo, last_results),
+        tiempo_restante=reloj["tiempo_restante"],
+        round_deadline=reloj["round_deadline"],
+        server_time=reloj["server_time"]
     )
 
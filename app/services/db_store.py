@@ -9,13 +9,27 @@ Características:
 - ✅ Failover automático en <2 minutos
 - ✅ Sin pérdida de datos (replicación síncrona)
 - ✅ Compatible con código existente
+
+Esquema normalizado: si existen las tablas chat_messages, round_answers y
+scores (ver azure/migrar_tablas_normalizadas.py), el chat, las respuestas y
+los puntajes se guardan como filas propias en vez de en las columnas JSON de
+`salas`. Chat y respuestas solo insertan filas nuevas; get_sala reconstruye
+los campos de la sala a partir de esas tablas.
 """
 
+import hashlib
+import logging
 import os
 import json
-from datetime import datetime
-from typing import Dict, Optional, List
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional, List, Tuple, Any
 from dotenv import load_dotenv
+from app.services.metrics import DB_ESCRITURAS
+
+logger = logging.getLogger(__name__)
 
 # Cargar variables de entorno (manejar errores de parsing silenciosamente)
 try:
@@ -27,32 +41,100 @@ except Exception as e:
 
 # Intentar importar SQLAlchemy
 try:
-    from sqlalchemy import create_engine, Column, String, Integer, JSON, DateTime, Boolean
+    from sqlalchemy import create_engine, Column, String, Integer, Float, JSON, DateTime, Boolean
+    from sqlalchemy import update, select, insert, delete, cast, func, literal, Text, event, Index, inspect
+    from sqlalchemy import and_, bindparam
+    from sqlalchemy.dialects.postgresql import JSONB, ARRAY
+    from sqlalchemy.dialects import postgresql, sqlite
     from sqlalchemy.ext.declarative import declarative_base
     from sqlalchemy.orm import sessionmaker, Session
     from sqlalchemy.pool import QueuePool
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
     SQLALCHEMY_AVAILABLE = True
 except ImportError:
     SQLALCHEMY_AVAILABLE = False
-    print("⚠️ SQLAlchemy no instalado. Usando fallback a JSON.")
+    logger.warning("⚠️ SQLAlchemy no instalado. Usando fallback a JSON.")
 
 # Configuración de base de datos
 DATABASE_URL = os.getenv("DATABASE_URL")
 USE_DATABASE = DATABASE_URL and not DATABASE_URL.startswith("#") and SQLALCHEMY_AVAILABLE
 
+# Tamaño del pool: cada operación toma una conexión solo mientras dura
+# (timer, validación y handlers concurrentes compiten por estas conexiones)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Campos de la sala que viven en tablas propias con el esquema normalizado
+TABLAS_NORMALIZADAS = ("chat_messages", "round_answers", "scores")
+CAMPOS_NORMALIZADOS = ("mensajes_chat", "respuestas_ronda", "puntuaciones")
+CHAT_HISTORIAL = 50  # Mensajes que se cargan con la sala (mismo límite que el chat)
+CLAVE_VALIDACION_MAX = 300  # Largo de validaciones_cache.clave
+
+
+class PoolMetrics:
+    """Contadores del pool de conexiones (checkouts, espera, timeouts)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+    
+    def on_connect(self, *args):
+        with self._lock:
+            self.connects += 1
+    
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+    
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+    
+    def snapshot(self, pool=None) -> Dict:
+        with self._lock:
+            data = {
+                "checkouts_total": self.checkouts,
+                "connects_total": self.connects,
+                "timeouts_total": self.timeouts,
+                "wait_avg_ms": round(1000 * self.wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(1000 * self.wait_max, 3),
+            }
+        if pool is not None:
+            data.update({
+                "pool_size": pool.size(),
+                "max_overflow": DB_MAX_OVERFLOW,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            })
+        return data
+
+
+pool_metrics = PoolMetrics()
+
 if USE_DATABASE:
     try:
         # Crear engine con configuración optimizada
         engine = create_engine(
             DATABASE_URL,
             poolclass=QueuePool,
-            pool_size=5,  # Conexiones en el pool
-            max_overflow=10,  # Conexiones adicionales si es necesario
+            pool_size=DB_POOL_SIZE,  # Conexiones en el pool
+            max_overflow=DB_MAX_OVERFLOW,  # Conexiones adicionales si es necesario
+            pool_timeout=DB_POOL_TIMEOUT,  # Espera máxima por una conexión libre
             pool_pre_ping=True,  # Verificar conexión antes de usar
             pool_recycle=3600,  # Reciclar conexiones cada hora
             echo=False  # No mostrar SQL queries (cambiar a True para debug)
         )
         
+        event.listen(engine, "connect", pool_metrics.on_connect)
+        
         Base = declarative_base()
         SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
         
@@ -112,13 +194,83 @@ if USE_DATABASE:
             created_at = Column(DateTime, default=datetime.utcnow)
             updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
             inicio_ronda = Column(DateTime, nullable=True)
+
+            # Reloj de ronda (epoch en segundos, ver app/utils/round_clock.py)
+            round_deadline = Column(Float, nullable=True)
+            tiempo_pausado = Column(Float, default=0)
+            pausada_desde = Column(Float, nullable=True)
+        
+        # Veredictos de validación ya resueltos por la IA (compartidos entre salas)
+        class ValidacionModel(Base):
+            __tablename__ = "validaciones_cache"
+            
+            # letra|categoria|respuesta normalizada (o su sha1 si no entra, ver _clave_validacion)
+            clave = Column(String(CLAVE_VALIDACION_MAX), primary_key=True)
+            es_valida = Column(Boolean, nullable=False)
+            razon = Column(String(500), nullable=True)
+            confianza = Column(Float, default=0.5)
+            created_at = Column(Float, nullable=False)  # epoch, para el TTL
+        
+        # Resultados finales de salas expiradas (ver app/services/room_reaper.py)
+        class SalaArchivadaModel(Base):
+            __tablename__ = "salas_archivadas"
+            
+            id = Column(Integer, primary_key=True, autoincrement=True)
+            codigo = Column(String(10), index=True, nullable=False)
+            motivo = Column(String(20), nullable=True)
+            resumen = Column(JSON, nullable=False)
+            archivada_at = Column(Float, nullable=False)
+        
+        # Esquema normalizado: una fila por mensaje, por respuesta y por puntaje
+        class ChatMessageModel(Base):
+            __tablename__ = "chat_messages"
+            __table_args__ = (
+                Index("ix_chat_messages_sala_ts", "codigo", "timestamp"),
+                # Un jugador no manda dos mensajes en el mismo ms (rate limit): evita
+                # duplicados si dos workers escriben el mismo chat a la vez
+                Index("ux_chat_messages_mensaje", "codigo", "jugador", "timestamp", unique=True),
+            )
+            
+            id = Column(Integer, primary_key=True, autoincrement=True)
+            codigo = Column(String(10), nullable=False)
+            jugador = Column(String(100), nullable=False)
+            mensaje = Column(Text, nullable=False)
+            timestamp = Column(Float, nullable=False)  # ms (como lo recibe el cliente)
         
-        print("✅ RDS PostgreSQL configurado - Replicación Multi-AZ activa")
+        class RoundAnswerModel(Base):
+            __tablename__ = "round_answers"
+            __table_args__ = (
+                Index("ix_round_answers_sala_ronda", "codigo", "ronda", "jugador"),
+                Index("ix_round_answers_categoria", "categoria", "valida"),
+            )
+            
+            id = Column(Integer, primary_key=True, autoincrement=True)
+            codigo = Column(String(10), nullable=False)
+            ronda = Column(Integer, nullable=False)
+            jugador = Column(String(100), nullable=False)
+            categoria = Column(String(100), nullable=False)
+            respuesta = Column(String(200), nullable=False, default="")
+            # Veredicto al puntuar la ronda (NULL hasta entonces)
+            valida = Column(Boolean, nullable=True)
+            razon = Column(String(500), nullable=True)
+            puntos = Column(Integer, nullable=True)
+            created_at = Column(Float, nullable=False)
+        
+        class ScoreModel(Base):
+            __tablename__ = "scores"
+            __table_args__ = (Index("ix_scores_puntos", "puntos"),)
+            
+            codigo = Column(String(10), primary_key=True)
+            jugador = Column(String(100), primary_key=True)
+            puntos = Column(Integer, nullable=False, default=0)
+            updated_at = Column(Float, nullable=True)
+        
+        logger.info("✅ RDS PostgreSQL configurado - Replicación Multi-AZ activa")
         
     except Exception as e:
         USE_DATABASE = False
-        print(f"⚠️ Error conectando a RDS: {e}")
-        print("⚠️ Usando fallback a JSON")
+        logger.warning("⚠️ Error conectando a RDS: %s", e)
+        logger.warning("⚠️ Usando fallback a JSON")
 
 
 class DatabaseStore:
@@ -134,22 +286,75 @@ class DatabaseStore:
     
     def __init__(self):
         self.use_database = USE_DATABASE
+        self._normalizado = None
         
         if self.use_database:
-            self.session: Session = SessionLocal()
-            print("💾 Usando RDS PostgreSQL con replicación Multi-AZ")
+            # Sin sesión compartida: cada operación abre la suya (ver _session_scope)
+            logger.info("💾 Usando RDS PostgreSQL con replicación Multi-AZ")
         else:
             # Fallback a almacenamiento JSON
             from app.services.state_store import state_store
             self.fallback_store = state_store
-            print("📄 Usando almacenamiento JSON (fallback)")
+            logger.info("📄 Usando almacenamiento JSON (fallback)")
     
-    def _model_to_dict(self, sala_model: 'SalaModel') -> Dict:
-        """Convierte modelo SQLAlchemy a diccionario"""
+    @contextmanager
+    def _session_scope(self):
+        """
+        Unidad de trabajo: una sesión y una conexión del pool por operación
+        
+        La conexión se toma al entrar (midiendo la espera) y vuelve al pool al
+        salir, con commit si todo fue bien o rollback si hubo error. Así los
+        hilos del timer, la validación y los handlers no comparten transacción.
+        """
+        session: Session = SessionLocal()
+        inicio = time.perf_counter()
+        try:
+            session.connection()
+        except PoolTimeoutError:
+            session.close()
+            pool_metrics.record_timeout()
+            raise
+        except Exception:
+            session.close()
+            raise
+        pool_metrics.record_wait(time.perf_counter() - inicio)
+        
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
+    def get_pool_metrics(self) -> Dict:
+        """Métricas del pool de conexiones para dimensionarlo según la concurrencia"""
+        if not self.use_database:
+            return {"enabled": False}
+        return {"enabled": True, **pool_metrics.snapshot(engine.pool)}
+    
+    def usa_tablas_normalizadas(self) -> bool:
+        """True si la base tiene las tablas de chat, respuestas y puntajes (se consulta una vez)"""
+        if not self.use_database:
+            return False
+        if self._normalizado is None:
+            try:
+                existentes = set(inspect(engine).get_table_names())
+            except Exception as e:
+                logger.warning("⚠️ No se pudo inspeccionar el esquema: %s", e)
+                return False
+            self._normalizado = all(t in existentes for t in TABLAS_NORMALIZADAS)
+            if self._normalizado:
+                logger.info("🧩 Chat, respuestas y puntajes en tablas normalizadas")
+        return self._normalizado
+    
+    def _model_to_dict(self, sala_model: 'SalaModel', normalizados: Optional[Dict] = None) -> Dict:
+        """Convierte modelo SQLAlchemy a diccionario (normalizados: campos leídos de sus tablas)"""
         if not sala_model:
             return None
         
-        return {
+        sala = {
             "codigo": sala_model.codigo,
             "anfitrion": sala_model.anfitrion,
             "jugadores": sala_model.jugadores or [],
@@ -185,8 +390,191 @@ class DatabaseStore:
             "puntuaciones_equipos": sala_model.puntuaciones_equipos or {},
             "jugadores_ids": sala_model.jugadores_ids or {},
             "ids_jugadores": sala_model.ids_jugadores or {},
-            "inicio_ronda": sala_model.inicio_ronda.timestamp() if sala_model.inicio_ronda else None
+            "inicio_ronda": sala_model.inicio_ronda.timestamp() if sala_model.inicio_ronda else None,
+            "round_deadline": sala_model.round_deadline,
+            "tiempo_pausado": sala_model.tiempo_pausado or 0,
+            "pausada_desde": sala_model.pausada_desde,
+            # updated_at se guarda en UTC sin zona horaria
+            "ultima_actividad": (
+                sala_model.updated_at.replace(tzinfo=timezone.utc).timestamp()
+                if sala_model.updated_at else None
+            )
         }
+        if normalizados:
+            sala.update(normalizados)
+        return sala
+    
+    def _salas_a_dict(self, session: 'Session', modelos: List['SalaModel']) -> Dict[str, Dict]:
+        """Convierte varias filas, leyendo sus campos normalizados en tres consultas"""
+        normalizados = self._leer_normalizados(session, [m.codigo for m in modelos])
+        return {m.codigo: self._model_to_dict(m, normalizados.get(m.codigo)) for m in modelos}
+    
+    def _leer_normalizados(self, session: 'Session', codigos: List[str]) -> Dict[str, Dict]:
+        """Chat (últimos CHAT_HISTORIAL), respuestas de la ronda actual y puntajes por sala"""
+        if not codigos or not self.usa_tablas_normalizadas():
+            return {}
+        datos = {c: {"mensajes_chat": [], "respuestas_ronda": {}, "puntuaciones": {}} for c in codigos}
+        
+        orden = func.row_number().over(
+            partition_by=ChatMessageModel.codigo,
+            order_by=(ChatMessageModel.timestamp.desc(), ChatMessageModel.id.desc()),
+        ).label("orden")
+        recientes = (
+            select(ChatMessageModel.codigo, ChatMessageModel.jugador, ChatMessageModel.mensaje,
+                   ChatMessageModel.timestamp, orden)
+            .where(ChatMessageModel.codigo.in_(codigos))
+            .subquery()
+        )
+        filas = session.execute(
+            select(recientes.c.codigo, recientes.c.jugador, recientes.c.mensaje, recientes.c.timestamp)
+            .where(recientes.c.orden <= CHAT_HISTORIAL)
+            .order_by(recientes.c.codigo, recientes.c.timestamp, recientes.c.orden.desc())
+        )
+        for codigo, jugador, mensaje, timestamp in filas:
+            datos[codigo]["mensajes_chat"].append({"jugador": jugador, "mensaje": mensaje, "timestamp": timestamp})
+        
+        # Solo la ronda actual; si un jugador reenvió, la fila más nueva gana
+        filas = session.execute(
+            select(RoundAnswerModel.codigo, RoundAnswerModel.jugador, RoundAnswerModel.categoria,
+                   RoundAnswerModel.respuesta)
+            .join(SalaModel, and_(SalaModel.codigo == RoundAnswerModel.codigo,
+                                  SalaModel.ronda_actual == RoundAnswerModel.ronda))
+            .where(RoundAnswerModel.codigo.in_(codigos))
+            .order_by(RoundAnswerModel.id)
+        )
+        for codigo, jugador, categoria, respuesta in filas:
+            datos[codigo]["respuestas_ronda"].setdefault(jugador, {})[categoria] = respuesta
+        
+        filas = session.execute(
+            select(ScoreModel.codigo, ScoreModel.jugador, ScoreModel.puntos)
+            .where(ScoreModel.codigo.in_(codigos))
+        )
+        for codigo, jugador, puntos in filas:
+            datos[codigo]["puntuaciones"][jugador] = puntos
+        return datos
+    
+    def _escribir_normalizados(self, session: 'Session', codigo: str, fields: Dict,
+                               patches: List[Tuple[str, List[str], Any]], ronda: Optional[int] = None):
+        """
+        Escribe chat, respuestas y puntajes en sus tablas (sin commit)
+        
+        - Chat: inserta los mensajes desde el último guardado de la sala (incluido
+          su mismo ms); los ya guardados se ignoran por (codigo, jugador, timestamp)
+        - Respuestas: reemplaza las filas de la ronda de cada jugador que envió;
+          la ronda es `ronda` (la de las respuestas) o la actual de la sala
+        - Puntajes: una fila por jugador (upsert); con el campo completo se
+          borran los de jugadores que ya no están
+        """
+        ahora = time.time()
+        
+        if "mensajes_chat" in fields:
+            ultimo = session.execute(
+                select(func.max(ChatMessageModel.timestamp)).where(ChatMessageModel.codigo == codigo)
+            ).scalar()
+            nuevos = [
+                {"codigo": codigo, "jugador": m.get("jugador") or "", "mensaje": m.get("mensaje") or "",
+                 "timestamp": m.get("timestamp") or 0}
+                for m in fields["mensajes_chat"] or []
+                if ultimo is None or (m.get("timestamp") or 0) >= ultimo
+            ]
+            if nuevos:
+                self._insertar_sin_duplicados(session, ChatMessageModel, nuevos,
+                                              ["codigo", "jugador", "timestamp"])
+        
+        respuestas = dict(fields.get("respuestas_ronda") or {})
+        puntuaciones = dict(fields.get("puntuaciones") or {})
+        for campo, ruta, valor in patches:
+            if valor is None or len(ruta) != 1:
+                continue
+            if campo == "respuestas_ronda":
+                respuestas[ruta[0]] = valor
+            elif campo == "puntuaciones":
+                puntuaciones[ruta[0]] = valor
+        
+        filas = [
+            {"codigo": codigo, "jugador": jugador, "categoria": str(categoria)[:100],
+             "respuesta": str(respuesta or "")[:200], "created_at": ahora}
+            for jugador, por_categoria in respuestas.items() if isinstance(por_categoria, dict)
+            for categoria, respuesta in por_categoria.items()
+        ]
+        if filas:
+            if ronda is None:
+                ronda = session.execute(
+                    select(SalaModel.ronda_actual).where(SalaModel.codigo == codigo)
+                ).scalar()
+            for fila in filas:
+                fila["ronda"] = ronda or 1
+            # Reenvío (ej: al basta_triggered): reemplaza lo anterior del jugador
+            session.execute(
+                delete(RoundAnswerModel).where(and_(
+                    RoundAnswerModel.codigo == codigo,
+                    RoundAnswerModel.ronda == (ronda or 1),
+                    RoundAnswerModel.jugador.in_({f["jugador"] for f in filas}),
+                ))
+            )
+            session.execute(insert(RoundAnswerModel), filas)
+        
+        if "puntuaciones" in fields:
+            session.execute(
+                delete(ScoreModel).where(and_(
+                    ScoreModel.codigo == codigo,
+                    ScoreModel.jugador.notin_(list(puntuaciones)),
+                ))
+            )
+        for jugador, puntos in puntuaciones.items():
+            session.merge(ScoreModel(codigo=codigo, jugador=jugador, puntos=int(puntos or 0), updated_at=ahora))
+    
+    @staticmethod
+    def _insertar_sin_duplicados(session: 'Session', modelo, filas: List[Dict], unicos: List[str]):
+        """INSERT que ignora las filas que chocan con un índice único (PostgreSQL y SQLite)"""
+        dialectos = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+        insertar = dialectos.get(session.bind.dialect.name)
+        if insertar is None:
+            session.execute(insert(modelo), filas)
+            return
+        session.execute(insertar(modelo).on_conflict_do_nothing(index_elements=unicos), filas)
+    
+    def registrar_veredictos(self, codigo: str, ronda: int, validaciones: Dict[str, Dict],
+                             puntos: Dict[str, Dict]):
+        """Anota en round_answers el veredicto y los puntos de cada respuesta de la ronda"""
+        if not self.usa_tablas_normalizadas():
+            return
+        
+        filas = [
+            {"b_codigo": codigo, "b_ronda": ronda, "b_jugador": jugador, "b_categoria": categoria,
+             "b_valida": v.get("validada_ia"), "b_razon": (v.get("razon_ia") or "")[:500],
+             "b_puntos": puntos.get(jugador, {}).get(categoria)}
+            for jugador, por_categoria in validaciones.items()
+            for categoria, v in por_categoria.items()
+        ]
+        if not filas:
+            return
+        
+        tabla = RoundAnswerModel.__table__
+        try:
+            with self._session_scope() as session:
+                session.connection().execute(
+                    tabla.update()
+                    .where(and_(
+                        tabla.c.codigo == bindparam("b_codigo"),
+                        tabla.c.ronda == bindparam("b_ronda"),
+                        tabla.c.jugador == bindparam("b_jugador"),
+                        tabla.c.categoria == bindparam("b_categoria"),
+                    ))
+                    .values(valida=bindparam("b_valida"), razon=bindparam("b_razon"),
+                            puntos=bindparam("b_puntos")),
+                    filas,
+                )
+        except Exception as e:
+            logger.error("❌ Error guardando veredictos de sala %s: %s", codigo, e)
+    
+    @staticmethod
+    def _to_column_value(key: str, value):
+        """Adapta valores del diccionario al tipo de la columna"""
+        if key == "inicio_ronda" and isinstance(value, (int, float)):
+            # _model_to_dict expone inicio_ronda como epoch; la columna es DateTime
+            return datetime.fromtimestamp(value)
+        return value
     
     def get_sala(self, codigo: str) -> Optional[Dict]:
         """
@@ -200,16 +588,22 @@ class DatabaseStore:
             return self.fallback_store.get_sala(codigo)
         
         try:
-            sala = self.session.query(SalaModel).filter(SalaModel.codigo == codigo).first()
-            return self._model_to_dict(sala)
+            with self._session_scope() as session:
+                sala = session.query(SalaModel).filter(SalaModel.codigo == codigo).first()
+                if sala is None:
+                    return None
+                return self._salas_a_dict(session, [sala])[codigo]
         except Exception as e:
-            print(f"❌ Error leyendo sala {codigo}: {e}")
+            logger.error("❌ Error leyendo sala %s: %s", codigo, e)
             return None
     
     def set_sala(self, codigo: str, data: Dict):
         """
         Guarda o actualiza una sala
         
+        Solo se escriben las columnas presentes en `data` con un único
+        UPDATE (sin SELECT previo); si la sala no existe se inserta.
+        
         En RDS Multi-AZ:
         1. Escribe en Primary (us-east-1a)
         2. RDS replica AUTOMÁTICAMENTE a Standby (us-east-1b)
@@ -221,62 +615,239 @@ class DatabaseStore:
             return self.fallback_store.set_sala(codigo, data)
         
         try:
-            # Buscar sala existente
-            sala = self.session.query(SalaModel).filter(SalaModel.codigo == codigo).first()
+            # Commit al salir del scope - RDS replica automáticamente al Standby
+            with DB_ESCRITURAS.medir(operacion="set_sala"), self._session_scope() as session:
+                if not self._update_fields(session, codigo, data, None):
+                    # Crear nueva sala - remover codigo de data para evitar duplicado
+                    normalizado = self.usa_tablas_normalizadas()
+                    data_copy = {
+                        k: self._to_column_value(k, v) for k, v in data.items()
+                        if k != 'codigo' and hasattr(SalaModel, k)
+                        and not (normalizado and k in CAMPOS_NORMALIZADOS)
+                    }
+                    session.add(SalaModel(codigo=codigo, **data_copy))
+                    if normalizado:
+                        self._escribir_normalizados(session, codigo, data, [],
+                                                   data.get("ronda_respuestas") or data.get("ronda_actual", 1))
             
-            if sala:
-                # Actualizar sala existente
-                for key, value in data.items():
-                    if hasattr(sala, key) and key != 'codigo':  # No actualizar codigo (es PK)
-                        setattr(sala, key, value)
-                sala.updated_at = datetime.utcnow()
-            else:
-                # Crear nueva sala - remover codigo de data para evitar duplicado
-                data_copy = {k: v for k, v in data.items() if k != 'codigo'}
-                sala = SalaModel(codigo=codigo, **data_copy)
-                self.session.add(sala)
-            
-            # Commit - RDS replica automáticamente al Standby
-            self.session.commit()
-            
-            print(f"✅ Sala {codigo} guardada y replicada en Multi-AZ")
+            logger.debug("✅ Sala %s guardada y replicada en Multi-AZ", codigo)
             
         except Exception as e:
-            self.session.rollback()
-            print(f"❌ Error guardando sala {codigo}: {e}")
+            logger.error("❌ Error guardando sala %s: %s", codigo, e)
+            raise
+    
+    def update_sala_fields(self, codigo: str,
+                           patches: Optional[List[Tuple[str, List[str], Any]]] = None,
+                           **fields) -> bool:
+        """
+        Actualiza solo algunas columnas de una sala existente
+        
+        - fields: columnas completas a reemplazar (ej: jugadores_listos=[...])
+        - patches: cambios dentro de columnas JSON como (columna, ruta, valor),
+          ej: ("respuestas_ronda", ["Ana"], {...}). En PostgreSQL se aplican con
+          jsonb_set sin reescribir el resto del documento.
+        
+        Todo va en un único UPDATE sin SELECT previo.
+        Retorna False si la sala no existe.
+        """
+        if not self.use_database:
+            sala = self.fallback_store.get_sala(codigo)
+            if sala is None:
+                return False
+            sala.update(fields)
+            for campo, ruta, valor in patches or []:
+                self._apply_patch(sala.setdefault(campo, {}), ruta, valor)
+            self.fallback_store.set_sala(codigo, sala)
+            return True
+        
+        try:
+            with DB_ESCRITURAS.medir(operacion="update_sala_fields"), self._session_scope() as session:
+                return self._update_fields(session, codigo, fields, patches)
+        except Exception as e:
+            logger.error("❌ Error actualizando campos de sala %s: %s", codigo, e)
             raise
     
+    @staticmethod
+    def _apply_patch(documento: Dict, ruta: List[str], valor):
+        """Aplica un patch sobre un dict en memoria (equivalente a jsonb_set)"""
+        for clave in ruta[:-1]:
+            documento = documento.setdefault(clave, {})
+        documento[ruta[-1]] = valor
+    
+    def _update_fields(self, session: 'Session', codigo: str, fields: Dict, patches) -> bool:
+        """Construye y ejecuta el UPDATE parcial (sin commit)"""
+        columnas = SalaModel.__table__.c
+        valores = {
+            key: self._to_column_value(key, value) for key, value in fields.items()
+            if key in columnas and key != 'codigo'  # No actualizar codigo (es PK)
+        }
+        
+        # Con el esquema normalizado estos campos van a sus tablas, no a la fila
+        normalizados, patches_normalizados = {}, []
+        if self.usa_tablas_normalizadas():
+            normalizados = {k: fields[k] for k in CAMPOS_NORMALIZADOS if k in fields}
+            for campo in normalizados:
+                valores.pop(campo, None)
+            patches_normalizados = [p for p in patches or [] if p[0] in CAMPOS_NORMALIZADOS]
+            patches = [p for p in patches or [] if p[0] not in CAMPOS_NORMALIZADOS]
+            if normalizados or patches_normalizados:
+                # La fila se actualiza igual (updated_at) para saber si la sala existe
+                valores["updated_at"] = datetime.utcnow()
+        
+        if patches:
+            patches = [p for p in patches if p[0] in columnas and p[0] not in valores]
+            if session.bind.dialect.name == "postgresql":
+                for campo, ruta, valor in patches:
+                    actual = valores.get(campo, cast(columnas[campo], JSONB))
+                    valores[campo] = func.jsonb_set(
+                        func.coalesce(actual, cast(literal("{}"), JSONB)),
+                        cast(literal(list(ruta)), ARRAY(Text)),
+                        cast(literal(json.dumps(valor, default=str)), JSONB),
+                        True,
+                    )
+                for campo in {p[0] for p in patches}:
+                    valores[campo] = cast(valores[campo], JSON)
+            elif patches:
+                # Otros motores (SQLite en pruebas): leer solo las columnas afectadas
+                nombres = sorted({p[0] for p in patches})
+                fila = session.execute(
+                    select(*[columnas[n] for n in nombres]).where(columnas.codigo == codigo)
+                ).first()
+                if fila is None:
+                    return False
+                documentos = {n: dict(getattr(fila, n) or {}) for n in nombres}
+                for campo, ruta, valor in patches:
+                    self._apply_patch(documentos[campo], ruta, valor)
+                valores.update(documentos)
+        
+        if not valores:
+            return session.execute(
+                select(columnas.codigo).where(columnas.codigo == codigo)
+            ).first() is not None
+        
+        valores["updated_at"] = datetime.utcnow()
+        resultado = session.execute(
+            update(SalaModel)
+            .where(SalaModel.codigo == codigo)
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount == 0:
+            return False
+        if normalizados or patches_normalizados:
+            # Las respuestas pueden llegar en el mismo flush que el avance de ronda
+            ronda = fields.get("ronda_respuestas") or fields.get("ronda_actual")
+            self._escribir_normalizados(session, codigo, normalizados, patches_normalizados, ronda)
+        return True
+    
     def get_all_salas(self) -> Dict[str, Dict]:
         """Obtiene todas las salas"""
         if not self.use_database:
             return self.fallback_store.get_all_salas()
         
         try:
-            salas = self.session.query(SalaModel).all()
-            return {sala.codigo: self._model_to_dict(sala) for sala in salas}
+            with self._session_scope() as session:
+                salas = session.query(SalaModel).all()
+                return self._salas_a_dict(session, salas)
         except Exception as e:
-            print(f"❌ Error obteniendo todas las salas: {e}")
+            logger.error("❌ Error obteniendo todas las salas: %s", e)
             return {}
     
     def delete_sala(self, codigo: str):
         """Elimina una sala"""
         if not self.use_database:
-            # El state_store no tiene delete, pero podemos implementarlo
-            salas = self.fallback_store.get_all_salas()
-            if codigo in salas:
-                del salas[codigo]
-                self.fallback_store.save()
+            self.fallback_store.delete_sala(codigo)
             return
         
         try:
-            sala = self.session.query(SalaModel).filter(SalaModel.codigo == codigo).first()
-            if sala:
-                self.session.delete(sala)
-                self.session.commit()
-                print(f"🗑️ Sala {codigo} eliminada y replicado en Multi-AZ")
+            with self._session_scope() as session:
+                eliminadas = session.query(SalaModel).filter(SalaModel.codigo == codigo).delete()
+                if self.usa_tablas_normalizadas():
+                    # Los códigos se reutilizan: no dejar filas huérfanas para una sala futura
+                    for modelo in (ChatMessageModel, RoundAnswerModel, ScoreModel):
+                        session.execute(delete(modelo).where(modelo.codigo == codigo))
+            if eliminadas:
+                logger.info("🗑️ Sala %s eliminada y replicado en Multi-AZ", codigo)
+        except Exception as e:
+            logger.error("❌ Error eliminando sala %s: %s", codigo, e)
+    
+    def get_salas_inactivas(self, antes_de: float, limite: int = 500) -> Dict[str, Dict]:
+        """Salas sin escrituras desde `antes_de` (epoch), para el reaper"""
+        if not self.use_database:
+            return {}
+        
+        try:
+            with self._session_scope() as session:
+                salas = (
+                    session.query(SalaModel)
+                    .filter(SalaModel.updated_at < datetime.utcfromtimestamp(antes_de))
+                    .limit(limite)
+                    .all()
+                )
+                return self._salas_a_dict(session, salas)
         except Exception as e:
-            self.session.rollback()
-            print(f"❌ Error eliminando sala {codigo}: {e}")
+            logger.error("❌ Error buscando salas inactivas: %s", e)
+            return {}
+    
+    def archivar_sala(self, resumen: Dict) -> bool:
+        """Guarda el resumen final de una sala expirada (False si no hay base de datos)"""
+        if not self.use_database:
+            return False
+        
+        with self._session_scope() as session:
+            session.add(SalaArchivadaModel(
+                codigo=resumen["codigo"],
+                motivo=resumen.get("motivo"),
+                resumen=resumen,
+                archivada_at=resumen.get("archivada_at", time.time()),
+            ))
+        return True
+    
+    @staticmethod
+    def _clave_validacion(clave: str) -> str:
+        """
+        Clave tal como se guarda: las que no entran en la columna se guardan
+        como su sha1 (una sola clave larga hacía fallar todo el lote en PostgreSQL)
+        """
+        if len(clave) <= CLAVE_VALIDACION_MAX:
+            return clave
+        return "sha1:" + hashlib.sha1(clave.encode("utf-8")).hexdigest()
+    
+    def get_validaciones(self, claves: List[str]) -> Dict[str, Dict]:
+        """Lee veredictos cacheados en una sola consulta (solo con base de datos)"""
+        if not self.use_database or not claves:
+            return {}
+        
+        originales = {self._clave_validacion(c): c for c in claves}
+        try:
+            with self._session_scope() as session:
+                filas = session.query(ValidacionModel).filter(ValidacionModel.clave.in_(originales)).all()
+                return {
+                    originales[f.clave]: {"valida": f.es_valida, "razon": f.razon, "confianza": f.confianza,
+                                          "t": f.created_at}
+                    for f in filas
+                }
+        except Exception as e:
+            logger.error("❌ Error leyendo cache de validaciones: %s", e)
+            return {}
+    
+    def set_validaciones(self, veredictos: Dict[str, Dict]):
+        """Guarda veredictos (clave -> {valida, razon, confianza, t})"""
+        if not self.use_database or not veredictos:
+            return
+        
+        try:
+            with self._session_scope() as session:
+                for clave, v in veredictos.items():
+                    session.merge(ValidacionModel(
+                        clave=self._clave_validacion(clave),
+                        es_valida=v["valida"],
+                        razon=(v.get("razon") or "")[:500],
+                        confianza=v.get("confianza", 0.5),
+                        created_at=v["t"],
+                    ))
+        except Exception as e:
+            logger.error("❌ Error guardando cache de validaciones: %s", e)
     
     def create_sala(self, codigo: str, anfitrion: str) -> Dict:
         """
@@ -306,16 +877,10 @@ class DatabaseStore:
     def save(self):
         """
         Fuerza el guardado
-        En RDS no es necesario (auto-commit), pero mantenemos compatibilidad
+        En RDS no es necesario (cada operación hace commit), pero mantenemos compatibilidad
         """
         if not self.use_database:
             self.fallback_store.save()
-        else:
-            try:
-                self.session.commit()
-            except Exception as e:
-                self.session.rollback()
-                print(f"❌ Error en save: {e}")
 
 
 # Singleton global
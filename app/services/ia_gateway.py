@@ -0,0 +1,278 @@
+"""
+🛡️ IA Gateway - Llamadas al modelo fuera del bucle de eventos
+
+`openai_client.chat.completions.create` es bloqueante. Llamado desde un
+handler (o esperando un ThreadPoolExecutor con `wait`) bajo eventlet detiene
+el hub: se atrasan los ticks del temporizador y la entrega del chat. Este
+gateway:
+- Encola las llamadas (cola acotada) y las atiende con un número fijo de hilos
+  (tope de llamadas simultáneas al modelo, compartido por todas las salas)
+- Reintenta los errores transitorios (timeout, conexión, 429, 5xx) con
+  backoff exponencial y jitter, sin pasarse del plazo de la solicitud
+- Circuit breaker: tras IA_FALLOS_PARA_ABRIR fallos seguidos deja de llamar al
+  modelo durante IA_ENFRIAMIENTO segundos (las solicitudes fallan al instante
+  y el llamador usa su veredicto de respaldo); luego deja pasar una de prueba
+- `esperar` duerme con socketio.sleep: el handler cede el control mientras
+  el modelo responde
+"""
+
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+IA_MAX_CONCURRENCIA = int(os.getenv("IA_MAX_CONCURRENCIA", os.getenv("VALIDACION_MAX_WORKERS", "4")))
+IA_TAMANO_COLA = int(os.getenv("IA_TAMANO_COLA", "200"))
+IA_MAX_REINTENTOS = int(os.getenv("IA_MAX_REINTENTOS", "2"))
+IA_BACKOFF_BASE = float(os.getenv("IA_BACKOFF_BASE", "0.5"))
+IA_BACKOFF_MAX = float(os.getenv("IA_BACKOFF_MAX", "4.0"))
+IA_FALLOS_PARA_ABRIR = int(os.getenv("IA_FALLOS_PARA_ABRIR", "5"))
+IA_ENFRIAMIENTO = float(os.getenv("IA_ENFRIAMIENTO", "30"))
+
+# Errores en los que vale la pena reintentar
+ERRORES_TRANSITORIOS = (
+    openai.APIConnectionError,  # Incluye APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class CircuitoAbierto(Exception):
+    """El modelo viene fallando: no se intenta la llamada"""
+
+
+class ColaLlena(Exception):
+    """Hay demasiadas solicitudes pendientes"""
+
+
+class PlazoVencido(Exception):
+    """La solicitud no se pudo atender antes de su plazo"""
+
+
+class CircuitBreaker:
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+    def __init__(self, fallos_para_abrir: int = IA_FALLOS_PARA_ABRIR,
+                 enfriamiento: float = IA_ENFRIAMIENTO):
+        self.fallos_para_abrir = fallos_para_abrir
+        self.enfriamiento = enfriamiento
+        self._estado = self.CERRADO
+        self._fallos = 0
+        self._abierto_desde = 0.0
+        self._sondeando = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._estado == self.ABIERTO and time.time() - self._abierto_desde >= self.enfriamiento:
+                return self.SEMIABIERTO
+            return self._estado
+
+    def permitir(self) -> bool:
+        """True si se puede llamar al modelo (en semiabierto solo una llamada de prueba)."""
+        with self._lock:
+            if self._estado == self.CERRADO:
+                return True
+            if self._estado == self.ABIERTO:
+                if time.time() - self._abierto_desde < self.enfriamiento:
+                    return False
+                self._estado = self.SEMIABIERTO
+            if self._sondeando:
+                return False
+            self._sondeando = True
+            return True
+
+    def registrar_exito(self):
+        with self._lock:
+            if self._estado != self.CERRADO:
+                logger.info("✅ Circuito de IA cerrado: el modelo volvió a responder")
+            self._estado = self.CERRADO
+            self._fallos = 0
+            self._sondeando = False
+
+    def registrar_fallo(self):
+        with self._lock:
+            self._fallos += 1
+            self._sondeando = False
+            if self._estado == self.SEMIABIERTO or self._fallos >= self.fallos_para_abrir:
+                if self._estado != self.ABIERTO:
+                    logger.info("🔌 Circuito de IA abierto tras %s fallos; reintento en %.0fs", self._fallos, self.enfriamiento)
+                self._estado = self.ABIERTO
+                self._abierto_desde = time.time()
+
+
+class Solicitud:
+    """Llamada encolada; `listo` indica que ya hay resultado o error"""
+
+    __slots__ = ("funcion", "args", "plazo", "resultado", "error", "_evento")
+
+    def __init__(self, funcion: Callable, args: tuple, plazo: float):
+        self.funcion = funcion
+        self.args = args
+        self.plazo = plazo
+        self.resultado = None
+        self.error: Optional[Exception] = None
+        self._evento = threading.Event()
+
+    @property
+    def listo(self) -> bool:
+        return self._evento.is_set()
+
+    def _terminar(self, resultado=None, error: Exception = None):
+        self.resultado = resultado
+        self.error = error
+        self._evento.set()
+
+
+class IAGateway:
+    def __init__(self, max_concurrencia: int = IA_MAX_CONCURRENCIA,
+                 tamano_cola: int = IA_TAMANO_COLA,
+                 max_reintentos: int = IA_MAX_REINTENTOS):
+        self.max_concurrencia = max_concurrencia
+        self.max_reintentos = max_reintentos
+        self.circuito = CircuitBreaker()
+        self._cola: "queue.Queue[Solicitud]" = queue.Queue(maxsize=tamano_cola)
+        self._lock = threading.Lock()
+        self._workers_iniciados = False
+        self._socketio = None
+
+        self.en_curso = 0
+        self.completadas = 0
+        self.fallidas = 0
+        self.reintentos = 0
+        self.rechazadas = 0
+
+    def configure(self, socketio):
+        """Registra el servidor SocketIO para que `esperar` ceda con socketio.sleep."""
+        self._socketio = socketio
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def enviar(self, funcion: Callable, *args, plazo: float) -> Solicitud:
+        """
+        Encola funcion(*args, timeout=segundos_restantes).
+        plazo: epoch límite; pasado ese instante la solicitud ya no se intenta.
+        Nunca bloquea: si el circuito está abierto o la cola llena, la solicitud
+        vuelve terminada con error.
+        """
+        solicitud = Solicitud(funcion, args, plazo)
+
+        if self.circuito.estado == CircuitBreaker.ABIERTO:
+            self._rechazar(solicitud, CircuitoAbierto("Validación IA suspendida temporalmente"))
+            return solicitud
+
+        self._ensure_workers()
+        try:
+            self._cola.put_nowait(solicitud)
+        except queue.Full:
+            self._rechazar(solicitud, ColaLlena("Demasiadas validaciones pendientes"))
+        return solicitud
+
+    def esperar(self, solicitudes: Iterable[Solicitud], limite: float, intervalo: float = 0.05) -> bool:
+        """Espera (cediendo el control) hasta que todas terminen o llegue `limite`."""
+        pendientes = [s for s in solicitudes if not s.listo]
+        while pendientes:
+            restante = limite - time.time()
+            if restante <= 0:
+                return False
+            self._sleep(min(intervalo, restante))
+            pendientes = [s for s in pendientes if not s.listo]
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "circuito": self.circuito.estado,
+                "max_concurrencia": self.max_concurrencia,
+                "en_cola": self._cola.qsize(),
+                "en_curso": self.en_curso,
+                "completadas": self.completadas,
+                "fallidas": self.fallidas,
+                "reintentos": self.reintentos,
+                "rechazadas": self.rechazadas,
+            }
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _sleep(self, seconds: float):
+        if self._socketio is not None:
+            self._socketio.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _rechazar(self, solicitud: Solicitud, error: Exception):
+        with self._lock:
+            self.rechazadas += 1
+        solicitud._terminar(error=error)
+
+    def _ensure_workers(self):
+        if self._workers_iniciados:
+            return
+        with self._lock:
+            if self._workers_iniciados:
+                return
+            self._workers_iniciados = True
+        for i in range(self.max_concurrencia):
+            threading.Thread(target=self._worker, name=f"ia-gateway-{i}", daemon=True).start()
+
+    def _worker(self):
+        while True:
+            solicitud = self._cola.get()
+            with self._lock:
+                self.en_curso += 1
+            try:
+                solicitud._terminar(resultado=self._llamar(solicitud))
+                with self._lock:
+                    self.completadas += 1
+            except Exception as e:
+                solicitud._terminar(error=e)
+                with self._lock:
+                    self.fallidas += 1
+            finally:
+                with self._lock:
+                    self.en_curso -= 1
+
+    def _llamar(self, solicitud: Solicitud):
+        intento = 0
+        while True:
+            restante = solicitud.plazo - time.time()
+            if restante <= 0:
+                raise PlazoVencido("Solicitud vencida antes de llamar al modelo")
+            if not self.circuito.permitir():
+                raise CircuitoAbierto("Validación IA suspendida temporalmente")
+
+            try:
+                resultado = solicitud.funcion(*solicitud.args, timeout=restante)
+            except ERRORES_TRANSITORIOS as e:
+                self.circuito.registrar_fallo()
+                espera = min(IA_BACKOFF_MAX, IA_BACKOFF_BASE * (2 ** intento)) * random.uniform(0.5, 1.0)
+                if intento >= self.max_reintentos or time.time() + espera >= solicitud.plazo:
+                    raise
+                logger.warning("🔁 Error transitorio del modelo (%s); reintento en %.2fs", type(e).__name__, espera)
+                with self._lock:
+                    self.reintentos += 1
+                time.sleep(espera)
+                intento += 1
+                continue
+            except Exception:
+                self.circuito.registrar_fallo()
+                raise
+
+            self.circuito.registrar_exito()
+            return resultado
+
+
+# Singleton global
+ia_gateway = IAGateway()
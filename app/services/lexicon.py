@@ -0,0 +1,159 @@
+"""
+📚 Lexicon - Validación local con diccionarios por categoría
+
+Motor de validación sin red que decide en microsegundos las respuestas
+conocidas; solo las desconocidas siguen hacia el cache de veredictos y la IA.
+
+- Un archivo por categoría en app/data/lexicones (una entrada por línea, # comenta)
+- Índice compacto: lista ordenada de entradas normalizadas (sin acentos ni mayúsculas)
+- Búsqueda exacta por bisección
+- Búsqueda aproximada (errores de tipeo) limitada al rango de la letra inicial
+  y a longitudes cercanas, con distancia de edición acotada
+
+Los motores son intercambiables: cualquier objeto con
+`validar(respuesta, categoria, letra) -> (es_valida, razon, confianza) | None`.
+"""
+
+import logging
+import os
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.text import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+LEXICON_DIR = os.getenv(
+    "LEXICON_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "lexicones"),
+)
+
+# Categoría del juego (normalizada) -> archivo del diccionario
+ARCHIVOS_POR_CATEGORIA = {
+    "nombre": "nombre.txt",
+    "apellido": "apellido.txt",
+    "ciudad/pais": "pais_ciudad.txt",
+    "pais": "pais_ciudad.txt",
+    "ciudad": "pais_ciudad.txt",
+    "animal": "animal.txt",
+    "fruta/verdura": "fruta_verdura.txt",
+    "color": "color.txt",
+    "marca": "marca.txt",
+    "comida": "comida.txt",
+    "profesion": "profesion.txt",
+}
+
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """Levenshtein con corte temprano: devuelve maximo + 1 si se supera el límite."""
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        minimo_fila = i
+        for j, cb in enumerate(b, 1):
+            valor = min(
+                anterior[j] + 1,
+                actual[j - 1] + 1,
+                anterior[j - 1] + (ca != cb),
+            )
+            actual.append(valor)
+            minimo_fila = min(minimo_fila, valor)
+        if minimo_fila > maximo:
+            return maximo + 1
+        anterior = actual
+    return anterior[-1]
+
+
+class Lexicon:
+    """Índice ordenado de entradas normalizadas de una categoría"""
+
+    def __init__(self, entradas):
+        self._entradas: List[str] = sorted({normalizar_texto(e) for e in entradas if e.strip()})
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def contiene(self, palabra: str) -> bool:
+        palabra = normalizar_texto(palabra)
+        i = bisect_left(self._entradas, palabra)
+        return i < len(self._entradas) and self._entradas[i] == palabra
+
+    def similar(self, palabra: str, maximo: int) -> Optional[str]:
+        """Entrada más cercana con la misma inicial a distancia <= maximo (o None)."""
+        palabra = normalizar_texto(palabra)
+        if not palabra:
+            return None
+
+        inicial = palabra[0]
+        inicio = bisect_left(self._entradas, inicial)
+        fin = bisect_left(self._entradas, chr(ord(inicial) + 1))
+
+        mejor, mejor_distancia = None, maximo + 1
+        for entrada in self._entradas[inicio:fin]:
+            if abs(len(entrada) - len(palabra)) > maximo:
+                continue
+            distancia = distancia_edicion(palabra, entrada, maximo)
+            if distancia < mejor_distancia:
+                mejor, mejor_distancia = entrada, distancia
+                if distancia == 0:
+                    break
+        return mejor
+
+
+def cargar_lexicones(directorio: str = LEXICON_DIR) -> Dict[str, Lexicon]:
+    """Carga un Lexicon por archivo (compartido entre categorías que usan el mismo)."""
+    por_archivo: Dict[str, Lexicon] = {}
+    for archivo in set(ARCHIVOS_POR_CATEGORIA.values()):
+        ruta = os.path.join(directorio, archivo)
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                por_archivo[archivo] = Lexicon(
+                    linea for linea in (l.strip() for l in f) if linea and not linea.startswith("#")
+                )
+        except OSError as e:
+            logger.warning("⚠️ No se pudo cargar el diccionario %s: %s", archivo, e)
+
+    return {
+        categoria: por_archivo[archivo]
+        for categoria, archivo in ARCHIVOS_POR_CATEGORIA.items()
+        if archivo in por_archivo
+    }
+
+
+class LexiconEngine:
+    """Motor local: acepta respuestas que están (o casi) en el diccionario de la categoría"""
+
+    nombre = "lexicon"
+
+    def __init__(self, lexicones: Dict[str, Lexicon] = None):
+        self.lexicones = lexicones if lexicones is not None else cargar_lexicones()
+
+    @staticmethod
+    def _max_distancia(palabra: str) -> int:
+        # Palabras cortas: sin tolerancia ("Ana" y "Asa" son distintas)
+        if len(palabra) < 5:
+            return 0
+        return 1 if len(palabra) < 9 else 2
+
+    def validar(self, respuesta: str, categoria: str, letra: str) -> Optional[Tuple[bool, str, float]]:
+        lexicon = self.lexicones.get(normalizar_texto(categoria))
+        if lexicon is None:
+            return None
+
+        if lexicon.contiene(respuesta):
+            return True, f"Encontrada en el diccionario de {categoria}", 1.0
+
+        maximo = self._max_distancia(normalizar_texto(respuesta))
+        if maximo:
+            cercana = lexicon.similar(respuesta, maximo)
+            if cercana:
+                return True, f"Coincide con '{cercana}' (posible error de tipeo)", 0.8
+
+        return None
+
+
+# Singleton global
+lexicon_engine = LexiconEngine()
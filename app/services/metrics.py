@@ -0,0 +1,252 @@
+"""
+📈 Metrics - Registro de métricas expuesto en formato de texto de Prometheus
+
+Los contadores de cada servicio (pool, gateway de IA, emisor...) solo se
+veían en JSON desde el panel y no había latencias de los caminos calientes.
+Este registro:
+- Define contadores, medidores e histogramas (con etiquetas) que los
+  servicios actualizan en el momento: latencia de cada evento de Socket.IO,
+  escrituras a la base, llamadas de validación a la IA, deriva del reloj y
+  sockets conectados
+- Al consultar /metrics agrega lo que ya medían los servicios (sus `stats()`)
+  mediante recolectores que se llaman solo en ese momento: los campos que solo
+  crecen se exponen como contadores `_total` y el resto como medidores
+- Genera el formato de texto 0.0.4 de Prometheus sin dependencias extra
+
+Las métricas son por proceso: con varios workers Prometheus debe consultar
+cada uno (o sumar por instancia).
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Segundos: de un handler en memoria (ms) a una llamada al modelo (varios s)
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_DERIVA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._valores: Dict[Tuple[str, ...], object] = {}
+
+    def _clave(self, etiquetas: Dict) -> Tuple[str, ...]:
+        return tuple(str(etiquetas.get(n, "")) for n in self.etiquetas)
+
+    def encabezado(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor: float = 1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def lineas(self) -> List[str]:
+        with self._lock:
+            valores = list(self._valores.items())
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, k)} {_numero(v)}" for k, v in valores]
+
+
+class Medidor(Contador):
+    tipo = "gauge"
+
+    def dec(self, valor: float = 1, **etiquetas):
+        self.inc(-valor, **etiquetas)
+
+    def set(self, valor: float, **etiquetas):
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = valor
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor: float, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._valores.get(clave)
+            if serie is None:
+                # [conteo por bucket (no acumulado)..., +Inf], suma
+                serie = self._valores[clave] = [[0] * (len(self.buckets) + 1), 0.0]
+            i = 0
+            while i < len(self.buckets) and valor > self.buckets[i]:
+                i += 1
+            serie[0][i] += 1
+            serie[1] += valor
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """Observa lo que tarda el bloque (también si termina con excepción)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def lineas(self) -> List[str]:
+        with self._lock:
+            series = [(k, list(conteos), suma) for k, (conteos, suma) in self._valores.items()]
+        lineas = []
+        for clave, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                le = _etiquetas(self.etiquetas, clave, f'le="{_numero(limite)}"')
+                lineas.append(f"{self.nombre}_bucket{le} {acumulado}")
+            etiquetas = _etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {acumulado}")
+        return lineas
+
+
+class RegistroMetricas:
+    def __init__(self, prefijo: str = "basta"):
+        self.prefijo = prefijo
+        self._metricas: Dict[str, _Metrica] = {}
+        self._recolectores: List[Tuple[str, Callable[[], Dict], frozenset, frozenset]] = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Definición
+    # ------------------------------------------------------------------
+    def contador(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = ()) -> Contador:
+        return self._registrar(Contador(f"{self.prefijo}_{nombre}", ayuda, etiquetas))
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = ()) -> Medidor:
+        return self._registrar(Medidor(f"{self.prefijo}_{nombre}", ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = (),
+                   buckets: Tuple[float, ...] = BUCKETS_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(f"{self.prefijo}_{nombre}", ayuda, etiquetas, buckets))
+
+    def recolector(self, componente: str, fn: Callable[[], Dict],
+                   contadores: Iterable[str] = (), excluir: Iterable[str] = ()):
+        """
+        `fn()` se llama en cada consulta y sus valores numéricos se exponen
+        como `<prefijo>_<componente>_<campo>` (ej: stats de un servicio):
+        - contadores: campos que solo crecen, como counter con sufijo `_total`
+        - excluir: campos que no son series (ej: configuración fija)
+        - el resto, como medidores
+        """
+        with self._lock:
+            self._recolectores.append((componente, fn, frozenset(contadores), frozenset(excluir)))
+
+    # ------------------------------------------------------------------
+    # Exposición
+    # ------------------------------------------------------------------
+    def exponer(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+            recolectores = list(self._recolectores)
+
+        lineas = []
+        for metrica in metricas:
+            valores = metrica.lineas()
+            if valores:
+                lineas.extend(metrica.encabezado())
+                lineas.extend(valores)
+
+        for componente, fn, contadores, excluir in recolectores:
+            try:
+                datos = fn() or {}
+            except Exception as e:
+                lineas.append(f"# {componente}: error al recolectar: {_escapar(e)}")
+                continue
+            for campo, valor in datos.items():
+                if campo in excluir:
+                    continue
+                if isinstance(valor, bool):
+                    valor = int(valor)
+                if not isinstance(valor, (int, float)):
+                    continue  # Texto (ej: estado del circuito): no es una serie
+                nombre = f"{self.prefijo}_{componente}_{campo}"
+                if campo in contadores:
+                    if not nombre.endswith("_total"):
+                        nombre += "_total"
+                    lineas.append(f"# TYPE {nombre} counter")
+                else:
+                    lineas.append(f"# TYPE {nombre} gauge")
+                lineas.append(f"{nombre} {_numero(valor)}")
+        return "\n".join(lineas) + "\n"
+
+    def _registrar(self, metrica: _Metrica):
+        with self._lock:
+            self._metricas[metrica.nombre] = metrica
+        return metrica
+
+
+# Singleton global
+metricas = RegistroMetricas()
+
+# Métricas de los caminos calientes
+EVENTOS_SOCKETIO = metricas.histograma(
+    "socketio_evento_segundos", "Duración de los handlers de Socket.IO (incluye la espera del turno de la sala)",
+    ("evento",),
+)
+EVENTOS_SOCKETIO_ERRORES = metricas.contador(
+    "socketio_evento_errores_total", "Handlers de Socket.IO que terminaron con excepción", ("evento",),
+)
+SOCKETS_CONECTADOS = metricas.medidor("sockets_conectados", "Sockets conectados a este proceso")
+DB_ESCRITURAS = metricas.histograma(
+    "db_escritura_segundos", "Duración de las escrituras de salas a la base", ("operacion",),
+)
+IA_VALIDACIONES = metricas.histograma(
+    "ia_validacion_segundos", "Duración de las llamadas al modelo para validar respuestas", ("resultado",),
+)
+DERIVA_RELOJ = metricas.histograma(
+    "reloj_deriva_segundos", "Atraso de cada tick del reloj respecto de su instante programado",
+    buckets=BUCKETS_DERIVA,
+)
+
+
+def medir_evento(evento: str):
+    """Decorador para handlers de Socket.IO: latencia y errores por evento."""
+    def decorador(handler: Callable):
+        @functools.wraps(handler)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            except Exception:
+                EVENTOS_SOCKETIO_ERRORES.inc(evento=evento)
+                raise
+            finally:
+                EVENTOS_SOCKETIO.observar(time.perf_counter() - inicio, evento=evento)
+        return envoltura
+    return decorador
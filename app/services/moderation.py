@@ -0,0 +1,160 @@
+"""
+🚫 Moderación - Filtro de palabras prohibidas compartido por chat y respuestas
+
+Antes había dos copias (chat y validación) que normalizaban distinto y
+recorrían toda la lista haciendo búsqueda de subcadenas en cada mensaje.
+Ahora:
+- La lista se carga de app/data/palabras_prohibidas.txt (o
+  PALABRAS_PROHIBIDAS_FILE) y se puede ampliar en caliente con `agregar`
+- Texto y patrones pasan por la misma normalización: minúsculas, sin tildes,
+  leet (p3nd3j0 -> pendejo), sin signos (p.u.t.a -> puta) y sin letras
+  repetidas (mieeerda -> mierda)
+- Un autómata Aho-Corasick precompilado recorre el texto una sola vez: el
+  costo depende del largo del mensaje, no del tamaño de la lista
+- Los patrones deben empezar donde empieza una palabra ("computadora" no
+  contiene "puta"); sin * al final también deben terminar con ella
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from app.utils.text import quitar_acentos
+
+logger = logging.getLogger(__name__)
+
+PALABRAS_PROHIBIDAS_FILE = os.getenv(
+    "PALABRAS_PROHIBIDAS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "palabras_prohibidas.txt"),
+)
+
+LEET = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t",
+    "@": "a", "$": "s",
+})
+
+
+def normalizar_moderacion(texto: str) -> str:
+    """Forma canónica para moderar: minúsculas, sin tildes, leet, sin signos ni repeticiones."""
+    texto = quitar_acentos(texto or "").lower().translate(LEET)
+    resultado = []
+    for ch in texto:
+        if ch.isspace():
+            ch = " "
+        elif not ch.isalpha():
+            continue  # "p.u.t.a" -> "puta"
+        if resultado and resultado[-1] == ch:
+            continue  # "mieeerda" -> "mierda", espacios colapsados
+        resultado.append(ch)
+    return "".join(resultado).strip()
+
+
+class AhoCorasick:
+    """Autómata de búsqueda de múltiples patrones en una sola pasada"""
+
+    def __init__(self, patrones: Iterable[str]):
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._fallo: List[int] = [0]
+        # Por estado: patrones que terminan ahí (incluidos los de sus enlaces de fallo)
+        self._salidas: List[List[str]] = [[]]
+
+        for patron in patrones:
+            if patron:
+                self._insertar(patron)
+        self._construir_fallos()
+
+    def _insertar(self, patron: str):
+        estado = 0
+        for ch in patron:
+            siguiente = self._transiciones[estado].get(ch)
+            if siguiente is None:
+                siguiente = len(self._transiciones)
+                self._transiciones[estado][ch] = siguiente
+                self._transiciones.append({})
+                self._fallo.append(0)
+                self._salidas.append([])
+            estado = siguiente
+        self._salidas[estado].append(patron)
+
+    def _construir_fallos(self):
+        cola = deque(self._transiciones[0].values())
+        while cola:
+            estado = cola.popleft()
+            for ch, siguiente in self._transiciones[estado].items():
+                cola.append(siguiente)
+                fallo = self._fallo[estado]
+                while fallo and ch not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(ch, 0)
+                self._fallo[siguiente] = destino if destino != siguiente else 0
+                self._salidas[siguiente] = self._salidas[siguiente] + self._salidas[self._fallo[siguiente]]
+
+    def buscar(self, texto: str):
+        """Genera (inicio, patron) por cada aparición en el texto."""
+        estado = 0
+        transiciones, fallo, salidas = self._transiciones, self._fallo, self._salidas
+        for i, ch in enumerate(texto):
+            while estado and ch not in transiciones[estado]:
+                estado = fallo[estado]
+            estado = transiciones[estado].get(ch, 0)
+            for patron in salidas[estado]:
+                yield i - len(patron) + 1, patron
+
+
+class Moderador:
+    def __init__(self, archivo: str = PALABRAS_PROHIBIDAS_FILE):
+        # (patron normalizado -> True si basta con el comienzo de la palabra, autómata)
+        self._compilado: Tuple[Dict[str, bool], AhoCorasick] = ({}, AhoCorasick([]))
+        self._lock = threading.Lock()
+        self.agregar(self._leer_archivo(archivo))
+
+    @staticmethod
+    def _leer_archivo(archivo: str) -> List[str]:
+        try:
+            with open(archivo, "r", encoding="utf-8") as f:
+                return [linea for linea in (l.strip() for l in f) if linea and not linea.startswith("#")]
+        except OSError as e:
+            logger.warning("⚠️ No se pudo cargar la lista de palabras prohibidas: %s", e)
+            return []
+
+    def agregar(self, palabras: Iterable[str]):
+        """Agrega palabras a la lista (con * al final: prefijo) y recompila el autómata."""
+        with self._lock:
+            patrones = dict(self._compilado[0])
+            for palabra in palabras:
+                prefijo = palabra.endswith("*")
+                normalizada = normalizar_moderacion(palabra.rstrip("*"))
+                if normalizada:
+                    patrones[normalizada] = patrones.get(normalizada, False) or prefijo
+            # Reemplazo atómico: las búsquedas en curso siguen con el autómata anterior
+            self._compilado = (patrones, AhoCorasick(patrones))
+
+    def __len__(self):
+        return len(self._compilado[0])
+
+    def encontrar(self, texto: str) -> List[Tuple[int, str]]:
+        """Palabras prohibidas del texto como [(posición en el texto normalizado, patrón)]."""
+        normalizado = normalizar_moderacion(texto)
+        patrones, automata = self._compilado
+        encontradas = []
+        for inicio, patron in automata.buscar(normalizado):
+            if inicio > 0 and normalizado[inicio - 1] != " ":
+                continue  # No empieza una palabra
+            fin = inicio + len(patron)
+            if not patrones.get(patron) and fin < len(normalizado) and normalizado[fin] != " ":
+                continue  # Palabra completa requerida
+            encontradas.append((inicio, patron))
+        return encontradas
+
+    def contiene_prohibidas(self, texto: str) -> bool:
+        return bool(self.encontrar(texto))
+
+
+# Singleton global
+moderador = Moderador()
+
+
+def contiene_palabras_prohibidas(texto: str) -> bool:
+    return moderador.contiene_prohibidas(texto)
@@ -0,0 +1,295 @@
+"""
+🟥 Redis Store - Estado compartido entre workers y nodos
+
+Misma interfaz que StateStore, pero las salas y las sesiones de socket viven
+en Redis, así que varios workers de gunicorn/eventlet (o varios nodos) ven el
+mismo estado:
+- Un hash por sala (`basta:sala:<codigo>`): un campo por clave de la sala con
+  su valor en JSON; el conjunto `basta:salas` indexa los códigos y el hash
+  `basta:num_mensajes` lleva el largo del chat de cada una (para el índice)
+- Escrituras por campo: HSET/HDEL solo de los campos modificados, en un MULTI
+- Cambios dentro de un campo JSON (ej: respuestas_ronda de un jugador) con
+  WATCH/MULTI: leer, modificar y escribir sin pisar cambios de otro worker;
+  en un campo lista (ej: jugadores) el cambio es agregar o quitar un elemento
+- Sesiones (`basta:sesion:<sid>`) con expiración, indexadas por sala
+  (`basta:sala_sesiones:<codigo>`) para cerrarlas cuando la sala expira
+- `reclamar` (SET NX EX) para que una transición (ej: fin de ronda) la
+  ejecute un solo worker
+
+Los valores se guardan con la misma serialización que usa room_cache para
+sus firmas (JSON con claves ordenadas), así get_sala_con_firmas devuelve las
+firmas sin volver a serializar.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import redis
+
+from app.services.room_index import CAMPOS_INDICE, IndiceSalas, resumen_sala
+
+PREFIJO = "basta:"
+SESION_TTL = 24 * 3600
+# Cada worker reconstruye el índice del panel admin como mucho cada tantos segundos
+INDICE_TTL = float(os.getenv("REDIS_INDICE_TTL", "5"))
+
+
+def _serializar(valor) -> str:
+    return json.dumps(valor, sort_keys=True, default=str)
+
+
+class RedisStateStore:
+    compartido = True
+
+    def __init__(self, cliente: "redis.Redis", prefijo: str = PREFIJO):
+        self.redis = cliente
+        self.prefijo = prefijo
+        self._indice: Optional[IndiceSalas] = None
+        self._indice_vence = 0.0
+        self._indice_version = 0
+        self._indice_lock = threading.Lock()
+
+    @classmethod
+    def desde_url(cls, url: str) -> "RedisStateStore":
+        cliente = redis.Redis.from_url(url, decode_responses=True, socket_timeout=5)
+        cliente.ping()
+        return cls(cliente)
+
+    def _clave_sala(self, codigo: str) -> str:
+        return f"{self.prefijo}sala:{codigo}"
+
+    # ------------------------------------------------------------------
+    # Salas
+    # ------------------------------------------------------------------
+    def get_sala_con_firmas(self, codigo: str) -> Optional[Tuple[Dict, Dict[str, str]]]:
+        """(sala, {campo: json_guardado}) o None si no existe"""
+        crudo = self.redis.hgetall(self._clave_sala(codigo))
+        if not crudo:
+            return None
+        return {campo: json.loads(valor) for campo, valor in crudo.items()}, crudo
+
+    def get_sala(self, codigo: str) -> Optional[Dict]:
+        leida = self.get_sala_con_firmas(codigo)
+        return leida[0] if leida else None
+
+    def set_sala(self, codigo: str, data: Dict, campos: Optional[Iterable] = None):
+        """
+        Guarda una sala.
+        - campos None: reemplaza la sala completa
+        - campos: solo esos campos (str) o claves dentro de un campo JSON
+          (tuplas (campo, clave)), sin tocar el resto. Si el campo es una
+          lista, (campo, elemento) agrega el elemento si está en data[campo]
+          o lo quita si no, y data[campo] queda con la lista resultante
+        """
+        clave = self._clave_sala(codigo)
+
+        if campos is None:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(clave)
+            if data:
+                pipe.hset(clave, mapping={k: _serializar(v) for k, v in data.items()})
+            pipe.sadd(self.prefijo + "salas", codigo)
+            self._contar_mensajes(pipe, codigo, data)
+            pipe.execute()
+            return
+
+        completos = {c for c in campos if isinstance(c, str)}
+        patches = [c for c in campos if isinstance(c, tuple) and c[0] not in completos]
+
+        if completos:
+            pipe = self.redis.pipeline(transaction=True)
+            presentes = {c: _serializar(data[c]) for c in completos if c in data}
+            if presentes:
+                pipe.hset(clave, mapping=presentes)
+            ausentes = [c for c in completos if c not in data]
+            if ausentes:
+                pipe.hdel(clave, *ausentes)
+            pipe.sadd(self.prefijo + "salas", codigo)
+            if "mensajes_chat" in completos:
+                self._contar_mensajes(pipe, codigo, data)
+            pipe.execute()
+
+        for campo, subclave in patches:
+            if isinstance(data.get(campo), list):
+                data[campo] = self.cambiar_lista(codigo, campo, subclave, subclave in data[campo])
+                continue
+            valor = (data.get(campo) or {}).get(subclave)
+            self.patch_campo(codigo, campo, subclave, valor)
+
+    def cambiar_lista(self, codigo: str, campo: str, elemento, presente: bool) -> list:
+        """
+        Agrega (presente=True) o quita un elemento de un campo lista de forma
+        atómica (WATCH/MULTI) y devuelve la lista como quedó: dos workers que
+        suman jugadores a la vez no se pisan
+        """
+        clave = self._clave_sala(codigo)
+        resultado = []
+
+        def _aplicar(pipe):
+            actual = pipe.hget(clave, campo)
+            lista = json.loads(actual) if actual else []
+            if not isinstance(lista, list):
+                lista = []
+            if presente and elemento not in lista:
+                lista.append(elemento)
+            elif not presente:
+                lista = [e for e in lista if e != elemento]
+            pipe.multi()
+            pipe.hset(clave, campo, _serializar(lista))
+            resultado[:] = lista
+
+        self.redis.transaction(_aplicar, clave)
+        return resultado
+
+    def _contar_mensajes(self, pipe, codigo: str, data: Dict):
+        """Encola la actualización del largo del chat (el índice no lee los mensajes)"""
+        if "mensajes_chat" in data:
+            pipe.hset(self.prefijo + "num_mensajes", codigo, len(data["mensajes_chat"] or []))
+        else:
+            pipe.hdel(self.prefijo + "num_mensajes", codigo)
+
+    def patch_campo(self, codigo: str, campo: str, subclave: str, valor):
+        """Cambia una clave dentro de un campo JSON de forma atómica (WATCH/MULTI)."""
+        clave = self._clave_sala(codigo)
+
+        def _aplicar(pipe):
+            actual = pipe.hget(clave, campo)
+            documento = json.loads(actual) if actual else {}
+            if not isinstance(documento, dict):
+                documento = {}
+            if valor is None:
+                documento.pop(subclave, None)
+            else:
+                documento[subclave] = valor
+            pipe.multi()
+            pipe.hset(clave, campo, _serializar(documento))
+
+        self.redis.transaction(_aplicar, clave)
+
+    def delete_sala(self, codigo: str):
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(self._clave_sala(codigo))
+        pipe.srem(self.prefijo + "salas", codigo)
+        pipe.hdel(self.prefijo + "num_mensajes", codigo)
+        pipe.execute()
+
+    def get_all_salas(self) -> Dict[str, Dict]:
+        codigos = sorted(self.redis.smembers(self.prefijo + "salas"))
+        if not codigos:
+            return {}
+        pipe = self.redis.pipeline(transaction=False)
+        for codigo in codigos:
+            pipe.hgetall(self._clave_sala(codigo))
+        salas = {}
+        for codigo, crudo in zip(codigos, pipe.execute()):
+            if crudo:
+                salas[codigo] = {campo: json.loads(valor) for campo, valor in crudo.items()}
+        return salas
+
+    def get_indice(self) -> Dict[str, Dict]:
+        """
+        {codigo: resumen} con solo los campos de CAMPOS_INDICE (HMGET por sala)
+        y el largo del chat guardado aparte, sin leer los mensajes
+        """
+        codigos = sorted(self.redis.smembers(self.prefijo + "salas"))
+        if not codigos:
+            return {}
+        pipe = self.redis.pipeline(transaction=False)
+        for codigo in codigos:
+            pipe.hmget(self._clave_sala(codigo), CAMPOS_INDICE)
+        pipe.hgetall(self.prefijo + "num_mensajes")
+        *por_sala, num_mensajes = pipe.execute()
+        indice = {}
+        for codigo, valores in zip(codigos, por_sala):
+            if any(v is not None for v in valores):
+                resumen = resumen_sala({
+                    campo: json.loads(v) for campo, v in zip(CAMPOS_INDICE, valores) if v is not None
+                })
+                if codigo in num_mensajes:
+                    resumen["num_mensajes"] = int(num_mensajes[codigo])
+                indice[codigo] = resumen
+        return indice
+
+    def _indice_admin(self) -> IndiceSalas:
+        """
+        Los cambios de sala llegan de todos los workers: en vez de contadores
+        por escritura, el índice se reconstruye desde Redis a lo sumo cada
+        INDICE_TTL segundos y el panel consulta la copia
+        """
+        with self._indice_lock:
+            if self._indice is None or time.time() >= self._indice_vence:
+                resumenes = self.get_indice()
+                if self._indice is None or dict(self._indice) != resumenes:
+                    self._indice_version += 1
+                    self._indice = IndiceSalas(resumenes)
+                self._indice_vence = time.time() + INDICE_TTL
+            return self._indice
+
+    def get_agregados(self) -> Dict:
+        # La versión es la de la reconstrucción (la del IndiceSalas arranca de cero en cada una)
+        return {**self._indice_admin().agregados(), "version": self._indice_version}
+
+    def listar_salas(self, estado: Optional[str] = None, offset: int = 0, limite: int = 50):
+        return self._indice_admin().pagina(estado, offset, limite)
+
+    def create_sala(self, codigo: str, anfitrion: str) -> Dict:
+        sala = {
+            "anfitrion": anfitrion,
+            "jugadores": [anfitrion],
+            "jugadores_ids": {},
+            "ids_jugadores": {},
+            "en_curso": False,
+            "ronda_actual": 1,
+            "puntuaciones": {anfitrion: 0},
+            "mensajes_chat": [],
+            "configuracion": {}
+        }
+        self.set_sala(codigo, sala)
+        return sala
+
+    def save(self):
+        """Sin efecto: cada escritura ya quedó en Redis (su persistencia es RDB/AOF)"""
+
+    # ------------------------------------------------------------------
+    # Sesiones de socket
+    # ------------------------------------------------------------------
+    def registrar_sesion(self, sid: str, codigo: str, jugador: str):
+        clave = f"{self.prefijo}sesion:{sid}"
+        indice = f"{self.prefijo}sala_sesiones:{codigo}"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(clave, mapping={"codigo": codigo or "", "jugador": jugador or ""})
+        pipe.expire(clave, SESION_TTL)
+        pipe.sadd(indice, sid)
+        pipe.expire(indice, SESION_TTL)
+        pipe.execute()
+
+    def get_sesion(self, sid: str) -> Optional[Dict]:
+        return self.redis.hgetall(f"{self.prefijo}sesion:{sid}") or None
+
+    def cerrar_sesion(self, sid: str) -> Tuple[Optional[str], Optional[str]]:
+        """Quita la sesión y devuelve (codigo, jugador) o (None, None)"""
+        clave = f"{self.prefijo}sesion:{sid}"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hgetall(clave)
+        pipe.delete(clave)
+        sesion, _ = pipe.execute()
+        if sesion.get("codigo"):
+            self.redis.srem(f"{self.prefijo}sala_sesiones:{sesion['codigo']}", sid)
+        return sesion.get("codigo") or None, sesion.get("jugador") or None
+
+    def cerrar_sesiones_de_sala(self, codigo: str):
+        """Quita las sesiones que apuntan a una sala (sala expirada)"""
+        indice = f"{self.prefijo}sala_sesiones:{codigo}"
+        sids = self.redis.smembers(indice)
+        pipe = self.redis.pipeline(transaction=True)
+        for sid in sids:
+            pipe.delete(f"{self.prefijo}sesion:{sid}")
+        pipe.delete(indice)
+        pipe.execute()
+
+    def reclamar(self, clave: str, ttl: int = 60) -> bool:
+        """True solo para el primer worker que reclama `clave` antes de que expire"""
+        return bool(self.redis.set(f"{self.prefijo}reclamo:{clave}", "1", nx=True, ex=int(ttl)))
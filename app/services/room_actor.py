@@ -0,0 +1,123 @@
+"""
+🎭 Room Actor - Los eventos de cada sala se procesan de a uno y en orden
+
+Los handlers (respuestas, BASTA, listo, join...) y el reloj leían la sala,
+la modificaban y la escribían sin coordinarse: con dos eventos a la vez
+ganaba el último en escribir y finalizar_ronda podía correr junto al reloj.
+Cada sala tiene ahora un buzón:
+- Quien procesa un evento de la sala toma un turno en el buzón; los turnos
+  se atienden en orden de llegada (FIFO) y de a uno por sala
+- Salas distintas no comparten buzón, así que avanzan en paralelo (no hay
+  un lock global)
+- El turno es reentrante: un comando puede llamar a otro de la misma sala
+  (BASTA -> finalizar_ronda) sin bloquearse
+- El reloj (expiración) y la evaluación de la ronda toman su turno desde
+  sus propias tareas; la validación con IA corre fuera del turno
+- El buzón se descarta cuando no queda nadie esperando
+
+El orden es por proceso: con varios workers (Redis) las transiciones únicas
+(fin de ronda, expiración) siguen protegidas por state_store.reclamar.
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+
+class _Buzon:
+    __slots__ = ("cond", "siguiente", "atendiendo", "dueno", "profundidad", "usuarios")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.siguiente = 0   # Próximo turno a entregar
+        self.atendiendo = 0  # Turno que se está procesando
+        self.dueno = None    # Hilo que tiene el turno (para reentrar)
+        self.profundidad = 0
+        self.usuarios = 0    # Turnos entregados y no terminados
+
+
+class RoomActor:
+    def __init__(self):
+        self._buzones: Dict[str, _Buzon] = {}
+        self._lock = threading.Lock()
+
+        self.stats = {"comandos": 0, "esperas": 0, "espera_max": 0.0}
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    @contextmanager
+    def turno(self, codigo: str):
+        """Procesa el bloque con la sala `codigo` en exclusiva (en orden de llegada)."""
+        if not codigo:
+            yield
+            return
+
+        hilo = threading.get_ident()
+        with self._lock:
+            buzon = self._buzones.get(codigo)
+            if buzon is not None and buzon.dueno == hilo:
+                buzon.profundidad += 1
+                reentrante = True
+            else:
+                if buzon is None:
+                    buzon = self._buzones[codigo] = _Buzon()
+                buzon.usuarios += 1
+                reentrante = False
+
+        if reentrante:
+            try:
+                yield
+            finally:
+                buzon.profundidad -= 1
+            return
+
+        inicio = time.time()
+        with buzon.cond:
+            turno = buzon.siguiente
+            buzon.siguiente += 1
+            while buzon.atendiendo != turno:
+                buzon.cond.wait()
+            buzon.dueno = hilo
+        self._registrar(time.time() - inicio)
+
+        try:
+            yield
+        finally:
+            with buzon.cond:
+                buzon.dueno = None
+                buzon.atendiendo += 1
+                buzon.cond.notify_all()
+            with self._lock:
+                buzon.usuarios -= 1
+                if buzon.usuarios == 0 and self._buzones.get(codigo) is buzon:
+                    del self._buzones[codigo]
+
+    def serializado(self, handler: Callable):
+        """Decorador para handlers de Socket.IO cuyo payload trae "codigo"."""
+        @functools.wraps(handler)
+        def envoltura(data=None, *args, **kwargs):
+            codigo = data.get("codigo") if isinstance(data, dict) else None
+            with self.turno(codigo):
+                return handler(data, *args, **kwargs)
+        return envoltura
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "salas_activas": len(self._buzones)}
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _registrar(self, espera: float):
+        with self._lock:
+            self.stats["comandos"] += 1
+            if espera > 0.001:
+                self.stats["esperas"] += 1
+            self.stats["espera_max"] = max(self.stats["espera_max"], round(espera, 4))
+
+
+# Singleton global
+room_actor = RoomActor()
@@ -0,0 +1,285 @@
+"""
+🗃️ Room Cache - Cache en memoria con escritura diferida delante de DatabaseStore
+
+Los handlers leían la sala completa de PostgreSQL y la reescribían entera en
+cada evento. Este cache:
+- Sirve las lecturas desde memoria (la sala se carga de db_store una sola vez)
+- Detecta qué campos cambiaron (firma JSON por campo) o usa los que se indiquen
+- Un campo puede ser ("respuestas_ronda", "Ana"): solo cambió esa clave y se
+  escribe como patch JSON (jsonb_set) en vez de reescribir la columna. En un
+  campo lista, ("jugadores", "Ana") agrega o quita ese elemento (ver
+  RedisStateStore.set_sala) y en la base se escribe la lista completa
+- Agrupa los cambios y los escribe en la base cada `FLUSH_INTERVAL` segundos
+- Escribe de inmediato en las transiciones críticas (inicio, BASTA, resultados)
+- Mantiene sincronizado state_store (admin, desconexiones, checkpoint local)
+
+Con un state_store compartido (Redis, varios workers) la memoria del proceso
+no sirve como fuente de verdad: cada lectura trae la sala de Redis con las
+firmas de sus campos y cada escritura envía a Redis solo los campos que el
+handler cambió; la escritura diferida a la base se mantiene igual.
+
+La durabilidad se configura por tipo de evento con DURABILIDAD_POR_EVENTO o
+la variable ROOM_CACHE_DURABILIDAD (ej: "chat=critica,player_ready=diferida").
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from app.services.db_store import db_store
+from app.services.state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+DIFERIDA = "diferida"  # Se escribe en el próximo flush periódico
+CRITICA = "critica"    # Se escribe antes de devolver el control al handler
+
+FLUSH_INTERVAL = float(os.getenv("ROOM_CACHE_FLUSH_INTERVAL", "2.0"))
+
+DURABILIDAD_POR_EVENTO = {
+    "crear_sala": CRITICA,
+    "join": DIFERIDA,
+    "rejoin": DIFERIDA,
+    "player_ready": DIFERIDA,
+    "chat": DIFERIDA,
+    "respuestas": DIFERIDA,
+    "inicio_ronda": CRITICA,
+    "pausa": CRITICA,
+    "basta": CRITICA,
+    "fin_ronda": CRITICA,
+    "resultados": CRITICA,
+}
+
+
+def _cargar_durabilidad_env():
+    config = os.getenv("ROOM_CACHE_DURABILIDAD", "")
+    for item in config.split(","):
+        if "=" not in item:
+            continue
+        evento, nivel = (parte.strip() for parte in item.split("=", 1))
+        if nivel in (DIFERIDA, CRITICA):
+            DURABILIDAD_POR_EVENTO[evento] = nivel
+
+
+_cargar_durabilidad_env()
+
+
+def _firma(valor) -> str:
+    return json.dumps(valor, sort_keys=True, default=str)
+
+
+class SalaCompartida(dict):
+    """Sala leída de un store compartido: recuerda las firmas de sus campos al leerla"""
+
+    firmas: Dict[str, str] = {}
+
+
+class RoomCache:
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._salas: Dict[str, Dict] = {}
+        # Última versión persistida de cada campo (para detectar cambios)
+        self._firmas: Dict[str, Dict[str, str]] = {}
+        # codigo -> campos pendientes de escribir (str o tupla (campo, clave))
+        self._dirty: Dict[str, set] = {}
+        self._lock = threading.RLock()
+        self._flusher_started = False
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def get_sala(self, codigo: str) -> Optional[Dict]:
+        """Devuelve la sala desde memoria, cargándola de la base si hace falta."""
+        if not codigo:
+            return None
+
+        if state_store.compartido:
+            return self._get_sala_compartida(codigo)
+
+        with self._lock:
+            sala = self._salas.get(codigo)
+            if sala is not None:
+                return sala
+
+        sala = db_store.get_sala(codigo) or state_store.get_sala(codigo)
+        if sala is None:
+            return None
+
+        with self._lock:
+            # Otro hilo pudo cargarla mientras tanto
+            if codigo not in self._salas:
+                self._salas[codigo] = sala
+                self._firmas[codigo] = {k: _firma(v) for k, v in sala.items()}
+            return self._salas[codigo]
+
+    def _get_sala_compartida(self, codigo: str) -> Optional[Dict]:
+        leida = state_store.get_sala_con_firmas(codigo)
+        if leida is None:
+            # Primera vez que se usa tras un reinicio de Redis: sembrar desde la base
+            sala = db_store.get_sala(codigo) if db_store.use_database else None
+            if sala is None:
+                return None
+            state_store.set_sala(codigo, sala)
+            leida = sala, {k: _firma(v) for k, v in sala.items()}
+
+        sala = SalaCompartida(leida[0])
+        sala.firmas = dict(leida[1])
+        with self._lock:
+            self._salas[codigo] = sala
+        return sala
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def set_sala(self, codigo: str, sala: Dict, evento: str = None,
+                 campos: Optional[Iterable[str]] = None):
+        """
+        Registra los cambios de una sala.
+
+        - campos: campos modificados (o tuplas (campo, clave) para cambios dentro
+          de un campo JSON); si no se indican se detectan por diferencia
+        - evento: define la durabilidad (ver DURABILIDAD_POR_EVENTO)
+        """
+        with self._lock:
+            self._salas[codigo] = sala
+            # En modo compartido se compara con lo que había al leer la sala
+            firmas = getattr(sala, "firmas", None)
+            if firmas is None:
+                firmas = self._firmas.setdefault(codigo, {})
+
+            if campos is None:
+                campos = [k for k, v in sala.items() if firmas.get(k) != _firma(v)]
+                campos += [k for k in firmas if k not in sala]
+            campos = list(campos)
+
+            if campos:
+                # Marca de actividad para el reaper (ver room_reaper.py)
+                sala["ultima_actividad"] = time.time()
+                campos.append("ultima_actividad")
+                self._dirty.setdefault(codigo, set()).update(campos)
+
+        if state_store.compartido:
+            # Solo los campos cambiados: no pisar lo que otros workers escribieron
+            if campos:
+                state_store.set_sala(codigo, sala, campos=campos)
+                for campo in {c if isinstance(c, str) else c[0] for c in campos}:
+                    firmas[campo] = _firma(sala.get(campo))
+        else:
+            # Memoria local siempre al día (admin, desconexiones, checkpoint);
+            # el journal registra solo los campos cambiados
+            state_store.set_sala(codigo, sala, campos=campos)
+
+        if DURABILIDAD_POR_EVENTO.get(evento, DIFERIDA) == CRITICA:
+            self.flush(codigo)
+        else:
+            self._ensure_flusher()
+
+    def create_sala(self, codigo: str, anfitrion: str) -> Dict:
+        """Crea la sala en la base (escritura inmediata) y la deja en cache."""
+        sala = db_store.create_sala(codigo, anfitrion)
+        with self._lock:
+            self._salas[codigo] = sala
+            self._firmas[codigo] = {k: _firma(v) for k, v in sala.items()}
+        state_store.set_sala(codigo, sala)
+        if state_store.compartido:
+            sala = SalaCompartida(sala)
+            sala.firmas = dict(self._firmas[codigo])
+        return sala
+
+    def evict(self, codigo: str, flush: bool = True):
+        """Quita la sala del cache (escribiendo antes lo pendiente)."""
+        if flush:
+            self.flush(codigo)
+        with self._lock:
+            self._salas.pop(codigo, None)
+            self._firmas.pop(codigo, None)
+            self._dirty.pop(codigo, None)
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+    def flush(self, codigo: str = None):
+        """Escribe en la base los campos pendientes (de una sala o de todas)."""
+        with self._lock:
+            codigos = [codigo] if codigo else list(self._dirty.keys())
+
+        for cod in codigos:
+            self._flush_sala(cod)
+
+    def _flush_sala(self, codigo: str):
+        if state_store.compartido and db_store.use_database:
+            # Otro worker pudo cambiar la sala después: escribir lo último de Redis
+            with self._lock:
+                pendiente = bool(self._dirty.get(codigo))
+            actual = state_store.get_sala(codigo) if pendiente else None
+            if actual is not None:
+                with self._lock:
+                    self._salas[codigo] = actual
+
+        with self._lock:
+            campos = self._dirty.pop(codigo, None)
+            sala = self._salas.get(codigo)
+            if not campos or sala is None:
+                return
+
+            # Copia serializada bajo lock: los handlers pueden seguir mutando la sala
+            firmas = self._firmas.setdefault(codigo, {})
+            completos = {c if isinstance(c, str) else c[0] for c in campos
+                         if isinstance(c, str) or isinstance(sala.get(c[0]), list)}
+            cambios = {}
+            patches = []
+            for campo in completos:
+                firma = _firma(sala.get(campo))
+                firmas[campo] = firma
+                cambios[campo] = json.loads(firma)
+            for campo, clave in (c for c in campos if isinstance(c, tuple)):
+                if campo in completos:
+                    continue
+                valor = (sala.get(campo) or {}).get(clave)
+                patches.append((campo, [clave], json.loads(_firma(valor))))
+            for campo in {p[0] for p in patches}:
+                firmas[campo] = _firma(sala.get(campo))
+
+        if not db_store.use_database:
+            # En modo JSON la sala ya vive en state_store (set_sala la sincroniza)
+            state_store.save()
+            return
+
+        try:
+            if not db_store.update_sala_fields(codigo, patches=patches, **cambios):
+                # La fila no existe todavía: insertar la sala completa
+                with self._lock:
+                    completa = json.loads(_firma(sala))
+                db_store.set_sala(codigo, completa)
+        except Exception as e:
+            logger.error("❌ Error en flush de sala %s: %s", codigo, e)
+            with self._lock:
+                self._dirty.setdefault(codigo, set()).update(campos)
+                for campo in campos:
+                    nombre = campo if isinstance(campo, str) else campo[0]
+                    self._firmas.get(codigo, {}).pop(nombre, None)
+
+    def _ensure_flusher(self):
+        if self._flusher_started:
+            return
+        with self._lock:
+            if self._flusher_started:
+                return
+            self._flusher_started = True
+        threading.Thread(target=self._background_flusher, daemon=True).start()
+
+    def _background_flusher(self):
+        """Agrupa los cambios diferidos en una escritura por sala cada intervalo"""
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("❌ Error en flush periódico: %s", e)
+
+
+# Singleton global
+room_cache = RoomCache()
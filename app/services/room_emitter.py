@@ -0,0 +1,175 @@
+"""
+📨 Room Emitter - Agrupa los eventos salientes de cada sala
+
+Cada tick del reloj y cada mensaje de chat eran un `socketio.emit` aparte a
+la sala; con ráfagas de chat cada cliente recibía muchos frames pequeños.
+Este emisor:
+- Acumula los eventos AGRUPADOS de cada sala durante `VENTANA` segundos
+  (desde el primero pendiente) y los envía juntos en un solo frame
+  `room_batch` = [[evento, datos], ...], en el orden en que se emitieron
+- Si en la ventana hubo un solo evento se envía tal cual (sin envoltorio)
+- update_timer se reemplaza: en el frame solo va el último valor
+- Los eventos INMEDIATOS (BASTA, resultados, inicio...) se envían sin
+  esperar, pero antes se vacía lo pendiente de la sala para no desordenar
+
+El modo se configura por evento con EMISION_POR_EVENTO o la variable
+ROOM_EMIT_MODO (ej: "update_timer=inmediata"). Con ROOM_EMIT_VENTANA_MS=0
+todo se envía de inmediato. Los eventos sin modo configurado son inmediatos.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AGRUPADA = "agrupada"    # Espera la ventana y viaja en room_batch
+INMEDIATA = "inmediata"  # Se envía al momento (vaciando antes lo pendiente)
+
+VENTANA = float(os.getenv("ROOM_EMIT_VENTANA_MS", "50")) / 1000
+MAX_EVENTOS_POR_FRAME = int(os.getenv("ROOM_EMIT_MAX_EVENTOS", "64"))
+
+EVENTO_LOTE = "room_batch"
+
+EMISION_POR_EVENTO = {
+    "update_timer": AGRUPADA,
+    "nuevo_mensaje_chat": AGRUPADA,
+    "basta_triggered": INMEDIATA,
+    "round_results": INMEDIATA,
+    "start_game": INMEDIATA,
+    "restore_state": INMEDIATA,
+    "ronda_pausada": INMEDIATA,
+}
+
+# Eventos de estado: un valor nuevo deja obsoleto al pendiente
+REEMPLAZABLES = {"update_timer"}
+
+
+def _cargar_modos_env():
+    config = os.getenv("ROOM_EMIT_MODO", "")
+    for item in config.split(","):
+        if "=" not in item:
+            continue
+        evento, modo = (parte.strip() for parte in item.split("=", 1))
+        if modo in (AGRUPADA, INMEDIATA):
+            EMISION_POR_EVENTO[evento] = modo
+
+
+_cargar_modos_env()
+
+
+class RoomEmitter:
+    def __init__(self, ventana: float = VENTANA, max_eventos: int = MAX_EVENTOS_POR_FRAME):
+        self.ventana = ventana
+        self.max_eventos = max_eventos
+
+        # codigo -> {"vence": float, "eventos": [[evento, datos], ...]}
+        self._pendientes: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        # Serializa los envíos: un frame agrupado y un evento inmediato de la
+        # misma sala no se adelantan entre sí
+        self._envio_lock = threading.RLock()
+        self._running = False
+        self._socketio = None
+
+        self.stats = {"eventos": 0, "frames": 0, "reemplazados": 0}
+
+    def configure(self, socketio):
+        self._socketio = socketio
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def emit(self, evento: str, datos, codigo: str, inmediato: Optional[bool] = None):
+        """
+        Emite `evento` a la sala `codigo`. `inmediato` fuerza el modo para esta
+        llamada; si es None se usa el configurado para el evento.
+        """
+        if inmediato is None:
+            inmediato = EMISION_POR_EVENTO.get(evento, INMEDIATA) == INMEDIATA
+
+        if inmediato or self.ventana <= 0 or self._socketio is None:
+            with self._envio_lock:
+                self.flush(codigo)
+                self._enviar(codigo, [[evento, datos]])
+            return
+
+        lleno = False
+        with self._lock:
+            self.stats["eventos"] += 1
+            pendiente = self._pendientes.get(codigo)
+            if pendiente is None:
+                pendiente = {"vence": time.time() + self.ventana, "eventos": []}
+                self._pendientes[codigo] = pendiente
+            eventos = pendiente["eventos"]
+            if evento in REEMPLAZABLES:
+                antes = len(eventos)
+                eventos[:] = [e for e in eventos if e[0] != evento]
+                self.stats["reemplazados"] += antes - len(eventos)
+            eventos.append([evento, datos])
+            lleno = len(eventos) >= self.max_eventos
+
+        if lleno:
+            self.flush(codigo)
+        else:
+            self._ensure_running()
+
+    def flush(self, codigo: str):
+        """Envía ya lo pendiente de una sala (si hay)."""
+        with self._envio_lock:
+            with self._lock:
+                pendiente = self._pendientes.pop(codigo, None)
+            if pendiente and pendiente["eventos"]:
+                self._enviar(codigo, pendiente["eventos"])
+
+    def descartar(self, codigo: str):
+        """La sala ya no existe: lo pendiente no se envía."""
+        with self._lock:
+            self._pendientes.pop(codigo, None)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "salas_pendientes": len(self._pendientes)}
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _enviar(self, codigo: str, eventos: List[list]):
+        try:
+            if len(eventos) == 1:
+                evento, datos = eventos[0]
+                self._socketio.emit(evento, datos, room=codigo)
+            else:
+                self._socketio.emit(EVENTO_LOTE, eventos, room=codigo)
+            self.stats["frames"] += 1
+        except Exception as e:
+            logger.error("❌ Error emitiendo eventos a la sala %s: %s", codigo, e)
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._running or self._socketio is None:
+                return
+            self._running = True
+        self._socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pendientes:
+                    self._running = False
+                    return
+                ahora = time.time()
+                vencidas = [c for c, p in self._pendientes.items() if p["vence"] <= ahora]
+                espera = min(p["vence"] for p in self._pendientes.values()) - ahora
+
+            for codigo in vencidas:
+                self.flush(codigo)
+
+            if not vencidas and espera > 0:
+                self._socketio.sleep(espera)
+
+
+# Singleton global
+room_emitter = RoomEmitter()
@@ -0,0 +1,154 @@
+"""
+📇 Room Index - Índice de salas con agregados incrementales (panel admin)
+
+/api/admin/estadisticas y /api/admin/salas recorrían (y cargaban) todas las
+salas en cada consulta del panel. IndiceSalas es el dict {codigo: resumen}
+que el store actualiza en cada cambio de sala, y al mismo tiempo:
+- Mantiene los contadores (salas por estado, jugadores, mensajes): al
+  reemplazar un resumen se resta el aporte del anterior y se suma el nuevo
+- Agrupa los códigos por estado (espera, en_curso, pausada, finalizada) en
+  dicts ordenados por llegada, para listar una página filtrada sin ordenar
+  ni recorrer el resto
+
+Las estadísticas cuestan O(1) y una página O(offset + límite), sin importar
+cuántas salas haya. `version` cambia con cada alta, cambio o baja: el panel
+la manda al consultar y si no cambió no recibe nada.
+"""
+
+import threading
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
+
+ESPERA = "espera"
+EN_CURSO = "en_curso"
+PAUSADA = "pausada"
+FINALIZADA = "finalizada"
+ESTADOS = (ESPERA, EN_CURSO, PAUSADA, FINALIZADA)
+
+# Campos de la sala que el índice mantiene sin cargarla (reaper, admin, snapshot indexado)
+CAMPOS_INDICE = (
+    "anfitrion", "jugadores", "jugadores_desconectados", "en_curso",
+    "finalizada", "pausada", "ronda_actual", "rondas", "modo_juego",
+    "ultima_actividad",
+)
+
+
+def resumen_sala(sala: Dict) -> Dict:
+    """Lo que el índice guarda de una sala (sin el chat, solo su largo)."""
+    resumen = {campo: sala[campo] for campo in CAMPOS_INDICE if campo in sala}
+    if "mensajes_chat" in sala:
+        resumen["num_mensajes"] = len(sala["mensajes_chat"] or [])
+    return resumen
+
+
+def estado_sala(resumen: Dict) -> str:
+    if resumen.get("finalizada"):
+        return FINALIZADA
+    if resumen.get("en_curso"):
+        return PAUSADA if resumen.get("pausada") else EN_CURSO
+    return ESPERA
+
+
+def jugadores_activos(resumen: Dict) -> List[str]:
+    desconectados = resumen.get("jugadores_desconectados") or []
+    return [j for j in resumen.get("jugadores") or [] if j not in desconectados]
+
+
+def sala_para_listado(codigo: str, resumen: Dict) -> Dict:
+    """Fila de /api/admin/salas armada solo con el resumen."""
+    return {
+        "codigo": codigo,
+        "anfitrion": resumen.get("anfitrion"),
+        "jugadores": jugadores_activos(resumen),
+        "estado": estado_sala(resumen),
+        "ronda_actual": resumen.get("ronda_actual", 1),
+        "total_rondas": resumen.get("rondas", 1),
+        "modo_juego": resumen.get("modo_juego", "clasico"),
+        "en_curso": resumen.get("en_curso", False),
+        "pausada": resumen.get("pausada", False),
+        "num_mensajes": resumen.get("num_mensajes", 0),
+    }
+
+
+class IndiceSalas(dict):
+    """{codigo: resumen} que mantiene agregados y un índice por estado"""
+
+    def __init__(self, resumenes: Optional[Dict[str, Dict]] = None):
+        super().__init__()
+        self._lock = threading.RLock()
+        self.por_estado: Dict[str, Dict[str, None]] = {estado: {} for estado in ESTADOS}
+        # Lo que cada sala sumó al entrar: el resumen comparte listas con la
+        # sala (ej: jugadores) y puede cambiar antes de que se reemplace
+        self._aportes: Dict[str, Tuple[str, int, int]] = {}
+        self.jugadores = 0
+        self.mensajes = 0
+        self.version = 0
+        for codigo, resumen in (resumenes or {}).items():
+            self[codigo] = resumen
+
+    def __setitem__(self, codigo: str, resumen: Dict):
+        with self._lock:
+            self._restar(codigo)
+            super().__setitem__(codigo, resumen)
+            self._sumar(codigo, resumen)
+            self.version += 1
+
+    def __delitem__(self, codigo: str):
+        with self._lock:
+            super().__delitem__(codigo)
+            self._restar(codigo)
+            self.version += 1
+
+    def pop(self, codigo: str, *por_defecto):
+        with self._lock:
+            if codigo not in self:
+                if por_defecto:
+                    return por_defecto[0]
+                raise KeyError(codigo)
+            resumen = self[codigo]
+            del self[codigo]
+            return resumen
+
+    def _sumar(self, codigo: str, resumen: Dict):
+        aporte = (estado_sala(resumen), len(resumen.get("jugadores") or []), resumen.get("num_mensajes", 0))
+        self._aportes[codigo] = aporte
+        self.por_estado[aporte[0]][codigo] = None
+        self.jugadores += aporte[1]
+        self.mensajes += aporte[2]
+
+    def _restar(self, codigo: str):
+        aporte = self._aportes.pop(codigo, None)
+        if aporte is None:
+            return
+        self.por_estado[aporte[0]].pop(codigo, None)
+        self.jugadores -= aporte[1]
+        self.mensajes -= aporte[2]
+
+    # ------------------------------------------------------------------
+    # Consultas del panel
+    # ------------------------------------------------------------------
+    def agregados(self) -> Dict:
+        with self._lock:
+            por_estado = {estado: len(codigos) for estado, codigos in self.por_estado.items()}
+            activas = por_estado[EN_CURSO] + por_estado[PAUSADA]
+            return {
+                "total_salas": len(self),
+                "salas_activas": activas,
+                "salas_en_espera": len(self) - activas,
+                "total_jugadores": self.jugadores,
+                "total_mensajes": self.mensajes,
+                "por_estado": por_estado,
+                "version": self.version,
+            }
+
+    def pagina(self, estado: Optional[str] = None, offset: int = 0,
+               limite: int = 50) -> Tuple[int, List[Dict]]:
+        """(total que cumple el filtro, filas de la página) en orden de llegada"""
+        with self._lock:
+            codigos = self.por_estado[estado] if estado else self
+            total = len(codigos)
+            filas = [
+                sala_para_listado(codigo, self[codigo])
+                for codigo in islice(codigos, offset, offset + limite)
+            ]
+        return total, filas
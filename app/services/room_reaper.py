@@ -0,0 +1,207 @@
+"""
+🧹 Room Reaper - Expiración de salas terminadas o abandonadas
+
+Nada borraba las salas: el estado local, la tabla `salas`, los mapas de
+rate limiting y las sesiones solo crecían, y el admin las recorría todas.
+Cada REAPER_INTERVAL segundos este proceso en segundo plano expira:
+- Salas finalizadas sin actividad hace SALA_TTL_FINALIZADA segundos
+- Salas con todos sus jugadores desconectados hace SALA_TTL_ABANDONADA
+- Cualquier sala sin actividad hace SALA_TTL_INACTIVA (salas olvidadas)
+
+Al expirar una sala se archiva un resumen compacto de sus resultados (tabla
+`salas_archivadas` o ARCHIVO_SALAS en JSONL), se borra de la base y de
+state_store, se quita del cache y del planificador del reloj y se cierran sus
+sesiones. Los módulos de eventos registran callbacks para cerrar la sala de
+Socket.IO y purgar sus mapas por sid (rate limiting).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.services.db_store import db_store
+from app.services.room_actor import room_actor
+from app.services.room_cache import room_cache
+from app.services.state_store import state_store
+from app.services.timer_scheduler import timer_scheduler
+
+logger = logging.getLogger(__name__)
+
+REAPER_INTERVAL = float(os.getenv("REAPER_INTERVAL", "60"))
+SALA_TTL_FINALIZADA = float(os.getenv("SALA_TTL_FINALIZADA", str(10 * 60)))
+SALA_TTL_ABANDONADA = float(os.getenv("SALA_TTL_ABANDONADA", str(30 * 60)))
+SALA_TTL_INACTIVA = float(os.getenv("SALA_TTL_INACTIVA", str(6 * 3600)))
+ARCHIVO_SALAS = os.getenv("ARCHIVO_SALAS", "salas_archivadas.jsonl")
+
+
+class RoomReaper:
+    def __init__(self, intervalo: float = REAPER_INTERVAL):
+        self.intervalo = intervalo
+        self._socketio = None
+        self._al_expirar: List[Callable[[str], None]] = []
+        self._limpiezas: List[Callable[[float], None]] = []
+        # Salas sin marca de actividad: se cuentan desde que el reaper las vio
+        self._vistas: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._running = False
+
+        self.expiradas = 0
+        self.archivadas = 0
+
+    def configure(self, socketio):
+        """Registra el servidor SocketIO y arranca el bucle (socketio.sleep, compatible con eventlet)."""
+        with self._lock:
+            self._socketio = socketio
+            if self._running:
+                return
+            self._running = True
+        socketio.start_background_task(self._run)
+
+    def al_expirar(self, funcion: Callable[[str], None]):
+        """Callback por sala expirada (ej: cerrar la sala de Socket.IO)."""
+        self._al_expirar.append(funcion)
+
+    def registrar_limpieza(self, funcion: Callable[[float], None]):
+        """Callback por pasada con el instante actual (ej: purgar rate limits viejos)."""
+        self._limpiezas.append(funcion)
+
+    # ------------------------------------------------------------------
+    # Expiración
+    # ------------------------------------------------------------------
+    def motivo_expiracion(self, codigo: str, sala: Dict, ahora: float) -> Optional[str]:
+        """Motivo por el que la sala debe expirar ("finalizada", "abandonada", "inactiva") o None."""
+        if timer_scheduler.is_active(codigo):
+            return None  # Ronda en curso: el reloj no marca actividad
+
+        ultima = sala.get("ultima_actividad")
+        if ultima is None:
+            with self._lock:
+                ultima = self._vistas.setdefault(codigo, ahora)
+        inactiva = ahora - ultima
+
+        if sala.get("finalizada") and inactiva > SALA_TTL_FINALIZADA:
+            return "finalizada"
+        jugadores = set(sala.get("jugadores") or [])
+        if jugadores and jugadores <= set(sala.get("jugadores_desconectados") or []) \
+                and inactiva > SALA_TTL_ABANDONADA:
+            return "abandonada"
+        if inactiva > SALA_TTL_INACTIVA:
+            return "inactiva"
+        return None
+
+    def expirar(self, codigo: str, sala: Dict, motivo: str):
+        """`sala` puede ser el resumen del índice: la sala completa se carga solo para archivarla"""
+        # Con varios workers, solo uno expira cada sala
+        if not state_store.reclamar(f"expirar:{codigo}", max(60, int(self.intervalo * 2))):
+            return
+
+        # En el turno de la sala: ningún evento la vuelve a escribir a mitad del borrado
+        with room_actor.turno(codigo):
+            sala = state_store.get_sala(codigo) or sala
+
+            if sala.get("last_results") or sala.get("finalizada"):
+                self._archivar(codigo, sala, motivo)
+
+            timer_scheduler.cancel(codigo)
+            room_cache.evict(codigo, flush=False)
+            db_store.delete_sala(codigo)
+            state_store.delete_sala(codigo)
+            state_store.cerrar_sesiones_de_sala(codigo)
+        with self._lock:
+            self._vistas.pop(codigo, None)
+            self.expiradas += 1
+
+        for funcion in self._al_expirar:
+            try:
+                funcion(codigo)
+            except Exception as e:
+                logger.error("❌ Error en callback de expiración de sala %s: %s", codigo, e)
+
+        logger.info("🧹 Sala %s expirada (%s)", codigo, motivo)
+
+    @staticmethod
+    def resumen(codigo: str, sala: Dict, motivo: str) -> Dict:
+        """Resultados finales en forma compacta para el archivo"""
+        puntuaciones = sala.get("puntuaciones") or {}
+        return {
+            "codigo": codigo,
+            "anfitrion": sala.get("anfitrion"),
+            "modo_juego": sala.get("modo_juego", "clasico"),
+            "rondas": sala.get("rondas", 1),
+            "ronda_actual": sala.get("ronda_actual", 1),
+            "puntuaciones": puntuaciones,
+            "ganador": max(puntuaciones, key=puntuaciones.get) if puntuaciones else None,
+            "motivo": motivo,
+            "archivada_at": time.time(),
+        }
+
+    def _archivar(self, codigo: str, sala: Dict, motivo: str):
+        resumen = self.resumen(codigo, sala, motivo)
+        try:
+            if not db_store.archivar_sala(resumen):
+                with open(ARCHIVO_SALAS, "a") as f:
+                    f.write(json.dumps(resumen, ensure_ascii=False, separators=(",", ":")) + "\n")
+            with self._lock:
+                self.archivadas += 1
+        except Exception as e:
+            logger.error("❌ Error archivando sala %s: %s", codigo, e)
+
+    # ------------------------------------------------------------------
+    # Bucle
+    # ------------------------------------------------------------------
+    def _candidatas(self, ahora: float) -> Dict[str, Dict]:
+        # Resúmenes del índice: no carga las salas del checkpoint
+        salas = state_store.get_indice()
+        if db_store.use_database:
+            # Salas de procesos anteriores que este proceso nunca cargó
+            ttl_minimo = min(SALA_TTL_FINALIZADA, SALA_TTL_ABANDONADA, SALA_TTL_INACTIVA)
+            for codigo, sala in db_store.get_salas_inactivas(ahora - ttl_minimo).items():
+                salas.setdefault(codigo, sala)
+        return salas
+
+    def ejecutar_pasada(self) -> int:
+        """Una pasada completa; retorna cuántas salas expiraron."""
+        ahora = time.time()
+        expiradas = 0
+        for codigo, sala in self._candidatas(ahora).items():
+            motivo = self.motivo_expiracion(codigo, sala, ahora)
+            if motivo:
+                self.expirar(codigo, sala, motivo)
+                expiradas += 1
+
+        with self._lock:
+            activas = set(state_store.get_indice())
+            self._vistas = {c: t for c, t in self._vistas.items() if c in activas}
+
+        for funcion in self._limpiezas:
+            try:
+                funcion(ahora)
+            except Exception as e:
+                logger.error("❌ Error en limpieza periódica: %s", e)
+        return expiradas
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "expiradas": self.expiradas,
+                "archivadas": self.archivadas,
+                "intervalo": self.intervalo,
+                "ttl_finalizada": SALA_TTL_FINALIZADA,
+                "ttl_abandonada": SALA_TTL_ABANDONADA,
+                "ttl_inactiva": SALA_TTL_INACTIVA,
+            }
+
+    def _run(self):
+        while True:
+            self._socketio.sleep(self.intervalo)
+            try:
+                self.ejecutar_pasada()
+            except Exception as e:
+                logger.error("❌ Error en la limpieza de salas: %s", e)
+
+
+# Singleton global
+room_reaper = RoomReaper()
@@ -1,12 +1,57 @@
+"""
+📄 State Store - Estado local con checkpoint en disco (fallback sin Redis)
+
+Persistencia incremental:
+- Cada cambio de una sala agrega un registro compacto (una línea JSON) al
+  journal: solo los campos que cambiaron, no todo el estado
+- Los registros se agrupan en memoria y se anexan al archivo cada
+  JOURNAL_FLUSH_INTERVAL segundos (o al instante con `save`)
+- Cuando el journal supera STATE_JOURNAL_MAX_BYTES se compacta: snapshot
+  completo en un archivo temporal + rename atómico sobre STATE_FILE y journal
+  vacío
+- Al iniciar se carga el snapshot y se reaplican los registros con número de
+  secuencia posterior (los registros son idempotentes: reemplazan valores)
+- El snapshot se escribe en STATE_SNAPSHOT_FORMAT (json, json.gz, msgpack,
+  msgpack.gz; ver app/utils/snapshot.py) y al leerlo el formato se detecta
+  solo, así que se puede cambiar de formato sin migrar el checkpoint
+
+Carga perezosa: el snapshot es indexado (una entrada por sala) y al arrancar
+solo se lee el índice con un resumen de cada sala (`get_indice`). La sala
+completa se lee del archivo la primera vez que se pide; en la compactación
+las salas nunca cargadas se copian en crudo. El tiempo de arranque y la
+memoria no dependen de cuántas salas históricas hay en el checkpoint.
+El índice además mantiene los contadores y el listado por estado del panel
+admin (IndiceSalas, ver room_index.py).
+"""
+
 import json
+import logging
 import threading
 import time
 import os
 
+from app.services.room_index import IndiceSalas, resumen_sala
+from app.utils.snapshot import (
+    SnapshotIndexado, es_indexado, escribir_snapshot_indexado, formato_disponible,
+    leer_snapshot, serializar,
+)
+
+logger = logging.getLogger(__name__)
+
 # Archivo de persistencia local (fallback si no hay Redis)
 STATE_FILE = "checkpoint.json"
+JOURNAL_FILE = os.getenv("STATE_JOURNAL_FILE", "checkpoint.journal")
+JOURNAL_MAX_BYTES = int(os.getenv("STATE_JOURNAL_MAX_BYTES", str(8 * 1024 * 1024)))
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("STATE_JOURNAL_FLUSH_INTERVAL", "1.0"))
+SNAPSHOT_FORMAT = formato_disponible(os.getenv("STATE_SNAPSHOT_FORMAT", "json"))
+
+# Con REDIS_URL el estado se comparte entre workers (ver redis_store.py)
+REDIS_URL = os.getenv("REDIS_URL")
 
 class StateStore:
+    # Estado local de este proceso (RedisStateStore es compartido)
+    compartido = False
+    
     _instance = None
     _lock = threading.Lock()
     
@@ -20,46 +65,230 @@ class StateStore:
     
     def _initialize(self):
         """Inicializa el estado en memoria"""
+        # state["salas"] tiene solo las salas cargadas; el índice, todas
         self.state = {
             "salas": {}
         }
-        self.state_dirty = False
+        self.indice = IndiceSalas()
+        self.snapshot = None
+        self.hidratacion_lock = threading.Lock()
         self.save_lock = threading.Lock()
         
-        # Cargar estado previo si existe
-        if os.path.exists(STATE_FILE):
-            try:
-                with open(STATE_FILE, "r") as f:
-                    loaded_state = json.load(f)
-                    self.state = loaded_state
-                    print("📂 Estado previo cargado correctamente.")
-            except Exception as e:
-                print(f"⚠️ Error cargando estado previo: {e}")
+        # Journal: registros pendientes de anexar al archivo
+        self.seq = 0
+        self.pendientes = []
+        self.journal_lock = threading.Lock()
+        self.flush_event = threading.Event()
+        
+        # Sesiones de socket (sid -> sala/jugador) y transiciones reclamadas
+        self.sesiones = {}
+        self.reclamos = {}
+        self.reclamos_lock = threading.Lock()
+        
+        # Cargar estado previo si existe (snapshot + journal)
+        self._cargar()
                 
         # Iniciar guardado en segundo plano
         threading.Thread(target=self._background_saver, daemon=True).start()
 
+    # ------------------------------------------------------------------
+    # Snapshot + journal
+    # ------------------------------------------------------------------
+    def _cargar(self):
+        convertir = False
+        if os.path.exists(STATE_FILE):
+            try:
+                if es_indexado(STATE_FILE):
+                    self.snapshot = SnapshotIndexado(STATE_FILE)
+                    self.state.update(self.snapshot.extra)
+                    self.indice = IndiceSalas(self.snapshot.resumenes)
+                else:
+                    # Checkpoint de una versión anterior: carga completa y se convierte
+                    self.state = leer_snapshot(STATE_FILE)
+                    self.state.setdefault("salas", {})
+                    self.indice = IndiceSalas({c: resumen_sala(s) for c, s in self.state["salas"].items()})
+                    convertir = True
+                self.seq = self.state.get("journal_seq", 0)
+                logger.info("📂 Estado previo cargado correctamente (%s salas indexadas).", len(self.indice))
+            except Exception as e:
+                logger.warning("⚠️ Error cargando estado previo: %s", e)
+        
+        aplicados = 0
+        if os.path.exists(JOURNAL_FILE):
+            try:
+                with open(JOURNAL_FILE, "r") as f:
+                    for linea in f:
+                        try:
+                            registro = json.loads(linea)
+                        except json.JSONDecodeError:
+                            continue  # Última línea cortada por una caída
+                        if registro.get("s", 0) <= self.seq:
+                            continue  # Ya incluido en el snapshot
+                        self._aplicar(registro)
+                        self.seq = registro["s"]
+                        aplicados += 1
+            except Exception as e:
+                logger.warning("⚠️ Error leyendo journal de estado: %s", e)
+        
+        if aplicados:
+            logger.info("📜 %s cambios del journal reaplicados", aplicados)
+        if aplicados or convertir:
+            self._compactar()
+    
+    def _aplicar(self, registro):
+        """Aplica un registro del journal al estado en memoria"""
+        salas = self.state["salas"]
+        op, codigo = registro["op"], registro["c"]
+        if op == "del":
+            salas.pop(codigo, None)
+            self.indice.pop(codigo, None)
+            return
+        if op == "put":
+            salas[codigo] = registro["d"]
+        else:
+            # Los cambios parciales necesitan la sala completa
+            sala = self.get_sala(codigo)
+            if sala is None:
+                sala = salas[codigo] = {}
+            if op == "set":
+                sala.update(registro.get("d", {}))
+                for campo in registro.get("x", []):
+                    sala.pop(campo, None)
+            elif op == "patch":
+                sala.setdefault(registro["f"], {})[registro["k"]] = registro["v"]
+        self.indice[codigo] = resumen_sala(salas[codigo])
+    
+    def _registrar(self, op, codigo, **datos):
+        """Agrega un registro al journal (serializado ya, con los valores de este momento)"""
+        with self.journal_lock:
+            self.seq += 1
+            registro = {"s": self.seq, "op": op, "c": codigo, **datos}
+            self.pendientes.append(json.dumps(registro, separators=(",", ":"), default=str))
+    
+    def _escribir_journal(self):
+        """Anexa los registros pendientes al journal (llamar con save_lock)"""
+        with self.journal_lock:
+            lineas, self.pendientes = self.pendientes, []
+            ultimo = self.seq
+        if lineas:
+            try:
+                with open(JOURNAL_FILE, "a") as f:
+                    f.write("\n".join(lineas) + "\n")
+            except Exception as e:
+                logger.error("❌ Error saving state: %s", e)
+                with self.journal_lock:
+                    self.pendientes[:0] = lineas
+        return ultimo
+    
+    def _compactar(self):
+        """Snapshot completo con rename atómico y journal vacío (llamar con save_lock o al iniciar)"""
+        self.state["journal_seq"] = self._escribir_journal()
+        extra = {k: v for k, v in self.state.items() if k != "salas"}
+        with self.hidratacion_lock:
+            try:
+                escribir_snapshot_indexado(STATE_FILE, self._entradas_snapshot(), extra, SNAPSHOT_FORMAT)
+                anterior, self.snapshot = self.snapshot, SnapshotIndexado(STATE_FILE)
+                if anterior is not None:
+                    anterior.cerrar()
+                # Los registros posteriores al snapshot siguen pendientes en memoria
+                open(JOURNAL_FILE, "w").close()
+            except Exception as e:
+                logger.error("❌ Error compactando estado: %s", e)
+    
+    def _entradas_snapshot(self):
+        """(codigo, sala serializada, resumen): las cargadas se serializan, el resto se copia"""
+        salas = self.state["salas"]
+        for codigo, resumen in list(self.indice.items()):
+            sala = salas.get(codigo)
+            if sala is not None:
+                yield codigo, serializar(sala, SNAPSHOT_FORMAT), resumen
+            elif self.snapshot is not None and codigo in self.snapshot:
+                yield codigo, self.snapshot.leer_crudo(codigo), resumen
+
     def _background_saver(self):
-        """Guarda el estado en disco periódicamente si ha cambiado"""
+        """Anexa el journal periódicamente y lo compacta cuando crece demasiado"""
         while True:
-            time.sleep(5)
-            if self.state_dirty:
-                with self.save_lock:
-                    try:
-                        with open(STATE_FILE, "w") as f:
-                            json.dump(self.state, f, indent=4)
-                        self.state_dirty = False
-                    except Exception as e:
-                        print(f"❌ Error saving state: {e}")
+            self.flush_event.wait(JOURNAL_FLUSH_INTERVAL)
+            self.flush_event.clear()
+            if not self.pendientes:
+                continue
+            with self.save_lock:
+                self._escribir_journal()
+                try:
+                    tamano = os.path.getsize(JOURNAL_FILE)
+                except OSError:
+                    tamano = 0
+                if tamano > JOURNAL_MAX_BYTES:
+                    self._compactar()
 
+    # ------------------------------------------------------------------
+    # Salas
+    # ------------------------------------------------------------------
     def get_sala(self, codigo):
-        return self.state["salas"].get(codigo)
+        sala = self.state["salas"].get(codigo)
+        if sala is not None or codigo not in self.indice:
+            return sala
+        return self._hidratar(codigo)
     
-    def set_sala(self, codigo, data):
+    def _hidratar(self, codigo):
+        """Lee del snapshot una sala que todavía no se cargó"""
+        with self.hidratacion_lock:
+            sala = self.state["salas"].get(codigo)
+            if sala is not None or self.snapshot is None or codigo not in self.indice:
+                return sala
+            try:
+                sala = self.snapshot.leer_sala(codigo)
+            except Exception as e:
+                logger.warning("⚠️ Error cargando sala %s del checkpoint: %s", codigo, e)
+                return None
+            if sala is not None:
+                self.state["salas"][codigo] = sala
+            return sala
+    
+    def set_sala(self, codigo, data, campos=None):
+        """
+        Guarda la sala; con `campos` el journal registra solo esos campos
+        (str) o claves dentro de un campo JSON (tuplas (campo, clave))
+        """
         self.state["salas"][codigo] = data
-        self.state_dirty = True
+        self.indice[codigo] = resumen_sala(data)
+        if campos is None:
+            self._registrar("put", codigo, d=data)
+            return
+        
+        # (campo, elemento) de un campo lista (ver RedisStateStore.set_sala): en
+        # memoria local la lista ya es la correcta y se registra completa
+        completos = {c if isinstance(c, str) else c[0] for c in campos
+                     if isinstance(c, str) or isinstance(data.get(c[0]), list)}
+        presentes = {c: data[c] for c in completos if c in data}
+        ausentes = [c for c in completos if c not in data]
+        if presentes or ausentes:
+            self._registrar("set", codigo, d=presentes, x=ausentes)
+        for campo, clave in (c for c in campos if isinstance(c, tuple) and c[0] not in completos):
+            self._registrar("patch", codigo, f=campo, k=clave, v=(data.get(campo) or {}).get(clave))
+    
+    def delete_sala(self, codigo):
+        cargada = self.state["salas"].pop(codigo, None)
+        if self.indice.pop(codigo, None) is not None or cargada is not None:
+            self._registrar("del", codigo)
+    
+    def get_indice(self):
+        """{codigo: resumen} de todas las salas, sin cargarlas (ver room_index.CAMPOS_INDICE)"""
+        return dict(self.indice)
+
+    def get_agregados(self):
+        """Contadores del panel admin (mantenidos en cada cambio de sala)"""
+        return self.indice.agregados()
+
+    def listar_salas(self, estado=None, offset=0, limite=50):
+        """(total, página de salas) desde el índice, filtrando por estado"""
+        return self.indice.pagina(estado, offset, limite)
         
     def get_all_salas(self):
+        """Todas las salas completas (carga las que falten: evitar en caminos frecuentes)"""
+        for codigo in list(self.indice):
+            if codigo not in self.state["salas"]:
+                self._hidratar(codigo)
         return self.state["salas"]
     
     def create_sala(self, codigo, anfitrion):
@@ -74,13 +303,56 @@ class StateStore:
             "mensajes_chat": [],
             "configuracion": {}
         }
-        self.state_dirty = True
+        self.indice[codigo] = resumen_sala(self.state["salas"][codigo])
+        self._registrar("put", codigo, d=self.state["salas"][codigo])
         return self.state["salas"][codigo]
         
     def save(self):
-        """Fuerza el guardado (marca como sucio)"""
-        self.state_dirty = True
+        """Pide anexar ya los cambios pendientes al journal (transiciones críticas)"""
+        self.flush_event.set()
+    
+    # ------------------------------------------------------------------
+    # Sesiones de socket
+    # ------------------------------------------------------------------
+    def registrar_sesion(self, sid, codigo, jugador):
+        self.sesiones[sid] = {"codigo": codigo, "jugador": jugador}
+    
+    def get_sesion(self, sid):
+        return self.sesiones.get(sid)
+    
+    def cerrar_sesion(self, sid):
+        """Quita la sesión y devuelve (codigo, jugador) o (None, None)"""
+        sesion = self.sesiones.pop(sid, None) or {}
+        return sesion.get("codigo"), sesion.get("jugador")
+    
+    def cerrar_sesiones_de_sala(self, codigo):
+        """Quita las sesiones que apuntan a una sala (sala expirada)"""
+        for sid in [sid for sid, s in list(self.sesiones.items()) if s.get("codigo") == codigo]:
+            self.sesiones.pop(sid, None)
+    
+    def reclamar(self, clave, ttl=60):
+        """True solo para el primero que reclama `clave` antes de que expire"""
+        ahora = time.time()
+        with self.reclamos_lock:
+            if self.reclamos.get(clave, 0) > ahora:
+                return False
+            self.reclamos = {c: t for c, t in self.reclamos.items() if t > ahora}
+            self.reclamos[clave] = ahora + ttl
+            return True
+
+
+def _crear_state_store():
+    """Redis si está configurado y responde; si no, memoria local + checkpoint"""
+    if REDIS_URL:
+        try:
+            from app.services.redis_store import RedisStateStore
+            store = RedisStateStore.desde_url(REDIS_URL)
+            logger.info("🟥 Usando Redis como estado compartido entre workers")
+            return store
+        except Exception as e:
+            logger.warning("⚠️ No se pudo usar Redis (%s); estado en memoria local", e)
+    return StateStore()
 
 # Singleton global
-state_store = StateStore()
+state_store = _crear_state_store()
 
@@ -0,0 +1,156 @@
+"""
+⏱️ Timer Scheduler - Un único planificador para el reloj de todas las salas
+
+Reemplaza el hilo por sala de `iniciar_temporizador`:
+- Un solo bucle en segundo plano (compatible con eventlet vía socketio.sleep)
+- Heap de próximos ticks ordenado por tiempo; cada sala guarda su deadline
+- El tiempo restante se calcula desde el deadline (sin acumular deriva)
+- Todos los ticks vencidos se entregan juntos en una sola pasada
+- No toca el almacenamiento: eso queda para las transiciones (inicio, pausa, fin)
+- Pausar = cancelar; reanudar = volver a programar con el nuevo deadline
+"""
+
+import heapq
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.metrics import DERIVA_RELOJ
+
+logger = logging.getLogger(__name__)
+
+
+class TimerScheduler:
+    def __init__(self, tick_interval: float = 1.0, max_sleep: float = 0.25):
+        self.tick_interval = tick_interval
+        self.max_sleep = max_sleep
+
+        # codigo -> {"deadline": float, "gen": int}
+        self._rooms: Dict[str, Dict] = {}
+        # (proximo_tick, codigo, gen) - las entradas con gen viejo se descartan al salir
+        self._heap: List[Tuple[float, str, int]] = []
+        self._lock = threading.Lock()
+        self._running = False
+        self._gen = 0
+
+        self._socketio = None
+        self._on_tick: Optional[Callable[[List[Tuple[str, int]]], None]] = None
+        self._on_expire: Optional[Callable[[str], None]] = None
+
+    def configure(self, socketio, on_tick, on_expire):
+        """
+        Registra el servidor SocketIO (para lanzar el bucle y dormir sin bloquear)
+        y los callbacks:
+        - on_tick([(codigo, restante), ...]) una vez por pasada
+        - on_expire(codigo) cuando el deadline de una sala se cumple
+        """
+        self._socketio = socketio
+        self._on_tick = on_tick
+        self._on_expire = on_expire
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def schedule(self, codigo: str, deadline: float):
+        """Programa (o reprograma) el reloj de una sala hasta `deadline` (epoch)."""
+        with self._lock:
+            entry = self._new_entry(codigo, deadline)
+            self._push(codigo, entry, self._next_tick(deadline, time.time()))
+        self._ensure_running()
+
+    def cancel(self, codigo: str):
+        """Detiene el reloj de una sala (BASTA, pausa, fin de ronda, sala eliminada)."""
+        with self._lock:
+            self._rooms.pop(codigo, None)
+
+    def is_active(self, codigo: str) -> bool:
+        with self._lock:
+            return codigo in self._rooms
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _new_entry(self, codigo: str, deadline: float) -> Dict:
+        self._gen += 1
+        entry = {"deadline": deadline, "gen": self._gen}
+        self._rooms[codigo] = entry
+        return entry
+
+    def _push(self, codigo: str, entry: Dict, when: float):
+        heapq.heappush(self._heap, (when, codigo, entry["gen"]))
+
+    @staticmethod
+    def _remaining(deadline: float, now: float) -> int:
+        return max(0, int(round(deadline - now)))
+
+    def _next_tick(self, deadline: float, now: float) -> float:
+        """Próximo instante en que el contador entero cambia (alineado al deadline)."""
+        restante = deadline - now
+        if restante <= 0:
+            return now
+        pasos = math.ceil(restante / self.tick_interval) - 1
+        return deadline - pasos * self.tick_interval
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._running or self._socketio is None:
+                return
+            self._running = True
+        self._socketio.start_background_task(self._run)
+
+    def _sleep(self, seconds: float):
+        if self._socketio is not None:
+            self._socketio.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._heap:
+                    self._running = False
+                    return
+                espera = self._heap[0][0] - time.time()
+
+            if espera > 0:
+                self._sleep(min(espera, self.max_sleep))
+                continue
+
+            ticks, expiradas = self._collect_due(time.time())
+
+            if ticks and self._on_tick:
+                try:
+                    self._on_tick(ticks)
+                except Exception as e:
+                    logger.error("❌ Error emitiendo ticks del temporizador: %s", e)
+
+            for codigo in expiradas:
+                if self._on_expire:
+                    self._socketio.start_background_task(self._on_expire, codigo)
+
+    def _collect_due(self, now: float):
+        ticks = []
+        expiradas = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                programado, codigo, gen = heapq.heappop(self._heap)
+                entry = self._rooms.get(codigo)
+                if not entry or entry["gen"] != gen:
+                    continue  # Entrada obsoleta (cancelada o reprogramada)
+
+                DERIVA_RELOJ.observar(now - programado)
+
+                restante = self._remaining(entry["deadline"], now)
+                ticks.append((codigo, restante))
+                if restante <= 0:
+                    self._rooms.pop(codigo, None)
+                    expiradas.append(codigo)
+                else:
+                    self._push(codigo, entry, self._next_tick(entry["deadline"], now))
+        return ticks, expiradas
+
+
+# Singleton global
+timer_scheduler = TimerScheduler()
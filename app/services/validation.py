@@ -0,0 +1,342 @@
+"""
+🤖 Validación de respuestas - Reglas locales + OpenAI
+
+- validar_respuestas: pipeline de una ronda completa
+  1. Deduplica respuestas iguales (misma categoría y texto normalizado)
+  2. Resuelve localmente las que las reglas o los motores locales pueden
+     decidir (diccionarios por categoría, ver app/services/lexicon.py)
+  3. Consulta el cache de veredictos (memoria + persistente)
+  4. Envía el resto a OpenAI en lotes (varias respuestas por llamada, JSON por ítem)
+  5. Los lotes van por ia_gateway (cola, concurrencia acotada, reintentos y
+     circuit breaker) y se esperan sin bloquear el bucle de eventos
+  6. Al vencer el plazo de la ronda usa el veredicto de respaldo
+"""
+
+from app.services.ia_gateway import ia_gateway
+from app.services.lexicon import lexicon_engine
+from app.services.metrics import IA_VALIDACIONES
+from app.services.moderation import contiene_palabras_prohibidas
+from app.services.verdict_cache import verdict_cache
+from app.utils.text import quitar_acentos
+from openai import OpenAI
+from typing import Dict, List, Tuple
+import inspect
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+openai_client = None
+OPENAI_AVAILABLE = False
+
+# Pipeline de validación por ronda
+VALIDACION_TAMANO_LOTE = int(os.getenv("VALIDACION_TAMANO_LOTE", "20"))  # Respuestas por llamada
+VALIDACION_PLAZO_RONDA = float(os.getenv("VALIDACION_PLAZO_RONDA", "20"))  # Segundos para publicar resultados
+VEREDICTO_RESPALDO = (True, "Validación IA no disponible a tiempo", 0.3)
+
+
+def _init_openai_client():
+    """Inicializa el cliente de OpenAI tolerando versiones sin soporte de proxy."""
+    global openai_client, OPENAI_AVAILABLE
+
+    if not OPENAI_API_KEY:
+        logger.warning("⚠️ OPENAI_API_KEY no configurada, se usará validación básica")
+        return
+
+    # Los reintentos los maneja ia_gateway (con backoff y respetando el plazo)
+    kwargs = {"api_key": OPENAI_API_KEY, "max_retries": 0}
+    proxy_url = os.getenv("OPENAI_PROXY") or os.getenv("HTTPS_PROXY") or os.getenv("HTTP_PROXY")
+    if proxy_url:
+        # Solo agregar proxies si la versión del cliente lo soporta
+        if "proxies" in inspect.signature(OpenAI).parameters:
+            kwargs["proxies"] = proxy_url
+        else:
+            logger.warning("⚠️ Cliente OpenAI no soporta proxies; se inicializará sin proxy")
+
+    try:
+        openai_client = OpenAI(**kwargs)
+        OPENAI_AVAILABLE = True
+        logger.info("✅ OpenAI habilitado para validación (modelo: %s)", OPENAI_MODEL)
+    except TypeError as e:
+        # Algunos entornos inyectan proxies automáticamente; reintentar sin ellos
+        if "proxies" in kwargs:
+            logger.warning("⚠️ OpenAI rechazó proxies (%s); reintentando sin proxy", e)
+            kwargs.pop("proxies", None)
+            try:
+                openai_client = OpenAI(**kwargs)
+                OPENAI_AVAILABLE = True
+                logger.info("✅ OpenAI habilitado para validación sin proxy (modelo: %s)", OPENAI_MODEL)
+                return
+            except Exception as inner:
+                logger.warning("⚠️ No se pudo inicializar OpenAI tras reintentar sin proxy: %s", inner)
+                return
+        logger.warning("⚠️ No se pudo inicializar OpenAI: %s", e)
+    except Exception as e:
+        logger.warning("⚠️ No se pudo inicializar OpenAI: %s", e)
+
+
+_init_openai_client()
+
+# Motores locales consultados antes de la IA, en orden
+# (cada uno: validar(respuesta, categoria, letra) -> veredicto o None)
+MOTORES_LOCALES = [lexicon_engine]
+
+
+def registrar_motor(motor, primero=False):
+    """Agrega un motor de validación local (ej: un diccionario propio)."""
+    if primero:
+        MOTORES_LOCALES.insert(0, motor)
+    else:
+        MOTORES_LOCALES.append(motor)
+
+
+def validacion_local(respuesta, categoria, letra):
+    """
+    Reglas locales que deciden sin llamar a la IA
+    Retorna: (es_valida, razon, confianza) o None si la IA debe decidir
+    """
+
+    # No validar respuestas vacías (ya se filtran antes)
+    if not respuesta or len(respuesta.strip()) < 2:
+        return False, "Respuesta demasiado corta", 1.0
+
+    respuesta_limpia = respuesta.strip()
+    respuesta_lower = respuesta_limpia.lower()
+
+    # Filtro de palabras prohibidas y letra inicial
+    if contiene_palabras_prohibidas(respuesta_limpia):
+        return False, "Lenguaje inapropiado", 1.0
+    if letra and quitar_acentos(respuesta_limpia[0]).upper() != letra.upper():
+        return False, f"Debe iniciar con la letra {letra.upper()}", 1.0
+
+    # Motores locales (diccionarios): aceptan antes que las heurísticas de
+    # palabras inventadas, que rechazan nombres reales como "Inglaterra"
+    for motor in MOTORES_LOCALES:
+        veredicto = motor.validar(respuesta_limpia, categoria, letra)
+        if veredicto is not None:
+            return veredicto
+
+    # Detectar respuestas obviamente inválidas
+    if len(set(respuesta_lower)) <= 2:  # Ej: "ññññññ", "aaaaa", "sis"
+        return False, "Respuesta sin sentido (caracteres repetidos)", 1.0
+
+    # Detectar palabras que parecen inventadas o sin sentido (patrones comunes)
+    # Palabras muy cortas sin sentido (menos de 3 caracteres, excepto si son nombres comunes)
+    if len(respuesta_limpia) < 3:
+        if categoria.lower() not in ["nombre"]:  # Permitir nombres cortos como "Ana", "Luis"
+            return False, "Respuesta demasiado corta o sin sentido", 1.0
+
+    # Detectar combinaciones de letras que no forman palabras reconocibles
+    # Patrones como "asdas", "sasd", "sonso", etc.
+    if len(respuesta_limpia) >= 4:
+        # Verificar si parece una palabra inventada (muchas consonantes seguidas o patrones extraños)
+        vocales = set('aeiouáéíóúü')
+        consonantes_seguidas = 0
+        max_consonantes = 0
+        for char in respuesta_lower:
+            if char not in vocales and char.isalpha():
+                consonantes_seguidas += 1
+                max_consonantes = max(max_consonantes, consonantes_seguidas)
+            else:
+                consonantes_seguidas = 0
+
+        # Si tiene 3 o más consonantes seguidas, probablemente es inventada
+        if max_consonantes >= 3:
+            return False, "Palabra no reconocible o inventada", 1.0
+
+        # Detectar patrones comunes de palabras inventadas
+        # Palabras que terminan en consonantes poco comunes o tienen patrones extraños
+        patrones_inventados = ["asd", "sasd", "asdas", "qwerty", "zxcv", "hjkl", "fghj"]
+        if any(patron in respuesta_lower for patron in patrones_inventados):
+            return False, "Palabra no reconocible o inventada", 1.0
+
+        # Detectar palabras que parecen combinaciones aleatorias (muchas consonantes alternadas)
+        # Ej: "sasd", "asdas" tienen patrones CVCV o VCVCV que no son comunes en español
+        if len(respuesta_limpia) == 4 or len(respuesta_limpia) == 5:
+            # Contar vocales y consonantes
+            num_vocales = sum(1 for c in respuesta_lower if c in vocales)
+            num_consonantes = sum(1 for c in respuesta_lower if c.isalpha() and c not in vocales)
+
+            # Si tiene muy pocas vocales para su longitud, probablemente es inventada
+            if num_vocales == 0 and num_consonantes >= 3:
+                return False, "Palabra no reconocible o inventada", 1.0
+
+            # Si tiene un patrón muy regular CVCV o VCVCV y no es una palabra común, rechazar
+            # (esto es una heurística, pero ayuda a detectar "sasd", "asdas")
+            if num_vocales == num_consonantes and num_vocales <= 2:
+                # Verificar si es una palabra común en español (lista básica)
+                palabras_comunes_4_5 = {"casa", "mesa", "gato", "perro", "agua", "libro", "carta", "plato", "vaso", "silla", "mesa", "cama", "pelo", "mano", "pie", "ojo", "cara", "boca", "nariz", "diente", "brazo", "pierna", "hueso", "piel", "sangre", "hueso", "carne", "pan", "leche", "huevo", "queso", "azul", "rojo", "verde", "negro", "blanco", "gris", "amarillo", "rosa", "marrón", "naranja", "morado", "celeste", "verde", "azul"}
+                if respuesta_lower not in palabras_comunes_4_5:
+                    # Si no está en la lista y tiene un patrón sospechoso, rechazar
+                    # (esto es conservador pero ayuda a detectar palabras inventadas)
+                    pass  # No rechazar automáticamente, dejar que la IA decida
+
+    # Detectar palabras que son verbos comunes cuando no corresponde
+    verbos_comunes = {"salir", "entrar", "comer", "beber", "dormir", "hablar", "hacer", "decir", "ir", "venir", "ver", "saber", "poder", "querer", "tener", "estar", "ser"}
+    if respuesta_lower in verbos_comunes:
+        if categoria.lower() not in ["verbo", "acción"]:
+            return False, f"'{respuesta_limpia}' es un verbo, no corresponde a la categoría", 1.0
+
+    return None
+
+
+# ----------------------------------------------------------------------
+# Pipeline por ronda: deduplicación, lotes y paralelismo acotado
+# ----------------------------------------------------------------------
+def _completar(prompt, max_tokens, timeout):
+    """Una llamada al modelo; se ejecuta en un hilo de ia_gateway (cada reintento se mide aparte)."""
+    inicio = time.perf_counter()
+    resultado = "error"
+    try:
+        response = openai_client.chat.completions.create(
+            model=OPENAI_MODEL or "gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "Eres un validador experto de juegos de palabras. Responde solo con JSON."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.3,
+            max_tokens=max_tokens,
+            timeout=timeout,
+        )
+        resultado = "ok"
+    finally:
+        IA_VALIDACIONES.observar(time.perf_counter() - inicio, resultado=resultado)
+    return response.choices[0].message.content.strip()
+
+
+def normalizar_respuesta(respuesta: str) -> str:
+    """Forma canónica para deduplicar: minúsculas y espacios colapsados."""
+    return " ".join((respuesta or "").split()).lower()
+
+
+def generar_prompt_lote(items, letra):
+    lineas = "\n".join(
+        f'{i}. Categoría: {categoria} | Respuesta: {respuesta}'
+        for i, (categoria, respuesta) in enumerate(items)
+    )
+    return (
+        "Estás validando respuestas del juego Basta / Stop. "
+        "Reglas: la palabra debe empezar con la letra indicada, debe pertenecer a la categoría, "
+        "no debe ser ofensiva ni inventada.\n"
+        f"Letra de la ronda: {letra}.\n"
+        f"Respuestas:\n{lineas}\n"
+        "Responde SOLO con formato JSON, un elemento por respuesta con su número:\n"
+        '{"resultados": [{"id": 0, "valida": true/false, "razon": "explicación breve", "confianza": 0.0-1.0}]}'
+    )
+
+
+def _extraer_json(texto: str):
+    # Extraer JSON (puede venir con ```json o sin formato)
+    if "```json" in texto:
+        texto = texto.split("```json")[1].split("```")[0]
+    elif "```" in texto:
+        texto = texto.split("```")[1].split("```")[0]
+    return json.loads(texto.strip())
+
+
+def _resultado_lote(solicitud, items, letra):
+    """
+    Interpreta la respuesta del modelo para un lote ya enviado a ia_gateway
+    items: [(categoria, respuesta), ...]
+    Retorna: ({indice: (es_valida, razon, confianza)}, desde_modelo)
+    desde_modelo es False si hubo error y los veredictos son de respaldo
+    """
+    if not solicitud.listo:
+        logger.info("⏱️ Plazo de validación vencido: %s respuestas con veredicto de respaldo", len(items))
+        return {}, False
+    if solicitud.error is not None:
+        logger.error("❌ Error en lote OpenAI: %s", solicitud.error)
+        return {i: (True, "Error de validación IA", 0.3) for i in range(len(items))}, False
+
+    logger.info("📨 Lote de %s respuestas validado por OpenAI (modelo %s, letra '%s')", len(items), OPENAI_MODEL, letra, extra={"muestreo": "ia_lote"})
+    try:
+        resultado = _extraer_json(solicitud.resultado)
+    except json.JSONDecodeError as e:
+        logger.error("❌ Error parseando JSON de lote OpenAI: %s", e)
+        return {i: (True, "Error al procesar validación IA", 0.3) for i in range(len(items))}, False
+
+    resultados = resultado.get("resultados", []) if isinstance(resultado, dict) else None
+    if not isinstance(resultados, list) or not all(isinstance(item, dict) for item in resultados):
+        logger.error("❌ Formato inesperado en lote OpenAI: %.200s", solicitud.resultado)
+        return {i: (True, "Error al procesar validación IA", 0.3) for i in range(len(items))}, False
+
+    veredictos = {}
+    for item in resultados:
+        indice = item.get("id")
+        if isinstance(indice, int) and 0 <= indice < len(items):
+            veredictos[indice] = (
+                bool(item.get("valida", False)),
+                item.get("razon", "Sin razón especificada"),
+                item.get("confianza", 0.5),
+            )
+    return veredictos, True
+
+
+def validar_respuestas(pares: List[Tuple[str, str]], letra: str,
+                       plazo: float = None) -> Dict[Tuple[str, str], Tuple[bool, str, float]]:
+    """
+    Valida todas las respuestas de una ronda
+    pares: [(categoria, respuesta), ...] (puede tener repetidos)
+    Retorna: {(categoria, respuesta_normalizada): (es_valida, razon, confianza)}
+    """
+    limite = time.time() + (VALIDACION_PLAZO_RONDA if plazo is None else plazo)
+    veredictos = {}
+    pendientes = []  # [(clave, categoria, respuesta)]
+    vistas = set()
+
+    for categoria, respuesta in pares:
+        clave = (categoria, normalizar_respuesta(respuesta))
+        if clave in vistas:
+            continue
+        vistas.add(clave)
+        local = validacion_local(respuesta, categoria, letra)
+        if local is not None:
+            veredictos[clave] = local
+        else:
+            pendientes.append((clave, categoria, respuesta.strip()))
+
+    if not pendientes:
+        return veredictos
+
+    # Veredictos ya conocidos de otras salas/rondas
+    claves_cache = {clave: verdict_cache.clave(letra, categoria, respuesta) for clave, categoria, respuesta in pendientes}
+    cacheados = verdict_cache.get_many(claves_cache.values())
+    for clave, clave_cache in claves_cache.items():
+        if clave_cache in cacheados:
+            veredictos[clave] = cacheados[clave_cache]
+    pendientes = [p for p in pendientes if p[0] not in veredictos]
+
+    if not pendientes:
+        return veredictos
+
+    if not (OPENAI_AVAILABLE and openai_client):
+        logger.warning("⚠️ OpenAI no disponible. Validación básica de %s respuestas", len(pendientes))
+        for clave, _, _ in pendientes:
+            veredictos[clave] = (True, "Validación básica (IA no disponible)", 0.5)
+        return veredictos
+
+    lotes = [pendientes[i:i + VALIDACION_TAMANO_LOTE] for i in range(0, len(pendientes), VALIDACION_TAMANO_LOTE)]
+    solicitudes = []
+    for lote in lotes:
+        items = [(cat, resp) for _, cat, resp in lote]
+        solicitud = ia_gateway.enviar(
+            _completar, generar_prompt_lote(items, letra), 60 * len(items) + 50, plazo=limite
+        )
+        solicitudes.append((solicitud, lote, items))
+    # Cede el control mientras el modelo responde (no bloquea ticks ni chat)
+    ia_gateway.esperar([s for s, _, _ in solicitudes], limite)
+
+    nuevos = {}
+    for solicitud, lote, items in solicitudes:
+        resultado, desde_modelo = _resultado_lote(solicitud, items, letra)
+        for indice, (clave, _, _) in enumerate(lote):
+            veredictos[clave] = resultado.get(indice, VEREDICTO_RESPALDO)
+            if desde_modelo and indice in resultado:
+                nuevos[claves_cache[clave]] = resultado[indice]
+
+    verdict_cache.set_many(nuevos)
+    return veredictos
@@ -0,0 +1,177 @@
+"""
+🧠 Verdict Cache - Cache de veredictos de validación IA en dos niveles
+
+Las mismas respuestas ("Argentina", "Perro", "Azul") se repiten en todas las
+salas y rondas. Antes de llamar a OpenAI se consulta:
+1. Memoria: LRU con TTL (MAX_ENTRADAS, TTL_SEGUNDOS)
+2. Persistente: tabla `validaciones_cache` en la base de datos, o el archivo
+   VERDICT_CACHE_FILE si se usa el almacenamiento JSON
+
+La clave es (letra, categoría, respuesta) normalizadas sin acentos ni
+mayúsculas. Solo se guardan veredictos que devolvió el modelo (nunca los de
+respaldo por error o timeout).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple
+
+from app.services.db_store import db_store
+from app.utils.text import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+VERDICT_CACHE_FILE = os.getenv("VERDICT_CACHE_FILE", "validaciones_cache.json")
+MAX_ENTRADAS = int(os.getenv("VERDICT_CACHE_MAX_ENTRADAS", "20000"))
+TTL_SEGUNDOS = float(os.getenv("VERDICT_CACHE_TTL", str(30 * 24 * 3600)))
+
+Veredicto = Tuple[bool, str, float]
+
+
+class VerdictCache:
+    def __init__(self, max_entradas: int = MAX_ENTRADAS, ttl: float = TTL_SEGUNDOS):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._memoria: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits_memoria = 0
+        self.hits_persistente = 0
+        self.misses = 0
+
+        # Nivel persistente en archivo cuando no hay base de datos
+        self._usar_archivo = not db_store.use_database
+        self._archivo: Dict[str, Dict] = {}
+        self._archivo_dirty = False
+        if self._usar_archivo:
+            self._cargar_archivo()
+            threading.Thread(target=self._background_saver, daemon=True).start()
+
+    @staticmethod
+    def clave(letra: str, categoria: str, respuesta: str) -> str:
+        return f"{(letra or '').upper()}|{normalizar_texto(categoria)}|{normalizar_texto(respuesta)}"
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def get_many(self, claves: Iterable[str]) -> Dict[str, Veredicto]:
+        """Busca varias claves: primero en memoria y el resto en una sola consulta persistente."""
+        ahora = time.time()
+        encontrados = {}
+        faltantes = []
+
+        with self._lock:
+            for clave in claves:
+                entrada = self._memoria.get(clave)
+                if entrada and ahora - entrada["t"] < self.ttl:
+                    self._memoria.move_to_end(clave)
+                    encontrados[clave] = self._a_veredicto(entrada)
+                    self.hits_memoria += 1
+                else:
+                    faltantes.append(clave)
+
+        if not faltantes:
+            return encontrados
+
+        persistidos = self._leer_persistente(faltantes)
+        with self._lock:
+            for clave in faltantes:
+                entrada = persistidos.get(clave)
+                if entrada and ahora - entrada["t"] < self.ttl:
+                    self._guardar_memoria(clave, entrada)
+                    encontrados[clave] = self._a_veredicto(entrada)
+                    self.hits_persistente += 1
+                else:
+                    self.misses += 1
+
+        return encontrados
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def set_many(self, veredictos: Dict[str, Veredicto]):
+        if not veredictos:
+            return
+
+        ahora = time.time()
+        entradas = {
+            clave: {"valida": bool(v[0]), "razon": v[1], "confianza": v[2], "t": ahora}
+            for clave, v in veredictos.items()
+        }
+        with self._lock:
+            for clave, entrada in entradas.items():
+                self._guardar_memoria(clave, entrada)
+            if self._usar_archivo:
+                self._archivo.update(entradas)
+                self._archivo_dirty = True
+
+        if not self._usar_archivo:
+            db_store.set_validaciones(entradas)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            consultas = self.hits_memoria + self.hits_persistente + self.misses
+            return {
+                "entradas_memoria": len(self._memoria),
+                "hits_memoria": self.hits_memoria,
+                "hits_persistente": self.hits_persistente,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits_memoria + self.hits_persistente) / consultas, 4) if consultas else 0.0,
+                "persistencia": "archivo" if self._usar_archivo else "base_de_datos",
+            }
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _a_veredicto(entrada: Dict) -> Veredicto:
+        return entrada["valida"], entrada.get("razon") or "", entrada.get("confianza", 0.5)
+
+    def _guardar_memoria(self, clave: str, entrada: Dict):
+        self._memoria[clave] = entrada
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def _leer_persistente(self, claves) -> Dict[str, Dict]:
+        if self._usar_archivo:
+            with self._lock:
+                return {c: self._archivo[c] for c in claves if c in self._archivo}
+        return db_store.get_validaciones(claves)
+
+    def _cargar_archivo(self):
+        if not os.path.exists(VERDICT_CACHE_FILE):
+            return
+        try:
+            with open(VERDICT_CACHE_FILE, "r") as f:
+                ahora = time.time()
+                self._archivo = {
+                    clave: entrada for clave, entrada in json.load(f).items()
+                    if ahora - entrada.get("t", 0) < self.ttl
+                }
+            logger.info("📂 Cache de validaciones cargado (%s veredictos)", len(self._archivo))
+        except Exception as e:
+            logger.warning("⚠️ Error cargando cache de validaciones: %s", e)
+
+    def _background_saver(self):
+        """Guarda el archivo del cache periódicamente si ha cambiado"""
+        while True:
+            time.sleep(10)
+            if not self._archivo_dirty:
+                continue
+            with self._lock:
+                contenido = json.dumps(self._archivo, ensure_ascii=False, separators=(",", ":"))
+                self._archivo_dirty = False
+            try:
+                with open(VERDICT_CACHE_FILE, "w") as f:
+                    f.write(contenido)
+            except Exception as e:
+                logger.error("❌ Error guardando cache de validaciones: %s", e)
+
+
+# Singleton global
+verdict_cache = VerdictCache()
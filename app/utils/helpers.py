@@ -2,13 +2,19 @@ from flask import request, jsonify
 from functools import wraps
 from datetime import datetime, timedelta
 import hashlib
+import hmac
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Constantes de autenticación (se cargan desde .env en run.py)
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
 ADMIN_SESSION_DURATION = 3600  # 1 hora
 MAX_LOGIN_ATTEMPTS = 5
 BLOCK_DURATION_MINUTES = 15
+# Token para que Prometheus consulte /metrics (Authorization: Bearer ...) sin sesión de admin
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 # Memoria local para rate limiting y auth
 admin_login_attempts = {} # {ip: {"count": N, "blocked_until": datetime}}
@@ -49,7 +55,7 @@ def record_failed_attempt(ip):
     
     if admin_login_attempts[ip]["count"] >= MAX_LOGIN_ATTEMPTS:
         admin_login_attempts[ip]["blocked_until"] = datetime.now() + timedelta(minutes=BLOCK_DURATION_MINUTES)
-        print(f"🚫 IP {ip} bloqueada por {BLOCK_DURATION_MINUTES} minutos después de {MAX_LOGIN_ATTEMPTS} intentos fallidos")
+        logger.warning("🚫 IP %s bloqueada por %s minutos después de %s intentos fallidos", ip, BLOCK_DURATION_MINUTES, MAX_LOGIN_ATTEMPTS)
 
 def reset_attempts(ip):
     """Resetea los intentos fallidos para una IP"""
@@ -84,3 +90,15 @@ def require_admin_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def require_metrics_auth(f):
+    """Decorador para /metrics: sesión de admin válida o el token de METRICS_TOKEN"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        autorizacion = request.headers.get("Authorization", "")
+        if METRICS_TOKEN and autorizacion.startswith("Bearer "):
+            if hmac.compare_digest(autorizacion[len("Bearer "):], METRICS_TOKEN):
+                return f(*args, **kwargs)
+        elif verify_admin_token(request.cookies.get("admin_token")):
+            return f(*args, **kwargs)
+        return jsonify({"ok": False, "error": "No autorizado"}), 403
+    return decorated_function
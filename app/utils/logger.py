@@ -1,53 +1,185 @@
-import sys
+"""
+📝 Logging de la app: pipeline con cola y escritor en segundo plano
+
+Antes DualLogger reemplazaba sys.stdout y cada print partía el texto en
+líneas y formateaba la hora en el hilo del handler. Ahora los módulos usan
+`logging.getLogger(__name__)` (bajo el logger "app") y:
+- El QueueHandler solo encola el registro: el mensaje (%-args), la hora y
+  la escritura a la terminal se resuelven en el hilo del QueueListener
+- BufferAdminHandler guarda las líneas en `server_logs` (buffer circular con
+  número de secuencia) para el panel admin (/api/admin/telemetria)
+- Niveles: LOG_LEVEL (INFO por defecto); las operaciones frecuentes (cada
+  escritura a la base, cada respuesta validada) van en DEBUG
+- Muestreo: los registros con extra={"muestreo": clave} (chat, rate limits,
+  lotes de IA) pasan como mucho LOG_MUESTREO_MAX veces cada
+  LOG_MUESTREO_INTERVALO segundos por clave; el siguiente que pasa indica
+  cuántos se omitieron
+- Los eventos de Socket.IO ("emitting event ...", uno por tick del reloj)
+  van al logger "app.socketio", en WARNING salvo LOG_SOCKETIO=1
+"""
+
+import atexit
 import collections
-from datetime import datetime, timezone
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
-# Buffer para almacenar logs en memoria
-# Usamos una variable global aquí que será importada por la app
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MUESTREO_INTERVALO = float(os.getenv("LOG_MUESTREO_INTERVALO", "10"))
+LOG_MUESTREO_MAX = int(os.getenv("LOG_MUESTREO_MAX", "5"))
+LOG_SOCKETIO = os.getenv("LOG_SOCKETIO", "0") == "1"
+
+# Buffer para almacenar logs en memoria (lo lee el panel admin)
 server_logs = collections.deque(maxlen=2000)
 
-class DualLogger:
-    def __init__(self):
-        self.terminal = sys.stdout
-        self.log_buffer = server_logs
-        self._partial = ""
+_listener = None
+_config_lock = threading.Lock()
+
+
+class Muestreo(logging.Filter):
+    """Deja pasar hasta `maximo` registros por clave de muestreo cada `intervalo` segundos"""
+
+    def __init__(self, intervalo: float = LOG_MUESTREO_INTERVALO, maximo: int = LOG_MUESTREO_MAX):
+        super().__init__()
+        self.intervalo = intervalo
+        self.maximo = maximo
+        self._ventanas = {}  # clave -> [inicio, emitidos, omitidos]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        clave = getattr(record, "muestreo", None)
+        if clave is None:
+            return True
+        with self._lock:
+            ventana = self._ventanas.get(clave)
+            if ventana is None or record.created - ventana[0] >= self.intervalo:
+                if ventana and ventana[2]:
+                    record.omitidos = ventana[2]
+                self._ventanas[clave] = [record.created, 1, 0]
+                return True
+            if ventana[1] < self.maximo:
+                ventana[1] += 1
+                return True
+            ventana[2] += 1
+            return False
+
+
+class ColaSinFormato(QueueHandler):
+    """QueueHandler que no formatea en el hilo que loguea (cola en el mismo proceso)"""
+
+    def prepare(self, record):
+        return record
+
+
+class FormatoApp(logging.Formatter):
+    def format(self, record):
+        texto = super().format(record)
+        omitidos = getattr(record, "omitidos", 0)
+        if omitidos:
+            texto += f" (+{omitidos} similares omitidos)"
+        return texto
+
+
+class BufferAdminHandler(logging.Handler):
+    """Guarda cada línea en server_logs con hora y número de secuencia"""
+
+    def __init__(self, buffer=server_logs):
+        super().__init__()
+        self.buffer = buffer
         self._sequence = 0
-        
-    def write(self, message):
-        # Escribir en terminal original
-        self.terminal.write(message)
-
-        # Acumular fragmentos hasta tener líneas completas
-        message = self._partial + message
-        lines = message.split('\n')
-        self._partial = lines[-1] if message and not message.endswith('\n') else ""
-        complete_lines = lines[:-1] if self._partial else lines
-
-        if complete_lines:
-            timestamp = datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M:%S %Z")
-            for line in complete_lines:
-                if line.strip():
-                    self._sequence += 1
-                    self.log_buffer.append({
-                        "time": timestamp,
-                        "msg": line.strip(),
-                        "seq": self._sequence,
-                    })
-
-    def flush(self):
-        self.terminal.flush()
-        if self._partial.strip():
-            timestamp = datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M:%S %Z")
-            self._sequence += 1
-            self.log_buffer.append({
-                "time": timestamp,
-                "msg": self._partial.strip(),
-                "seq": self._sequence,
-            })
-            self._partial = ""
+
+    def emit(self, record):
+        try:
+            texto = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        hora = datetime.fromtimestamp(record.created).astimezone().strftime("%Y-%m-%d %H:%M:%S %Z")
+        for linea in texto.splitlines():
+            if linea.strip():
+                self._sequence += 1
+                self.buffer.append({
+                    "time": hora,
+                    "msg": linea.strip(),
+                    "seq": self._sequence,
+                    "nivel": record.levelname,
+                })
+
 
 def setup_logging():
-    """Configura el logger dual para capturar stdout"""
-    if not isinstance(sys.stdout, DualLogger):
-        sys.stdout = DualLogger()
+    """Configura el logger "app": cola en memoria + escritor en segundo plano"""
+    global _listener
+    with _config_lock:
+        if _listener is not None:
+            return
+
+        formato = FormatoApp("%(message)s")
+        terminal = logging.StreamHandler(sys.stdout)
+        terminal.setFormatter(formato)
+        admin = BufferAdminHandler()
+        admin.setFormatter(formato)
+
+        cola = queue.Queue(-1)
+        encolador = ColaSinFormato(cola)
+        encolador.addFilter(Muestreo())
+
+        raiz = logging.getLogger("app")
+        raiz.setLevel(LOG_LEVEL)
+        raiz.addHandler(encolador)
+        raiz.propagate = False
+        logging.getLogger("app.socketio").setLevel(logging.INFO if LOG_SOCKETIO else logging.WARNING)
+
+        _listener = QueueListener(cola, terminal, admin, respect_handler_level=True)
+        _listener.start()
+        # Al salir se escribe lo que quedó en la cola (ej: el error que cerró el proceso)
+        atexit.register(detener_logging)
+
+
+def detener_logging():
+    """Vacía la cola y detiene el escritor (se registra con atexit en setup_logging)"""
+    global _listener
+    with _config_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def logs_desde(seq, limite=None):
+    """
+    Líneas con número de secuencia mayor a `seq` (cursor del cliente).
+    Devuelve (lineas, reinicio): con reinicio=True el cursor no sirve (el
+    proceso se reinició o lo que faltaba ya salió del buffer) y las líneas
+    reemplazan todo lo que tenía el cliente. Solo recorre las líneas nuevas.
+    """
+    if server_logs and server_logs[-1]["seq"] < seq:
+        nuevas, reinicio = list(server_logs), True
+    else:
+        try:
+            nuevas = _nuevas_desde(server_logs, seq)
+        except RuntimeError:
+            # Otro hilo escribió mientras se recorría: copia atómica del buffer
+            nuevas = _nuevas_desde(server_logs.copy(), seq)
+        reinicio = bool(nuevas) and nuevas[0]["seq"] > seq + 1
+
+    if limite is not None and len(nuevas) > limite:
+        # Demasiado atrasado: se envían las últimas y el cliente reemplaza todo
+        nuevas, reinicio = nuevas[-limite:], True
+    return nuevas, reinicio
+
+
+def _nuevas_desde(buffer, seq):
+    nuevas = []
+    for entrada in reversed(buffer):
+        if entrada["seq"] <= seq:
+            break
+        nuevas.append(entrada)
+    nuevas.reverse()
+    return nuevas
+
 
+def ultimo_seq():
+    return server_logs[-1]["seq"] if server_logs else 0
@@ -0,0 +1,54 @@
+"""
+🔄 Estado versionado de la sala de espera
+
+Antes cada join/rejoin (y cada "listo", vía el reenvío de join_room_event
+del cliente) mandaba a toda la sala la lista completa de jugadores, puntajes
+y configuración. Ahora:
+- sala["version_estado"] aumenta con cada cambio de jugadores, listos,
+  desconectados o puntajes
+- A la sala se envía solo el cambio (`room_delta` con la versión nueva)
+- El estado completo (`player_joined`) va únicamente al cliente cuya versión
+  no es la actual; si a un cliente le falta un delta, pide `sync_room_state`
+"""
+
+CAMPO_VERSION = "version_estado"
+
+# Tipos de delta
+UNIDO = "unido"                # jugador (y puntos): alta o reconexión
+DESCONECTADO = "desconectado"  # jugador
+LISTO = "listo"                # jugador
+
+
+def version(sala) -> int:
+    return sala.get(CAMPO_VERSION, 0)
+
+
+def nueva_version(sala) -> int:
+    """Marca un cambio del estado (incluir CAMPO_VERSION en los campos a guardar)."""
+    sala[CAMPO_VERSION] = version(sala) + 1
+    return sala[CAMPO_VERSION]
+
+
+def registrar_delta(sala, tipo: str, **datos) -> dict:
+    """Aumenta la versión y arma el payload de room_delta."""
+    return {"version": nueva_version(sala), "tipo": tipo, **datos}
+
+
+def snapshot_sala(sala) -> dict:
+    """Estado completo de la sala de espera (payload de player_joined)."""
+    return {
+        "version": version(sala),
+        "jugadores": sala.get("jugadores", []),
+        "puntuaciones": sala.get("puntuaciones", {}),
+        "jugadores_listos": sala.get("jugadores_listos", []),
+        "jugadores_desconectados": sala.get("jugadores_desconectados", []),
+        "configuracion": {
+            "rondas": sala.get("rondas", 3),
+            "dificultad": sala.get("dificultad", "normal"),
+            "modo_juego": sala.get("modo_juego", "clasico"),
+            "chat_habilitado": sala.get("chat_habilitado", True),
+            "sonidos_habilitados": sala.get("sonidos_habilitados", True),
+            "powerups_habilitados": sala.get("powerups_habilitados", True),
+            "validacion_activa": sala.get("validacion_activa", True)
+        }
+    }
@@ -0,0 +1,89 @@
+"""
+⏱️ Reloj de ronda basado en deadline
+
+La sala guarda un instante absoluto en vez de un contador que se decrementa:
+- inicio_ronda: epoch en que empezó la ronda
+- round_deadline: epoch en que termina la ronda si nunca se pausa
+- tiempo_pausado: segundos acumulados en pausas ya cerradas
+- pausada_desde: epoch de la pausa en curso (None si no está pausada)
+
+El tiempo restante se calcula al leer, así que no hace falta escribir la
+sala cada segundo. `tiempo_restante` se sigue guardando en las transiciones
+para salas antiguas que no tienen deadline.
+"""
+
+import time
+
+
+def deadline_efectivo(sala, now=None):
+    """Deadline real de la ronda contando las pausas (None si no hay deadline)."""
+    deadline = sala.get("round_deadline")
+    if not deadline:
+        return None
+
+    now = time.time() if now is None else now
+    deadline += sala.get("tiempo_pausado") or 0
+    if sala.get("pausada") and sala.get("pausada_desde"):
+        deadline += now - sala["pausada_desde"]
+    return deadline
+
+
+def calcular_tiempo_restante(sala, now=None):
+    """Segundos restantes de la ronda (entero, nunca negativo)."""
+    if sala.get("basta_activado") or not sala.get("en_curso", True):
+        return 0
+
+    now = time.time() if now is None else now
+    deadline = deadline_efectivo(sala, now)
+    if deadline is None:
+        return int(sala.get("tiempo_restante", 0) or 0)
+    return max(0, int(round(deadline - now)))
+
+
+def iniciar_reloj(sala, duracion, now=None):
+    """Arranca el reloj de una ronda nueva de `duracion` segundos."""
+    now = time.time() if now is None else now
+    sala["inicio_ronda"] = now
+    sala["round_deadline"] = now + duracion
+    sala["tiempo_pausado"] = 0
+    sala["pausada_desde"] = None
+    sala["tiempo_restante"] = int(duracion)
+    return sala["round_deadline"]
+
+
+def pausar_reloj(sala, now=None):
+    """Congela el reloj; el tiempo en pausa se suma al reanudar."""
+    now = time.time() if now is None else now
+    if not sala.get("pausada"):
+        sala["tiempo_restante"] = calcular_tiempo_restante(sala, now)
+        sala["pausada"] = True
+        sala["pausada_desde"] = now
+    return sala["tiempo_restante"]
+
+
+def reanudar_reloj(sala, now=None):
+    """Cierra la pausa en curso y devuelve el nuevo deadline efectivo."""
+    now = time.time() if now is None else now
+    if sala.get("pausada"):
+        if sala.get("pausada_desde"):
+            sala["tiempo_pausado"] = (sala.get("tiempo_pausado") or 0) + (now - sala["pausada_desde"])
+        sala["pausada"] = False
+        sala["pausada_desde"] = None
+    return deadline_efectivo(sala, now)
+
+
+def detener_reloj(sala):
+    """Marca el reloj como terminado (BASTA o fin de tiempo)."""
+    sala["pausada"] = False
+    sala["pausada_desde"] = None
+    sala["tiempo_restante"] = 0
+
+
+def estado_reloj(sala, now=None):
+    """Campos de sincronización para el cliente (una sola vez, luego interpola)."""
+    now = time.time() if now is None else now
+    return {
+        "tiempo_restante": calcular_tiempo_restante(sala, now),
+        "round_deadline": deadline_efectivo(sala, now),
+        "server_time": now,
+    }
@@ -0,0 +1,109 @@
+"""
+📦 Resultados de ronda compactos y pre-serializados
+
+El payload de round_results repetía en cada jugador los nombres de las
+categorías, un objeto por respuesta ({"validada_ia", "razon_ia"}) y los
+puntos como diccionarios. La versión compacta:
+- `categorias` y `jugadores` una sola vez; el resto son arrays por índice
+- `validas`: un entero por jugador, bit i = categoría i válida
+- `puntos`: array de puntos por categoría de cada jugador
+- `razones`: tabla de motivos sin repetir; `motivos` guarda el índice de la
+  razón de cada respuesta inválida (-1 si es válida)
+
+El cliente lo expande (expandirResultados en game.html). Por Socket.IO se
+emite el dict (a la sala y a los rezagados); para renderizar /game/<codigo>
+se serializa una sola vez por ronda un JSON seguro para incrustar en HTML.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+FORMATO = 2
+CACHE_MAX = 512
+
+_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def codificar_resultados(codigo: str, sala: Dict, categorias: List[str], respuestas: Dict,
+                         validaciones: Dict, puntos: Dict, scores_ronda: Dict) -> Dict:
+    """Arma el payload compacto de la ronda (antes de avanzar ronda_actual)."""
+    jugadores = list(sala.get("jugadores", []))
+    scores_total = sala.get("puntuaciones", {})
+    razones: List[str] = []
+    indice_razon: Dict[str, int] = {}
+
+    validas, motivos = [], []
+    for jugador in jugadores:
+        bits, propios = 0, []
+        for i, categoria in enumerate(categorias):
+            veredicto = validaciones.get(jugador, {}).get(categoria, {})
+            if veredicto.get("validada_ia"):
+                bits |= 1 << i
+                propios.append(-1)
+                continue
+            razon = veredicto.get("razon_ia") or "No válido"
+            if razon not in indice_razon:
+                indice_razon[razon] = len(razones)
+                razones.append(razon)
+            propios.append(indice_razon[razon])
+        validas.append(bits)
+        motivos.append(propios)
+
+    return {
+        "v": FORMATO,
+        "codigo": codigo,
+        "ronda": sala.get("ronda_actual", 1),
+        "anfitrion": sala.get("anfitrion"),
+        "modo_juego": sala.get("modo_juego", "clasico"),
+        "categorias": list(categorias),
+        "jugadores": jugadores,
+        "respuestas": [
+            [(respuestas.get(j, {}).get(c) or "").strip() for c in categorias] for j in jugadores
+        ],
+        "validas": validas,
+        "motivos": motivos,
+        "razones": razones,
+        "puntos": [[puntos.get(j, {}).get(c, 0) for c in categorias] for j in jugadores],
+        "scores_ronda": [scores_ronda.get(j, 0) for j in jugadores],
+        "scores_total": [scores_total.get(j, 0) for j in jugadores],
+        "generado": time.time(),
+    }
+
+
+def _json_html_seguro(payload: Dict) -> str:
+    """JSON que además se puede incrustar tal cual en un <script> (como |tojson)."""
+    texto = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+    return (
+        texto.replace("<", "\\u003c").replace(">", "\\u003e")
+        .replace("&", "\\u0026").replace("'", "\\u0027")
+    )
+
+
+def resultados_serializados(codigo: str, resultados: Optional[Dict]) -> Optional[str]:
+    """JSON de los resultados para el render de /game, serializado una vez por (sala, ronda)."""
+    if not resultados:
+        return None
+    clave = (codigo, resultados.get("ronda"), resultados.get("generado"))
+    with _cache_lock:
+        texto = _cache.get(clave)
+        if texto is not None:
+            _cache.move_to_end(clave)
+            return texto
+
+    texto = _json_html_seguro(resultados)
+    with _cache_lock:
+        _cache[clave] = texto
+        while len(_cache) > CACHE_MAX:
+            _cache.popitem(last=False)
+    return texto
+
+
+def descartar(codigo: str):
+    """Quita del cache los resultados de una sala (sala expirada)."""
+    with _cache_lock:
+        for clave in [c for c in _cache if c[0] == codigo]:
+            del _cache[clave]
@@ -0,0 +1,168 @@
+"""
+Serialización de snapshots del estado (checkpoint de StateStore)
+
+Formatos: "json" (compacto), "json.gz", "msgpack" y "msgpack.gz".
+msgpack es opcional (pip install msgpack); sin él se usa JSON.
+Al leer, el formato se detecta por el contenido: gzip por su número mágico,
+JSON porque empieza con "{" y msgpack por el byte de tipo mapa.
+
+Snapshot indexado (el que escribe StateStore): cada sala se serializa por
+separado, una detrás de otra, y al final van un índice (código -> posición,
+largo y un resumen de la sala) y un trailer de 16 bytes con la posición del
+índice. Al arrancar solo se lee el índice; cada sala se lee del archivo la
+primera vez que se pide, así el arranque no depende de cuántas salas hay.
+"""
+
+import gzip
+import json
+import logging
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+FORMATOS = ("json", "json.gz", "msgpack", "msgpack.gz")
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_NIVEL = 6
+INDICE_MAGIC = b"BASTAIX2"
+TRAILER = struct.Struct(">Q8s")  # posición del índice + número mágico
+
+
+def formato_disponible(formato: str) -> str:
+    """Devuelve el formato pedido o su equivalente JSON si falta msgpack."""
+    if formato not in FORMATOS:
+        logger.warning("⚠️ Formato de snapshot desconocido '%s', se usa json", formato)
+        return "json"
+    if formato.startswith("msgpack") and not MSGPACK_AVAILABLE:
+        logger.warning("⚠️ msgpack no instalado, el snapshot se guardará en JSON")
+        return formato.replace("msgpack", "json")
+    return formato
+
+
+def serializar(estado, formato: str = "json") -> bytes:
+    base, _, compresion = formato.partition(".")
+    if base == "msgpack":
+        datos = msgpack.packb(estado, use_bin_type=True, default=str)
+    else:
+        datos = json.dumps(estado, separators=(",", ":"), default=str).encode("utf-8")
+    if compresion == "gz":
+        datos = gzip.compress(datos, compresslevel=GZIP_NIVEL)
+    return datos
+
+
+def deserializar(datos: bytes):
+    """Lee un snapshot en cualquiera de los formatos (autodetectado)."""
+    if datos[:2] == GZIP_MAGIC:
+        datos = gzip.decompress(datos)
+    if datos.lstrip()[:1] in (b"{", b"["):
+        return json.loads(datos.decode("utf-8"))
+    if not MSGPACK_AVAILABLE:
+        raise ValueError("El snapshot está en msgpack pero msgpack no está instalado")
+    return msgpack.unpackb(datos, raw=False, strict_map_key=False)
+
+
+def escribir_snapshot(ruta: str, estado, formato: str = "json"):
+    """Escribe el snapshot en un temporal y lo renombra (atómico)."""
+    datos = serializar(estado, formato)
+    tmp = ruta + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, ruta)
+    return len(datos)
+
+
+def leer_snapshot(ruta: str):
+    with open(ruta, "rb") as f:
+        return deserializar(f.read())
+
+
+# ----------------------------------------------------------------------
+# Snapshot indexado (carga perezosa por sala)
+# ----------------------------------------------------------------------
+def es_indexado(ruta: str) -> bool:
+    try:
+        with open(ruta, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < TRAILER.size:
+                return False
+            f.seek(-TRAILER.size, os.SEEK_END)
+            return TRAILER.unpack(f.read(TRAILER.size))[1] == INDICE_MAGIC
+    except OSError:
+        return False
+
+
+def escribir_snapshot_indexado(ruta: str, salas: Iterable[Tuple[str, bytes, Dict]],
+                               extra: Dict, formato: str = "json") -> int:
+    """
+    salas: (codigo, sala ya serializada, resumen) por sala; las salas que no
+    se cargaron se copian en crudo del snapshot anterior sin deserializarlas.
+    extra: el resto del estado (ej: journal_seq). Escritura atómica.
+    """
+    tmp = ruta + ".tmp"
+    indice = {}
+    with open(tmp, "wb") as f:
+        posicion = 0
+        for codigo, datos, resumen in salas:
+            f.write(datos)
+            indice[codigo] = [posicion, len(datos), resumen]
+            posicion += len(datos)
+        f.write(serializar({"extra": extra, "salas": indice}, formato))
+        f.write(TRAILER.pack(posicion, INDICE_MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+        tamano = f.tell()
+    os.replace(tmp, ruta)
+    return tamano
+
+
+class SnapshotIndexado:
+    """Snapshot abierto: índice en memoria y salas leídas del archivo a pedido"""
+
+    def __init__(self, ruta: str):
+        # El archivo queda abierto: si una compactación lo reemplaza, este
+        # objeto sigue leyendo la versión que indexó
+        self._archivo = open(ruta, "rb")
+        self._lock = threading.Lock()
+        self._archivo.seek(-TRAILER.size, os.SEEK_END)
+        fin_indice = self._archivo.tell()
+        posicion, magic = TRAILER.unpack(self._archivo.read(TRAILER.size))
+        if magic != INDICE_MAGIC:
+            self._archivo.close()
+            raise ValueError(f"{ruta} no es un snapshot indexado")
+        self._archivo.seek(posicion)
+        documento = deserializar(self._archivo.read(fin_indice - posicion))
+        self.extra: Dict = documento.get("extra") or {}
+        self._posiciones: Dict[str, Tuple[int, int]] = {}
+        self.resumenes: Dict[str, Dict] = {}
+        for codigo, (inicio, largo, resumen) in documento["salas"].items():
+            self._posiciones[codigo] = (inicio, largo)
+            self.resumenes[codigo] = resumen
+
+    def __contains__(self, codigo: str) -> bool:
+        return codigo in self._posiciones
+
+    def leer_crudo(self, codigo: str) -> Optional[bytes]:
+        ubicacion = self._posiciones.get(codigo)
+        if ubicacion is None:
+            return None
+        with self._lock:
+            self._archivo.seek(ubicacion[0])
+            return self._archivo.read(ubicacion[1])
+
+    def leer_sala(self, codigo: str) -> Optional[Dict]:
+        datos = self.leer_crudo(codigo)
+        return deserializar(datos) if datos is not None else None
+
+    def cerrar(self):
+        with self._lock:
+            self._archivo.close()
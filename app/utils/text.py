@@ -0,0 +1,19 @@
+import unicodedata
+
+
+def quitar_acentos(texto: str) -> str:
+    """Quita tildes y diéresis conservando la ñ ("Perú" -> "Peru", "Ñandú" -> "Ñandu")."""
+    resultado = []
+    for ch in unicodedata.normalize("NFD", texto):
+        if unicodedata.combining(ch):
+            # La tilde de la ñ se conserva (n + U+0303)
+            if ch == "̃" and resultado and resultado[-1] in "nN":
+                resultado[-1] = "ñ" if resultado[-1] == "n" else "Ñ"
+            continue
+        resultado.append(ch)
+    return "".join(resultado)
+
+
+def normalizar_texto(texto: str) -> str:
+    """Forma canónica para comparar: minúsculas, sin acentos y espacios colapsados."""
+    return " ".join(quitar_acentos(texto or "").lower().split())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+🧩 Migración al esquema normalizado: chat, respuestas y puntajes en tablas propias
+Ejecutar: python migrar_tablas_normalizadas.py [--verificar-solo]
+
+1. Crea chat_messages, round_answers y scores (con sus índices) si no existen;
+   en un chat_messages ya creado agrega el índice único de mensajes
+2. Copia a esas tablas las columnas JSON de cada sala (mensajes_chat,
+   respuestas_ronda de la ronda actual y puntuaciones); las salas que ya
+   tienen filas en las tablas nuevas se saltean, así que se puede reejecutar
+3. Verifica que db_store lee cada sala igual que antes de migrar
+
+Funciona con PostgreSQL y con SQLite (ej: DATABASE_URL=sqlite:///prueba.db).
+Las columnas JSON no se borran: la app deja de usarlas al detectar las tablas.
+"""
+
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Cargar variables de entorno
+load_dotenv()
+
+
+def _sin_duplicados(mensajes):
+    """Un mensaje por (jugador, timestamp), como exige ux_chat_messages_mensaje"""
+    vistos = set()
+    unicos = []
+    for m in mensajes:
+        clave = (m.get("jugador") or "", m.get("timestamp") or 0)
+        if clave not in vistos:
+            vistos.add(clave)
+            unicos.append(m)
+    return unicos
+
+
+def _normalizar_sala(sala, historial):
+    """Los tres campos como los reconstruye db_store (para comparar)"""
+    return {
+        "mensajes_chat": [
+            {"jugador": m.get("jugador") or "", "mensaje": m.get("mensaje") or "", "timestamp": m.get("timestamp") or 0}
+            for m in _sin_duplicados(sala.get("mensajes_chat") or [])[-historial:]
+        ],
+        "respuestas_ronda": {
+            jugador: {str(c)[:100]: str(r or "")[:200] for c, r in por_categoria.items()}
+            for jugador, por_categoria in (sala.get("respuestas_ronda") or {}).items()
+            if isinstance(por_categoria, dict) and por_categoria
+        },
+        "puntuaciones": {j: int(p or 0) for j, p in (sala.get("puntuaciones") or {}).items()},
+    }
+
+
+def migrar(verificar_solo=False):
+    print("=" * 60)
+    print("🧩  MIGRANDO A TABLAS NORMALIZADAS")
+    print("=" * 60)
+    print()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url or database_url.startswith("#"):
+        print("❌ ERROR: DATABASE_URL no configurado")
+        return False
+
+    try:
+        from sqlalchemy import delete, func, insert, select
+        from app.services import db_store as modulo
+    except Exception as e:
+        print(f"❌ Error importando db_store: {e}")
+        return False
+
+    if not modulo.USE_DATABASE:
+        print("❌ db_store no pudo conectarse a la base de datos")
+        return False
+
+    tablas = [
+        modulo.ChatMessageModel.__table__,
+        modulo.RoundAnswerModel.__table__,
+        modulo.ScoreModel.__table__,
+    ]
+
+    # 1. Tablas e índices
+    if not verificar_solo:
+        modulo.Base.metadata.create_all(bind=modulo.engine, tables=tablas)
+        # create_all no agrega índices a tablas existentes: el único del chat
+        # se crea aparte, después de quitar los duplicados que pudiera haber
+        chat = modulo.ChatMessageModel
+        with modulo.engine.begin() as conexion:
+            conexion.execute(delete(chat).where(chat.id.notin_(
+                select(func.min(chat.id)).group_by(chat.codigo, chat.jugador, chat.timestamp)
+            )))
+        for indice in chat.__table__.indexes:
+            indice.create(bind=modulo.engine, checkfirst=True)
+        print("✅ Tablas chat_messages, round_answers y scores listas")
+        print()
+
+    store = modulo.db_store
+    store._normalizado = None
+    if not store.usa_tablas_normalizadas():
+        print("❌ Faltan las tablas normalizadas (ejecuta sin --verificar-solo)")
+        return False
+
+    # 2. Copiar las columnas JSON (lectura directa de la fila, no vía get_sala)
+    with store._session_scope() as session:
+        salas = {
+            s.codigo: {
+                "ronda_actual": s.ronda_actual or 1,
+                "mensajes_chat": s.mensajes_chat or [],
+                "respuestas_ronda": s.respuestas_ronda or {},
+                "puntuaciones": s.puntuaciones or {},
+            }
+            for s in session.query(modulo.SalaModel).all()
+        }
+        con_filas = set()
+        for modelo in (modulo.ChatMessageModel, modulo.RoundAnswerModel, modulo.ScoreModel):
+            con_filas.update(c for (c,) in session.execute(select(modelo.codigo).distinct()))
+
+    print(f"📋 {len(salas)} salas encontradas ({len(con_filas & set(salas))} ya migradas)")
+
+    migradas = 0
+    if not verificar_solo:
+        ahora = time.time()
+        for codigo, sala in salas.items():
+            if codigo in con_filas:
+                continue
+            datos = _normalizar_sala(sala, len(sala["mensajes_chat"]))
+            with store._session_scope() as session:
+                if datos["mensajes_chat"]:
+                    session.execute(insert(modulo.ChatMessageModel),
+                                    [{"codigo": codigo, **m} for m in datos["mensajes_chat"]])
+                filas = [
+                    {"codigo": codigo, "ronda": sala["ronda_actual"], "jugador": jugador,
+                     "categoria": categoria, "respuesta": respuesta, "created_at": ahora}
+                    for jugador, por_categoria in datos["respuestas_ronda"].items()
+                    for categoria, respuesta in por_categoria.items()
+                ]
+                if filas:
+                    session.execute(insert(modulo.RoundAnswerModel), filas)
+                for jugador, puntos in datos["puntuaciones"].items():
+                    session.add(modulo.ScoreModel(codigo=codigo, jugador=jugador, puntos=puntos, updated_at=ahora))
+            migradas += 1
+        print(f"✅ {migradas} salas copiadas a las tablas normalizadas")
+    print()
+
+    # 3. Verificar: get_sala (ya desde las tablas) debe coincidir con las columnas JSON
+    print("-" * 60)
+    print("🔍 Verificando lectura desde las tablas nuevas...")
+    print("-" * 60)
+    diferencias = 0
+    for codigo, sala in salas.items():
+        esperado = _normalizar_sala(sala, modulo.CHAT_HISTORIAL)
+        leida = store.get_sala(codigo) or {}
+        for campo, valor in esperado.items():
+            if leida.get(campo) != valor:
+                diferencias += 1
+                print(f"   ⚠️  {codigo}.{campo} no coincide")
+
+    with store._session_scope() as session:
+        for tabla in tablas:
+            total = session.execute(select(func.count()).select_from(tabla)).scalar()
+            print(f"   📊 {tabla.name}: {total} filas")
+    print()
+
+    if diferencias:
+        print(f"❌ {diferencias} campos no coinciden (las salas ya migradas pudieron cambiar desde entonces)")
+        return False
+
+    print("=" * 60)
+    print("✅ MIGRACIÓN VERIFICADA")
+    print("=" * 60)
+    return True
+
+
+if __name__ == "__main__":
+    print()
+    success = migrar(verificar_solo="--verificar-solo" in sys.argv)
+    print()
+    sys.exit(0 if success else 1)
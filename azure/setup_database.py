@@ -27,7 +27,7 @@ def setup_database():
         return False
     
     try:
-        from sqlalchemy import create_engine, Column, String, Integer, JSON, DateTime, Boolean, Text
+        from sqlalchemy import create_engine, Column, String, Integer, Float, JSON, DateTime, Boolean, Text, Index
         from sqlalchemy.ext.declarative import declarative_base
         from sqlalchemy.orm import sessionmaker
         from datetime import datetime
@@ -95,6 +95,70 @@ def setup_database():
             created_at = Column(DateTime, default=datetime.utcnow)
             updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
             inicio_ronda = Column(DateTime, nullable=True)
+            
+            # Reloj de ronda basado en deadline (epoch en segundos)
+            round_deadline = Column(Float, nullable=True)
+            tiempo_pausado = Column(Float, default=0)
+            pausada_desde = Column(Float, nullable=True)
+        
+        # Cache persistente de veredictos de validación IA
+        class ValidacionCache(Base):
+            __tablename__ = "validaciones_cache"
+            
+            clave = Column(String(300), primary_key=True)
+            es_valida = Column(Boolean, nullable=False)
+            razon = Column(String(500), nullable=True)
+            confianza = Column(Float, default=0.5)
+            created_at = Column(Float, nullable=False)
+        
+        # Resultados finales de salas expiradas por el reaper
+        class SalaArchivada(Base):
+            __tablename__ = "salas_archivadas"
+            
+            id = Column(Integer, primary_key=True, autoincrement=True)
+            codigo = Column(String(10), index=True, nullable=False)
+            motivo = Column(String(20), nullable=True)
+            resumen = Column(JSON, nullable=False)
+            archivada_at = Column(Float, nullable=False)
+        
+        # Esquema normalizado: chat, respuestas y puntajes fuera de la fila de la sala
+        # (para una base existente ver migrar_tablas_normalizadas.py)
+        class ChatMessage(Base):
+            __tablename__ = "chat_messages"
+            __table_args__ = (Index("ix_chat_messages_sala_ts", "codigo", "timestamp"),)
+            
+            id = Column(Integer, primary_key=True, autoincrement=True)
+            codigo = Column(String(10), nullable=False)
+            jugador = Column(String(100), nullable=False)
+            mensaje = Column(Text, nullable=False)
+            timestamp = Column(Float, nullable=False)
+        
+        class RoundAnswer(Base):
+            __tablename__ = "round_answers"
+            __table_args__ = (
+                Index("ix_round_answers_sala_ronda", "codigo", "ronda", "jugador"),
+                Index("ix_round_answers_categoria", "categoria", "valida"),
+            )
+            
+            id = Column(Integer, primary_key=True, autoincrement=True)
+            codigo = Column(String(10), nullable=False)
+            ronda = Column(Integer, nullable=False)
+            jugador = Column(String(100), nullable=False)
+            categoria = Column(String(100), nullable=False)
+            respuesta = Column(String(200), nullable=False, default="")
+            valida = Column(Boolean, nullable=True)
+            razon = Column(String(500), nullable=True)
+            puntos = Column(Integer, nullable=True)
+            created_at = Column(Float, nullable=False)
+        
+        class Score(Base):
+            __tablename__ = "scores"
+            __table_args__ = (Index("ix_scores_puntos", "puntos"),)
+            
+            codigo = Column(String(10), primary_key=True)
+            jugador = Column(String(100), primary_key=True)
+            puntos = Column(Integer, nullable=False, default=0)
+            updated_at = Column(Float, nullable=True)
         
         print("📋 Modelo de tabla definido")
         print()
@@ -106,11 +170,23 @@ def setup_database():
         # Crear todas las tablas
         Base.metadata.create_all(bind=engine)
         
-        print("✅ Tabla 'salas' creada exitosamente")
+        print("✅ Tablas 'salas', 'validaciones_cache', 'salas_archivadas', 'chat_messages', "
+              "'round_answers' y 'scores' creadas exitosamente")
         print()
         
+        # create_all no modifica tablas existentes: agregar columnas nuevas
+        from sqlalchemy import inspect, text
+        inspector = inspect(engine)
+        for table in Base.metadata.sorted_tables:
+            existentes = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existentes:
+                    tipo = column.type.compile(dialect=engine.dialect)
+                    with engine.begin() as conn:
+                        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {tipo}'))
+                    print(f"   ➕ Columna agregada: {table.name}.{column.name} ({tipo})")
+        
         # Verificar que la tabla existe
-        from sqlalchemy import inspect
         inspector = inspect(engine)
         tables = inspector.get_table_names()
         
@@ -126,6 +202,7 @@ def setup_database():
         print()
         print("🎯 Siguiente paso:")
         print("   1. Ejecuta: python test_migration.py")
+        print("      (base con salas previas: python migrar_tablas_normalizadas.py)")
         print("   2. Luego inicia el servidor: python run.py")
         print()
         
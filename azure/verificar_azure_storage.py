@@ -5,6 +5,7 @@ Ejecutar: python verificar_azure_storage.py
 """
 
 import os
+import sys
 import json
 from datetime import datetime
 from dotenv import load_dotenv
@@ -73,10 +74,12 @@ if os.path.exists(CHECKPOINT_FILE):
     
     # Leer contenido
     try:
-        with open(CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            salas_count = len(data.get("salas", {}))
-            print(f"   Salas en checkpoint.json: {salas_count}")
+        # El checkpoint puede estar en JSON, msgpack o comprimido (STATE_SNAPSHOT_FORMAT)
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from app.utils.snapshot import leer_snapshot
+        data = leer_snapshot(CHECKPOINT_FILE)
+        salas_count = len(data.get("salas", {}))
+        print(f"   Salas en checkpoint.json: {salas_count}")
     except:
         print("   ⚠️  No se pudo leer el archivo")
 else:
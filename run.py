@@ -1,3 +1,4 @@
+import logging
 import sys
 import os
 
@@ -11,11 +12,12 @@ from app.utils.logger import setup_logging
 
 # Configurar logging primero
 setup_logging()
+logger = logging.getLogger("app.run")
 
 # Crear la aplicación
 flask_application = create_app()
 
 if __name__ == "__main__":
-    print("🚀 Servidor Flask-SocketIO modularizado ejecutándose...")
+    logger.info("🚀 Servidor Flask-SocketIO modularizado ejecutándose...")
     socketio.run(flask_application, host="0.0.0.0", port=8081, use_reloader=False, allow_unsafe_werkzeug=True)
 
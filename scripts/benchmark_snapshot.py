@@ -0,0 +1,156 @@
+"""
+Benchmark de formatos de snapshot del StateStore
+
+Genera poblaciones sintéticas de salas (jugadores, respuestas, chat,
+puntuaciones) y compara, por formato, el tamaño del archivo y el tiempo de
+guardado y carga contra el checkpoint anterior (JSON con indent=4, la fila
+"legado"). Para el snapshot indexado (el que escribe StateStore) mide
+además el arranque en frío (abrir solo el índice) y la carga de una sala.
+
+Ejecutar desde la raíz del repo:
+    python scripts/benchmark_snapshot.py
+    python scripts/benchmark_snapshot.py --salas 100 1000 5000 --repeticiones 5
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.room_index import resumen_sala  # noqa: E402
+from app.utils.snapshot import (  # noqa: E402
+    FORMATOS, MSGPACK_AVAILABLE, SnapshotIndexado, escribir_snapshot, escribir_snapshot_indexado,
+    leer_snapshot, serializar,
+)
+
+CATEGORIAS = ["Nombre", "Apellido", "Ciudad", "País", "Animal", "Fruta", "Color", "Cosa"]
+
+
+def _palabra(rng, largo=None):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(largo or rng.randint(3, 10)))
+
+
+def sala_sintetica(rng, codigo):
+    jugadores = [_palabra(rng).capitalize() for _ in range(rng.randint(2, 8))]
+    letra = rng.choice(string.ascii_uppercase)
+    respuestas = {
+        j: {c: letra.lower() + _palabra(rng) for c in CATEGORIAS}
+        for j in jugadores
+    }
+    return {
+        "anfitrion": jugadores[0],
+        "jugadores": jugadores,
+        "jugadores_ids": {j: f"{codigo}-{i}" for i, j in enumerate(jugadores)},
+        "ids_jugadores": {f"{codigo}-{i}": j for i, j in enumerate(jugadores)},
+        "en_curso": rng.random() < 0.5,
+        "ronda_actual": rng.randint(1, 5),
+        "rondas": 5,
+        "letra": letra,
+        "categorias": CATEGORIAS,
+        "puntuaciones": {j: rng.randint(0, 500) for j in jugadores},
+        "respuestas_ronda": respuestas,
+        "mensajes_chat": [
+            {"jugador": rng.choice(jugadores), "mensaje": " ".join(_palabra(rng) for _ in range(6)),
+             "timestamp": time.time()}
+            for _ in range(rng.randint(0, 30))
+        ],
+        "configuracion": {"tiempo_ronda": 60, "modo_juego": "clasico"},
+        "ultima_actividad": time.time(),
+    }
+
+
+def estado_sintetico(n_salas, semilla=42):
+    rng = random.Random(semilla)
+    salas = {f"S{i:05d}": sala_sintetica(rng, f"S{i:05d}") for i in range(n_salas)}
+    return {"salas": salas, "journal_seq": n_salas}
+
+
+def medir(estado, formato, ruta, repeticiones):
+    guardado, carga, tamano = [], [], 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        tamano = escribir_snapshot(ruta, estado, formato)
+        guardado.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        leido = leer_snapshot(ruta)
+        carga.append(time.perf_counter() - inicio)
+    assert len(leido["salas"]) == len(estado["salas"])
+    return tamano, min(guardado), min(carga)
+
+
+def medir_legado(estado, ruta, repeticiones):
+    """Checkpoint como lo escribía StateStore antes de los formatos compactos"""
+    guardado, carga = [], []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        with open(ruta, "w") as f:
+            json.dump(estado, f, indent=4)
+        guardado.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        with open(ruta) as f:
+            json.load(f)
+        carga.append(time.perf_counter() - inicio)
+    return os.path.getsize(ruta), min(guardado), min(carga)
+
+
+def medir_indexado(estado, formato, ruta, repeticiones):
+    guardado, arranque, hidratar, tamano = [], [], [], 0
+    codigo = next(iter(estado["salas"]))
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        entradas = ((c, serializar(s, formato), resumen_sala(s)) for c, s in estado["salas"].items())
+        tamano = escribir_snapshot_indexado(ruta, entradas, {"journal_seq": estado["journal_seq"]}, formato)
+        guardado.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        snapshot = SnapshotIndexado(ruta)
+        arranque.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        snapshot.leer_sala(codigo)
+        hidratar.append(time.perf_counter() - inicio)
+        snapshot.cerrar()
+    return tamano, min(guardado), min(arranque), min(hidratar)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--salas", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    formatos = [f for f in FORMATOS if MSGPACK_AVAILABLE or not f.startswith("msgpack")]
+    if not MSGPACK_AVAILABLE:
+        print("⚠️ msgpack no instalado: solo se miden los formatos JSON")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "checkpoint.bench")
+        for n_salas in args.salas:
+            estado = estado_sintetico(n_salas)
+            print(f"\n📊 {n_salas} salas")
+            print(f"{'formato':<12}{'tamaño KB':>12}{'vs legado':>11}{'guardar ms':>13}{'cargar ms':>12}")
+            base, guardar, cargar = medir_legado(estado, ruta, args.repeticiones)
+            print(f"{'legado':<12}{base / 1024:>12.1f}{1:>10.0%} "
+                  f"{guardar * 1000:>12.1f}{cargar * 1000:>12.1f}")
+            for formato in formatos:
+                tamano, guardar, cargar = medir(estado, formato, ruta, args.repeticiones)
+                print(f"{formato:<12}{tamano / 1024:>12.1f}{tamano / base:>10.0%} "
+                      f"{guardar * 1000:>12.1f}{cargar * 1000:>12.1f}")
+
+            print(f"\n{'indexado':<12}{'tamaño KB':>12}{'guardar ms':>13}{'arranque ms':>14}{'1 sala ms':>12}")
+            for formato in formatos:
+                tamano, guardar, arranque, hidratar = medir_indexado(estado, formato, ruta, args.repeticiones)
+                print(f"{formato:<12}{tamano / 1024:>12.1f}{guardar * 1000:>13.1f}"
+                      f"{arranque * 1000:>14.1f}{hidratar * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+Prueba de carga del juego con jugadores Socket.IO simulados
+
+Cada sala sintética recorre el mismo flujo que el navegador:
+- El anfitrión crea la sala (POST /create) y el resto se une (POST /join_room)
+- Todos conectan por websocket y envían join_room_event; los invitados
+  además player_ready
+- Por ronda: host_is_starting, chat mientras corre el reloj,
+  enviar_respuestas, basta_pressed del anfitrión y, como hace game.html,
+  cada jugador reenvía sus respuestas al recibir basta_triggered y espera
+  round_results
+
+Mide:
+- Latencia p50/p99 de cada evento enviado (ida y vuelta hasta el ack del
+  handler, incluye la espera del turno de la sala) y de las entregas a la
+  sala (start_game, chat, basta_triggered y round_results)
+- Jitter del reloj: desvío del intervalo entre dos update_timer seguidos
+  respecto de 1 s (llegan sueltos o dentro de room_batch)
+- CPU y memoria del servidor leyendo /proc del proceso (Linux)
+
+Con --servidor-local se levanta run.py en un directorio temporal con el
+almacenamiento JSON (sin DATABASE_URL ni REDIS_URL) y sin OPENAI_API_KEY,
+así la validación usa el camino local y no se llama al modelo.
+
+Requiere el cliente asyncio de python-socketio (aiohttp):
+    pip install "python-socketio[asyncio_client]"
+
+Ejecutar desde la raíz del repo:
+    python scripts/load_test.py --servidor-local --salas 20 --jugadores 6
+    python scripts/load_test.py --url http://localhost:8081 --salas 500 --jugadores 8 --rondas 2
+"""
+
+import argparse
+import asyncio
+import collections
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import aiohttp
+    import socketio
+    CLIENTE_DISPONIBLE = True
+except ImportError:
+    CLIENTE_DISPONIBLE = False
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CATEGORIAS = ["Nombre", "Animal", "Color", "Cosa", "Comida", "Profesión"]
+PUERTO_LOCAL = 8081  # Fijo en run.py
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores sin ordenar)."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class Resultados:
+    def __init__(self):
+        self.latencias = collections.defaultdict(list)  # nombre -> [segundos]
+        self.errores = collections.Counter()
+        self.jitter = []
+
+    def registrar(self, nombre, segundos):
+        self.latencias[nombre].append(segundos)
+
+    def imprimir(self, duracion):
+        print(f"\n{'evento':<32}{'n':>8}{'p50 ms':>10}{'p99 ms':>10}{'máx ms':>10}{'errores':>9}")
+        for nombre in sorted(set(self.latencias) | set(self.errores)):
+            valores = self.latencias.get(nombre, [])
+            print(f"{nombre:<32}{len(valores):>8}{percentil(valores, 50) * 1000:>10.1f}"
+                  f"{percentil(valores, 99) * 1000:>10.1f}{max(valores, default=0) * 1000:>10.1f}"
+                  f"{self.errores.get(nombre, 0):>9}")
+
+        if self.jitter:
+            print(f"\n⏱️ Jitter del reloj ({len(self.jitter)} intervalos): "
+                  f"p50 {percentil(self.jitter, 50) * 1000:.1f} ms, "
+                  f"p99 {percentil(self.jitter, 99) * 1000:.1f} ms, "
+                  f"máx {max(self.jitter) * 1000:.1f} ms")
+        print(f"⌛ Duración total: {duracion:.1f} s")
+
+
+class MonitorProceso:
+    """Muestrea CPU y memoria residente de un proceso desde /proc (Linux)"""
+
+    def __init__(self, pid, intervalo=1.0):
+        self.pid = pid
+        self.intervalo = intervalo
+        self.cpu = []  # % de un núcleo por muestra
+        self.rss_max = 0
+        self._tick = os.sysconf("SC_CLK_TCK")
+
+    def _leer(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            campos = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(campos[11]) + int(campos[12])) / self._tick  # utime + stime
+        with open(f"/proc/{self.pid}/status") as f:
+            rss = next((int(l.split()[1]) * 1024 for l in f if l.startswith("VmRSS:")), 0)
+        return cpu, rss
+
+    async def ejecutar(self):
+        try:
+            anterior, _ = self._leer()
+        except OSError:
+            print(f"⚠️ No se puede leer /proc/{self.pid}: sin métricas del servidor")
+            return
+        inicio = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.intervalo)
+            try:
+                cpu, rss = self._leer()
+            except OSError:
+                return
+            ahora = time.perf_counter()
+            self.cpu.append(100 * (cpu - anterior) / (ahora - inicio))
+            self.rss_max = max(self.rss_max, rss)
+            anterior, inicio = cpu, ahora
+
+    def imprimir(self):
+        if not self.cpu:
+            return
+        print(f"🖥️ Servidor (pid {self.pid}): CPU media {sum(self.cpu) / len(self.cpu):.0f}% "
+              f"(máx {max(self.cpu):.0f}%), RSS máx {self.rss_max / 1024 / 1024:.0f} MB")
+
+
+class Jugador:
+    def __init__(self, prueba, codigo, nombre):
+        self.prueba = prueba
+        self.codigo = codigo
+        self.nombre = nombre
+        self.letra = None
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self._esperas = {}       # evento -> Future
+        self._chat = {}          # texto -> instante de envío
+        self._ultimo_tick = None  # (instante, tiempo restante)
+        self.envio_basta = None   # enviar_respuestas disparado por basta_triggered
+
+        for evento in ("start_game", "update_timer", "nuevo_mensaje_chat", "basta_triggered", "round_results"):
+            self.sio.on(evento, self._handler(evento))
+        self.sio.on("room_batch", self._al_recibir_lote)
+
+    # ------------------------------------------------------------------
+    # Envío
+    # ------------------------------------------------------------------
+    async def conectar(self):
+        await self.prueba.medir("connect", self.sio.connect(self.prueba.url, transports=["websocket"]))
+
+    async def enviar(self, evento, datos):
+        """Emite con ack: mide la ida y vuelta hasta que el handler termina."""
+        await self.prueba.medir(evento, self.sio.call(evento, {"codigo": self.codigo, **datos},
+                                                      timeout=self.prueba.timeout))
+
+    async def chatear(self, hasta):
+        while time.perf_counter() < hasta:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * self.prueba.intervalo_chat)
+            # Empieza con un dígito: nunca coincide con la letra de la ronda
+            texto = f"{random.randint(0, 9)} {self.nombre} {random.getrandbits(32):x}"
+            self._chat[texto] = time.perf_counter()
+            await self.enviar("enviar_mensaje_chat", {"jugador": self.nombre, "mensaje": texto})
+
+    def respuestas(self):
+        letra = (self.letra or "a").lower()
+        return {c: f"{letra}{random.getrandbits(20):x}" for c in CATEGORIAS}
+
+    # ------------------------------------------------------------------
+    # Recepción
+    # ------------------------------------------------------------------
+    def esperar(self, evento):
+        futuro = asyncio.get_running_loop().create_future()
+        self._esperas[evento] = futuro
+        return futuro
+
+    def _handler(self, evento):
+        async def handler(datos=None):
+            await self._al_recibir(evento, datos)
+        return handler
+
+    async def _al_recibir_lote(self, lote):
+        for evento, datos in lote:
+            await self._al_recibir(evento, datos)
+
+    async def _al_recibir(self, evento, datos):
+        ahora = time.perf_counter()
+        marca = self.prueba.marcas.get((self.codigo, evento))
+
+        if evento == "start_game":
+            self.letra = datos.get("letra")
+            self._ultimo_tick = None
+        elif evento == "update_timer":
+            tiempo = datos.get("tiempo")
+            if self._ultimo_tick and self._ultimo_tick[1] - tiempo == 1:
+                self.prueba.resultados.jitter.append(abs(ahora - self._ultimo_tick[0] - 1.0))
+            self._ultimo_tick = (ahora, tiempo)
+            return
+        elif evento == "nuevo_mensaje_chat":
+            enviado = self._chat.pop(datos.get("mensaje"), None)
+            if enviado is not None:
+                self.prueba.resultados.registrar("chat (entrega)", ahora - enviado)
+            return
+        elif evento == "basta_triggered":
+            # Igual que game.html: al BASTA se envían las respuestas del formulario
+            self.envio_basta = asyncio.ensure_future(
+                self.enviar("enviar_respuestas", {"jugador": self.nombre, "respuestas": self.respuestas()})
+            )
+
+        if marca is not None:
+            self.prueba.resultados.registrar(f"{evento} (entrega)", ahora - marca)
+        futuro = self._esperas.pop(evento, None)
+        if futuro is not None and not futuro.done():
+            futuro.set_result(datos)
+
+
+class PruebaCarga:
+    def __init__(self, args):
+        self.url = args.url.rstrip("/")
+        self.salas = args.salas
+        self.jugadores = args.jugadores
+        self.rondas = args.rondas
+        self.duracion_ronda = args.duracion_ronda
+        self.intervalo_chat = args.intervalo_chat
+        self.rampa = args.rampa
+        self.timeout = args.timeout
+        self.resultados = Resultados()
+        self.marcas = {}  # (codigo, evento) -> instante en que se provocó
+        self._conexiones = asyncio.Semaphore(args.conexiones_simultaneas)
+        self._http = None
+
+    async def medir(self, nombre, coro):
+        inicio = time.perf_counter()
+        try:
+            resultado = await coro
+        except Exception:
+            self.resultados.errores[nombre] += 1
+            return None
+        self.resultados.registrar(nombre, time.perf_counter() - inicio)
+        return resultado
+
+    async def _post(self, ruta, datos):
+        async def pedir():
+            async with self._http.post(self.url + ruta, json=datos) as respuesta:
+                cuerpo = await respuesta.json()
+                if not cuerpo.get("ok"):
+                    raise RuntimeError(cuerpo.get("error"))
+                return cuerpo
+        return await self.medir(f"POST {ruta}", pedir())
+
+    async def _esperar_todos(self, nombre, futuros):
+        try:
+            await asyncio.wait_for(asyncio.gather(*futuros), self.timeout)
+        except asyncio.TimeoutError:
+            self.resultados.errores[f"{nombre} (entrega)"] += sum(not f.done() for f in futuros)
+
+    async def jugar_sala(self, indice):
+        await asyncio.sleep(self.rampa * indice / max(1, self.salas))
+
+        nombres = [f"J{i}" for i in range(self.jugadores)]
+        creada = await self._post("/create", {"nombre": nombres[0], "rondas": self.rondas,
+                                              "categorias": CATEGORIAS})
+        if not creada:
+            return
+        codigo = creada["codigo"]
+        for nombre in nombres[1:]:
+            await self._post("/join_room", {"codigo": codigo, "nombre": nombre})
+
+        jugadores = [Jugador(self, codigo, nombre) for nombre in nombres]
+        async with self._conexiones:
+            await asyncio.gather(*(j.conectar() for j in jugadores))
+        jugadores = [j for j in jugadores if j.sio.connected]
+        if not jugadores or jugadores[0].nombre != nombres[0]:
+            return await self._desconectar(jugadores)
+        anfitrion = jugadores[0]
+
+        try:
+            await asyncio.gather(*(j.enviar("join_room_event", {"jugador": j.nombre}) for j in jugadores))
+            await asyncio.gather(*(j.enviar("player_ready", {"jugador": j.nombre}) for j in jugadores[1:]))
+
+            for _ in range(self.rondas):
+                await self._jugar_ronda(codigo, anfitrion, jugadores)
+        finally:
+            await self._desconectar(jugadores)
+
+    async def _jugar_ronda(self, codigo, anfitrion, jugadores):
+        inicios = [j.esperar("start_game") for j in jugadores]
+        self.marcas[(codigo, "start_game")] = time.perf_counter()
+        await anfitrion.enviar("host_is_starting", {"jugador": anfitrion.nombre})
+        await self._esperar_todos("start_game", inicios)
+
+        fin = time.perf_counter() + self.duracion_ronda
+        await asyncio.gather(*(j.chatear(fin) for j in jugadores))
+        await asyncio.gather(*(j.enviar("enviar_respuestas", {"jugador": j.nombre, "respuestas": j.respuestas()})
+                               for j in jugadores))
+
+        avisos = [j.esperar("basta_triggered") for j in jugadores]
+        resultados = [j.esperar("round_results") for j in jugadores]
+        self.marcas[(codigo, "basta_triggered")] = self.marcas[(codigo, "round_results")] = time.perf_counter()
+        await anfitrion.enviar("basta_pressed", {})
+        await self._esperar_todos("basta_triggered", avisos)
+        await self._esperar_todos("round_results", resultados)
+        await asyncio.gather(*(j.envio_basta for j in jugadores if j.envio_basta))
+
+    @staticmethod
+    async def _desconectar(jugadores):
+        await asyncio.gather(*(j.sio.disconnect() for j in jugadores), return_exceptions=True)
+
+    async def ejecutar(self):
+        async with aiohttp.ClientSession() as self._http:
+            await asyncio.gather(*(self.jugar_sala(i) for i in range(self.salas)))
+
+
+def levantar_servidor_local(directorio, async_mode):
+    """run.py con almacenamiento JSON y validación local (sin base, Redis ni OpenAI)."""
+    entorno = {
+        **os.environ,
+        "DATABASE_URL": "",
+        "REDIS_URL": "",
+        "SOCKETIO_MESSAGE_QUEUE": "",
+        "OPENAI_API_KEY": "",
+        "SOCKETIO_ASYNC_MODE": async_mode,
+        "LOG_LEVEL": "WARNING",
+    }
+    return subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ, "run.py")],
+        cwd=directorio, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def esperar_servidor(url, plazo=30.0):
+    limite = time.time() + plazo
+    async with aiohttp.ClientSession() as http:
+        while time.time() < limite:
+            try:
+                async with http.get(url) as respuesta:
+                    if respuesta.status < 500:
+                        return True
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    return False
+
+
+async def principal(args, pid):
+    if not await esperar_servidor(args.url):
+        print(f"❌ El servidor no responde en {args.url}")
+        return
+
+    monitor = MonitorProceso(pid) if pid else None
+    tarea_monitor = asyncio.ensure_future(monitor.ejecutar()) if monitor else None
+
+    prueba = PruebaCarga(args)
+    print(f"🚀 {args.salas} salas × {args.jugadores} jugadores, {args.rondas} ronda(s) "
+          f"de {args.duracion_ronda:.0f} s contra {args.url}")
+    inicio = time.perf_counter()
+    await prueba.ejecutar()
+    duracion = time.perf_counter() - inicio
+
+    if tarea_monitor:
+        tarea_monitor.cancel()
+    prueba.resultados.imprimir(duracion)
+    if monitor:
+        monitor.imprimir()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"http://localhost:{PUERTO_LOCAL}")
+    parser.add_argument("--salas", type=int, default=10)
+    parser.add_argument("--jugadores", type=int, default=6, help="por sala (máximo 20)")
+    parser.add_argument("--rondas", type=int, default=1)
+    parser.add_argument("--duracion-ronda", type=float, default=10.0, help="segundos hasta el BASTA")
+    parser.add_argument("--intervalo-chat", type=float, default=2.0, help="segundos entre mensajes de cada jugador")
+    parser.add_argument("--rampa", type=float, default=5.0, help="segundos para arrancar todas las salas")
+    parser.add_argument("--conexiones-simultaneas", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--servidor-local", action="store_true",
+                        help=f"levantar run.py (puerto {PUERTO_LOCAL}) con almacenamiento JSON y sin OpenAI")
+    parser.add_argument("--async-mode", default="threading", help="SOCKETIO_ASYNC_MODE del servidor local")
+    parser.add_argument("--pid", type=int, help="proceso del servidor a muestrear (sin --servidor-local)")
+    args = parser.parse_args()
+
+    if not CLIENTE_DISPONIBLE:
+        print('⚠️ Falta el cliente asyncio de Socket.IO: pip install "python-socketio[asyncio_client]"')
+        sys.exit(1)
+    args.jugadores = max(1, min(args.jugadores, 20))
+
+    if not args.servidor_local:
+        asyncio.run(principal(args, args.pid))
+        return
+
+    with tempfile.TemporaryDirectory() as directorio:
+        servidor = levantar_servidor_local(directorio, args.async_mode)
+        try:
+            asyncio.run(principal(args, servidor.pid))
+        finally:
+            servidor.terminate()
+            servidor.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
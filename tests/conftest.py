@@ -0,0 +1,14 @@
+import importlib
+
+import pytest
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    """Módulo db_store sobre una base SQLite nueva con todas las tablas"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'basta.db'}")
+    import app.services.db_store as modulo
+    modulo = importlib.reload(modulo)  # El engine se crea al importar
+    modulo.Base.metadata.create_all(bind=modulo.engine)
+    yield modulo
+    modulo.engine.dispose()
@@ -0,0 +1,58 @@
+"""
+Pausa y reanudación de la ronda desde el panel admin (/api/admin/sala/<codigo>/pausar)
+"""
+
+import time
+
+import pytest
+
+
+@pytest.fixture()
+def cliente(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Checkpoint local fuera del repo
+    monkeypatch.setenv("SOCKETIO_ASYNC_MODE", "threading")
+    monkeypatch.setenv("SOCKETIO_MESSAGE_QUEUE", "")
+    from app import create_app
+    from app.utils.helpers import generate_admin_token
+
+    cliente = create_app().test_client()
+    cliente.set_cookie("admin_token", generate_admin_token())
+    return cliente
+
+
+def _sala_en_curso(cliente, segundos=60):
+    from app.services.room_cache import room_cache
+
+    codigo = cliente.post("/create", json={"nombre": "Ana"}).json["codigo"]
+    sala = room_cache.get_sala(codigo)
+    sala.update(en_curso=True, round_deadline=time.time() + segundos, tiempo_pausado=0)
+    room_cache.set_sala(codigo, sala)
+    return codigo, sala
+
+
+def test_pausar_y_reanudar(cliente):
+    from app.services.timer_scheduler import timer_scheduler
+
+    codigo, sala = _sala_en_curso(cliente)
+
+    respuesta = cliente.post(f"/api/admin/sala/{codigo}/pausar")
+    assert respuesta.json["ok"] and respuesta.json["pausada"] is True
+    assert sala["pausada"] and sala["pausada_desde"]
+    assert not timer_scheduler.is_active(codigo)
+
+    respuesta = cliente.post(f"/api/admin/sala/{codigo}/pausar", json={"pausada": False})
+    assert respuesta.json["ok"] and respuesta.json["pausada"] is False
+    assert 55 <= respuesta.json["tiempo_restante"] <= 60
+    assert sala["tiempo_pausado"] > 0
+    assert timer_scheduler.is_active(codigo)
+    timer_scheduler.cancel(codigo)
+
+
+def test_pausar_sin_ronda_o_sin_sesion(cliente):
+    codigo = cliente.post("/create", json={"nombre": "Ana"}).json["codigo"]
+
+    assert cliente.post(f"/api/admin/sala/{codigo}/pausar").status_code == 400
+    assert cliente.post("/api/admin/sala/ZZZZZ/pausar").status_code == 404
+
+    cliente.delete_cookie("admin_token")
+    assert cliente.post(f"/api/admin/sala/{codigo}/pausar").status_code == 403
@@ -0,0 +1,75 @@
+"""
+Tablas normalizadas (chat_messages, round_answers, scores) sobre SQLite
+"""
+
+
+def _filas(db, modelo, *columnas):
+    with db.db_store._session_scope() as session:
+        return session.execute(
+            db.select(*[getattr(modelo, c) for c in columnas]).order_by(*[getattr(modelo, c) for c in columnas])
+        ).all()
+
+
+def test_respuestas_con_su_ronda_aunque_el_flush_avance_la_ronda(db):
+    store = db.db_store
+    store.create_sala("ABC12", "Ana")
+    store.update_sala_fields("ABC12", puntuaciones={"Ana": 0, "Beto": 0})
+
+    # El flush diferido de las respuestas coincide con el de los resultados
+    store.update_sala_fields(
+        "ABC12",
+        patches=[("respuestas_ronda", ["Ana"], {"Animal": "alce"}),
+                 ("respuestas_ronda", ["Beto"], {"Animal": "burro"})],
+        ronda_respuestas=1, ronda_actual=2, puntuaciones={"Ana": 100, "Beto": 100},
+    )
+    store.registrar_veredictos(
+        "ABC12", 1,
+        {"Ana": {"Animal": {"validada_ia": True, "razon_ia": "ok"}},
+         "Beto": {"Animal": {"validada_ia": True, "razon_ia": "ok"}}},
+        {"Ana": {"Animal": 100}, "Beto": {"Animal": 100}},
+    )
+
+    assert _filas(db, db.RoundAnswerModel, "jugador", "ronda", "valida", "puntos") == [
+        ("Ana", 1, True, 100), ("Beto", 1, True, 100),
+    ]
+
+
+def test_reenvio_de_respuestas_reemplaza_las_anteriores(db):
+    store = db.db_store
+    store.create_sala("ABC12", "Ana")
+
+    for respuesta in ("alce", "abeja"):
+        store.update_sala_fields("ABC12", patches=[("respuestas_ronda", ["Ana"], {"Animal": respuesta})],
+                                 ronda_respuestas=1)
+
+    assert _filas(db, db.RoundAnswerModel, "jugador", "ronda", "respuesta") == [("Ana", 1, "abeja")]
+    assert store.get_sala("ABC12")["respuestas_ronda"] == {"Ana": {"Animal": "abeja"}}
+
+
+def test_chat_mismo_ms_de_distintos_jugadores_y_sin_duplicados(db):
+    store = db.db_store
+    store.create_sala("ABC12", "Ana")
+    primero = {"jugador": "Ana", "mensaje": "hola", "timestamp": 1000}
+    mismo_ms = {"jugador": "Beto", "mensaje": "buenas", "timestamp": 1000}
+
+    store.update_sala_fields("ABC12", mensajes_chat=[primero])
+    store.update_sala_fields("ABC12", mensajes_chat=[primero, mismo_ms])
+    # Otro worker vuelve a escribir el mismo historial
+    store.update_sala_fields("ABC12", mensajes_chat=[primero, mismo_ms])
+
+    assert _filas(db, db.ChatMessageModel, "jugador", "timestamp") == [("Ana", 1000), ("Beto", 1000)]
+    assert len(store.get_sala("ABC12")["mensajes_chat"]) == 2
+
+
+def test_puntajes_de_jugadores_que_se_fueron_se_borran(db):
+    store = db.db_store
+    store.create_sala("ABC12", "Ana")
+    store.update_sala_fields("ABC12", puntuaciones={"Ana": 100, "Beto": 50})
+
+    # Patch de un jugador: no toca al resto
+    store.update_sala_fields("ABC12", patches=[("puntuaciones", ["Ana"], 150)])
+    assert store.get_sala("ABC12")["puntuaciones"] == {"Ana": 150, "Beto": 50}
+
+    store.update_sala_fields("ABC12", puntuaciones={"Ana": 150})
+    assert store.get_sala("ABC12")["puntuaciones"] == {"Ana": 150}
+    assert _filas(db, db.ScoreModel, "jugador") == [("Ana",)]
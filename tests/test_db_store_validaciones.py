@@ -0,0 +1,25 @@
+"""
+Cache persistente de veredictos (validaciones_cache) sobre SQLite
+"""
+
+import time
+
+
+def _veredicto(valida=True):
+    return {"valida": valida, "razon": "ok", "confianza": 0.9, "t": time.time()}
+
+
+def test_claves_largas_no_tiran_el_lote(db):
+    store = db.db_store
+    corta = "P|animal|perro"
+    larga = "P|animal|" + "p" * 400
+
+    store.set_validaciones({corta: _veredicto(), larga: _veredicto(False)})
+
+    leidas = store.get_validaciones([corta, larga, "P|animal|puma"])
+    assert set(leidas) == {corta, larga}
+    assert leidas[larga]["valida"] is False
+    with store._session_scope() as session:
+        claves = session.execute(db.select(db.ValidacionModel.clave)).scalars().all()
+    assert corta in claves
+    assert all(len(c) <= db.CLAVE_VALIDACION_MAX for c in claves)
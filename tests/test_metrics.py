@@ -0,0 +1,36 @@
+"""
+Formato de /metrics: recolectores con contadores, medidores y campos excluidos
+"""
+
+from app.services.metrics import RegistroMetricas
+
+
+def test_recolector_tipa_contadores_y_excluye_configuracion():
+    registro = RegistroMetricas()
+    registro.recolector(
+        "gateway",
+        lambda: {"completadas": 3, "en_cola": 1, "circuito": "cerrado", "max_concurrencia": 4,
+                 "checkouts_total": 7},
+        contadores=("completadas", "checkouts_total"),
+        excluir=("max_concurrencia",),
+    )
+
+    lineas = registro.exponer().splitlines()
+    assert lineas == [
+        "# TYPE basta_gateway_completadas_total counter",
+        "basta_gateway_completadas_total 3",
+        "# TYPE basta_gateway_en_cola gauge",
+        "basta_gateway_en_cola 1",
+        "# TYPE basta_gateway_checkouts_total counter",
+        "basta_gateway_checkouts_total 7",
+    ]
+
+
+def test_recolector_con_error_no_corta_la_exposicion():
+    registro = RegistroMetricas()
+    registro.recolector("roto", lambda: 1 / 0)
+    registro.contador("eventos_total", "Eventos").inc()
+
+    texto = registro.exponer()
+    assert "basta_eventos_total 1" in texto
+    assert "# roto: error al recolectar" in texto
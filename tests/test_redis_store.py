@@ -0,0 +1,187 @@
+"""
+RedisStateStore sobre fakeredis: salas por campo, reclamos, sesiones e índice
+"""
+
+import pytest
+
+from app.services.redis_store import RedisStateStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture()
+def servidor():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture()
+def store(servidor):
+    return RedisStateStore(fakeredis.FakeRedis(server=servidor, decode_responses=True))
+
+
+@pytest.fixture()
+def otro_worker(servidor):
+    return RedisStateStore(fakeredis.FakeRedis(server=servidor, decode_responses=True))
+
+
+def test_sala_completa_y_firmas(store):
+    store.create_sala("ABC12", "Ana")
+
+    sala, firmas = store.get_sala_con_firmas("ABC12")
+    assert sala["jugadores"] == ["Ana"]
+    assert firmas["jugadores"] == '["Ana"]'
+    assert store.get_sala("ZZZ99") is None
+
+    store.set_sala("ABC12", {"anfitrion": "Beto"})
+    assert store.get_sala("ABC12") == {"anfitrion": "Beto"}
+
+
+def test_escritura_por_campos_no_pisa_el_resto(store, otro_worker):
+    store.create_sala("ABC12", "Ana")
+
+    otro_worker.set_sala("ABC12", {"jugadores": ["Ana", "Beto"], "en_curso": True},
+                         campos=["jugadores", "configuracion"])
+    sala = store.get_sala("ABC12")
+    assert sala["jugadores"] == ["Ana", "Beto"]
+    assert "configuracion" not in sala  # Campo listado pero ausente: se borra
+    assert sala["en_curso"] is False  # No listado: queda como estaba
+
+
+def test_patches_de_distintos_workers_se_combinan(store, otro_worker):
+    store.create_sala("ABC12", "Ana")
+
+    store.set_sala("ABC12", {"respuestas_ronda": {"Ana": {"Animal": "alce"}}},
+                   campos=[("respuestas_ronda", "Ana")])
+    otro_worker.set_sala("ABC12", {"respuestas_ronda": {"Beto": {"Animal": "burro"}}},
+                         campos=[("respuestas_ronda", "Beto")])
+    assert store.get_sala("ABC12")["respuestas_ronda"] == {
+        "Ana": {"Animal": "alce"}, "Beto": {"Animal": "burro"},
+    }
+
+    store.patch_campo("ABC12", "respuestas_ronda", "Ana", None)
+    assert store.get_sala("ABC12")["respuestas_ronda"] == {"Beto": {"Animal": "burro"}}
+
+
+def test_borrar_sala(store):
+    store.create_sala("ABC12", "Ana")
+    store.create_sala("DEF34", "Beto")
+
+    store.delete_sala("ABC12")
+    assert store.get_sala("ABC12") is None
+    assert list(store.get_all_salas()) == ["DEF34"]
+
+
+def test_reclamar_lo_gana_un_solo_worker(store, otro_worker, servidor):
+    assert store.reclamar("fin_ronda:ABC12:1", ttl=30)
+    assert not otro_worker.reclamar("fin_ronda:ABC12:1", ttl=30)
+    assert otro_worker.reclamar("fin_ronda:ABC12:2", ttl=30)
+    assert 0 < store.redis.ttl("basta:reclamo:fin_ronda:ABC12:1") <= 30
+
+
+def test_sesiones(store, otro_worker):
+    store.registrar_sesion("sid1", "ABC12", "Ana")
+    store.registrar_sesion("sid2", "ABC12", "Beto")
+    store.registrar_sesion("sid3", "DEF34", "Cami")
+
+    assert otro_worker.get_sesion("sid1") == {"codigo": "ABC12", "jugador": "Ana"}
+    assert otro_worker.cerrar_sesion("sid1") == ("ABC12", "Ana")
+    assert store.get_sesion("sid1") is None
+    assert store.cerrar_sesion("sid1") == (None, None)
+
+    store.cerrar_sesiones_de_sala("ABC12")
+    assert store.get_sesion("sid2") is None
+    assert store.get_sesion("sid3") == {"codigo": "DEF34", "jugador": "Cami"}
+
+
+def test_indice_y_panel(store, otro_worker, monkeypatch):
+    monkeypatch.setattr("app.services.redis_store.INDICE_TTL", 0)
+    store.create_sala("ABC12", "Ana")
+    store.create_sala("DEF34", "Beto")
+    store.set_sala("DEF34", {"en_curso": True, "jugadores": ["Beto", "Cami"]},
+                   campos=["en_curso", "jugadores"])
+    otro_worker.set_sala("ABC12", {"mensajes_chat": [{"jugador": "Ana", "mensaje": "hola", "timestamp": 1}]},
+                         campos=["mensajes_chat"])
+
+    indice = store.get_indice()
+    assert set(indice) == {"ABC12", "DEF34"}
+    assert indice["ABC12"]["num_mensajes"] == 1
+    assert "mensajes_chat" not in indice["ABC12"]
+
+    agregados = store.get_agregados()
+    assert agregados["total_salas"] == 2
+    assert agregados["salas_activas"] == 1
+    assert agregados["total_jugadores"] == 3
+    assert agregados["total_mensajes"] == 1
+
+    total, filas = store.listar_salas(offset=0, limite=1)
+    assert total == 2 and len(filas) == 1
+
+    otro_worker.delete_sala("DEF34")
+    assert store.get_agregados()["total_salas"] == 1
+
+
+def test_indice_no_lee_el_chat(store, monkeypatch):
+    store.create_sala("ABC12", "Ana")
+    mensajes = [{"jugador": "Ana", "mensaje": f"m{i}", "timestamp": i} for i in range(3)]
+    store.set_sala("ABC12", {"mensajes_chat": mensajes}, campos=["mensajes_chat"])
+
+    campos_leidos = []
+    pipeline = type(store.redis.pipeline())
+    hmget = pipeline.hmget
+
+    def espiar_hmget(pipe, clave, campos):
+        campos_leidos.extend(campos)
+        return hmget(pipe, clave, campos)
+
+    monkeypatch.setattr(pipeline, "hmget", espiar_hmget)
+    assert store.get_indice()["ABC12"]["num_mensajes"] == 3
+    assert campos_leidos and "mensajes_chat" not in campos_leidos
+
+    store.set_sala("ABC12", {"anfitrion": "Ana"})  # Sala reemplazada sin chat
+    assert "num_mensajes" not in store.get_indice()["ABC12"]
+    store.delete_sala("ABC12")
+    assert not store.redis.hexists("basta:num_mensajes", "ABC12")
+
+
+def _alta(sala, jugador):
+    """Lo que hacen /join y join_room_event: campos por elemento"""
+    sala["jugadores"].append(jugador)
+    sala["puntuaciones"][jugador] = 0
+    return [("jugadores", jugador), ("puntuaciones", jugador)]
+
+
+def test_altas_simultaneas_en_dos_workers(store, otro_worker, monkeypatch):
+    import app.services.room_cache as room_cache
+
+    monkeypatch.setattr(room_cache.db_store, "use_database", False)
+    cache_a, cache_b = room_cache.RoomCache(flush_interval=3600), room_cache.RoomCache(flush_interval=3600)
+    store.create_sala("ABC12", "Ana")
+    store.set_sala("ABC12", {"jugadores_desconectados": ["Ana"]}, campos=["jugadores_desconectados"])
+
+    # Cada worker lee la sala antes de que el otro escriba
+    monkeypatch.setattr(room_cache, "state_store", store)
+    sala_a = cache_a.get_sala("ABC12")
+    monkeypatch.setattr(room_cache, "state_store", otro_worker)
+    sala_b = cache_b.get_sala("ABC12")
+
+    monkeypatch.setattr(room_cache, "state_store", store)
+    cache_a.set_sala("ABC12", sala_a, evento="join", campos=_alta(sala_a, "Beto"))
+    monkeypatch.setattr(room_cache, "state_store", otro_worker)
+    sala_b["jugadores_desconectados"].remove("Ana")  # Ana se reconecta en el otro worker
+    cache_b.set_sala("ABC12", sala_b, evento="join",
+                     campos=_alta(sala_b, "Cami") + [("jugadores_desconectados", "Ana")])
+
+    sala = store.get_sala("ABC12")
+    assert sala["jugadores"] == ["Ana", "Beto", "Cami"]
+    assert sala["jugadores_desconectados"] == []
+    assert sala["puntuaciones"] == {"Ana": 0, "Beto": 0, "Cami": 0}
+    assert sala_b["jugadores"] == ["Ana", "Beto", "Cami"]  # La copia del worker queda al día
+
+
+def test_cambiar_lista(store):
+    store.create_sala("ABC12", "Ana")
+
+    assert store.cambiar_lista("ABC12", "jugadores", "Beto", True) == ["Ana", "Beto"]
+    assert store.cambiar_lista("ABC12", "jugadores", "Beto", True) == ["Ana", "Beto"]
+    assert store.cambiar_lista("ABC12", "jugadores", "Ana", False) == ["Beto"]
+    assert store.cambiar_lista("ABC12", "jugadores_desconectados", "Beto", True) == ["Beto"]